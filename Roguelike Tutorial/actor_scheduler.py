@@ -0,0 +1,94 @@
+import tcod as libtcod
+
+import heapq
+
+from itertools import count
+
+
+# An actor with an AI speed of NORMAL_SPEED acts once a turn; one with twice the speed acts twice
+NORMAL_SPEED = 100
+TURN_LENGTH = 100
+
+
+class ActorScheduler:
+    """
+    The entities with an AI on a floor. Awake actors wait in a priority queue ordered by the time of their next
+    action, with faster actors coming up more often. Monsters whose AI only acts in view are dormant until the
+    player first sees them, and cost nothing until then. Actors added at the same time act in the order they
+    were added, so the enemy turn keeps the order of the entity list.
+    """
+    def __init__(self):
+        self.time = 0
+
+        # (time of next action, sequence number, entity)
+        self.queue = []
+
+        # entity -> sequence number, for every scheduled actor; queue entries for anything else are stale
+        self.sequences = {}
+        self.dormant = set()
+
+        self.next_sequence = count()
+
+    def add(self, entity):
+        sequence = next(self.next_sequence)
+        self.sequences[entity] = sequence
+
+        if getattr(entity.ai, 'acts_in_view_only', False):
+            self.dormant.add(entity)
+        else:
+            heapq.heappush(self.queue, (self.time, sequence, entity))
+
+    def add_all(self, entities):
+        for entity in entities:
+            if entity.ai:
+                self.add(entity)
+
+    def remove(self, entity):
+        # Its queue entry is dropped when it comes up
+        self.sequences.pop(entity, None)
+        self.dormant.discard(entity)
+
+    def clear(self):
+        self.queue = []
+        self.sequences.clear()
+        self.dormant.clear()
+
+    def wake(self, entity):
+        if entity in self.dormant:
+            self.dormant.remove(entity)
+            heapq.heappush(self.queue, (self.time, self.sequences[entity], entity))
+
+    def wake_in_view(self, fov_map, x, y, radius, entity_index):
+        # Wake the dormant monsters the player can see. Only the entities around the player are looked at,
+        # unless there are fewer dormant monsters than that
+        if not self.dormant:
+            return
+
+        reach = radius + 1
+        if radius and (2 * reach + 1) ** 2 < len(self.dormant):
+            candidates = [entity for entity in entity_index.get_entities_in_radius(x, y, reach)
+                          if entity in self.dormant]
+        else:
+            candidates = list(self.dormant)
+
+        for entity in candidates:
+            if libtcod.map_is_in_fov(fov_map, entity.x, entity.y):
+                self.wake(entity)
+
+    def get_turn_actors(self):
+        # Every actor whose action comes up before the end of this turn, in the order they act
+        end_of_turn = self.time + TURN_LENGTH
+
+        while self.queue and self.queue[0][0] < end_of_turn:
+            action_time, sequence, entity = heapq.heappop(self.queue)
+
+            if self.sequences.get(entity) != sequence:
+                continue
+
+            # Queued again before it acts, so nothing is lost if the turn is cut short
+            speed = getattr(entity.ai, 'speed', NORMAL_SPEED)
+            heapq.heappush(self.queue, (action_time + TURN_LENGTH * NORMAL_SPEED // speed, sequence, entity))
+
+            yield entity
+
+        self.time = end_of_turn
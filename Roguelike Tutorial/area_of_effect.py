@@ -0,0 +1,115 @@
+import tcod.los
+import tcod.map
+
+import numpy as np
+
+
+class BlastArea:
+    """
+    The tiles an area effect reaches, as a boolean mask over the box of the map around its origin. A tile is only
+    reached if it can be seen from the origin, so blasts don't go through walls.
+    """
+    def __init__(self, x0, y0, mask):
+        self.x0 = x0
+        self.y0 = y0
+
+        # Indexed [x, y] like the tiles, relative to (x0, y0)
+        self.mask = mask
+
+    def contains(self, x, y):
+        x = np.asarray(x) - self.x0
+        y = np.asarray(y) - self.y0
+        width, height = self.mask.shape
+
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+
+        return inside & self.mask[np.where(inside, x, 0), np.where(inside, y, 0)]
+
+    def get_tiles(self):
+        xs, ys = np.nonzero(self.mask)
+
+        return list(zip((xs + self.x0).tolist(), (ys + self.y0).tolist()))
+
+
+def get_blast_area(game_map, x, y, radius, shape='circle', target_x=None, target_y=None, angle=90, algorithm=0):
+    # A circle is centred on (x, y). A cone or line starts at (x, y) and points at (target_x, target_y), without
+    # reaching its own origin
+    x0 = max(0, x - radius)
+    y0 = max(0, y - radius)
+    x1 = min(game_map.width, x + radius + 1)
+    y1 = min(game_map.height, y + radius + 1)
+
+    # Only the box the radius can reach is looked at, so the cost doesn't grow with the map
+    transparency = ~game_map.tiles.block_sight[x0:x1, y0:y1]
+    mask = tcod.map.compute_fov(transparency, (x - x0, y - y0), radius, True, algorithm)
+
+    dx, dy = np.ogrid[x0 - x:x1 - x, y0 - y:y1 - y]
+    mask &= dx ** 2 + dy ** 2 <= radius ** 2
+
+    if shape == 'cone':
+        mask &= get_cone_mask(dx, dy, target_x - x, target_y - y, angle)
+    elif shape == 'line':
+        mask &= get_line_mask(x, y, target_x, target_y, radius, x0, y0, mask.shape)
+    elif shape != 'circle':
+        raise ValueError('Unknown blast shape: {0}'.format(shape))
+
+    return BlastArea(x0, y0, mask)
+
+
+def get_cone_mask(dx, dy, direction_x, direction_y, angle):
+    if direction_x == 0 and direction_y == 0:
+        return np.zeros((dx.shape[0], dy.shape[1]), dtype=bool)
+
+    # Compare the cosine of each tile's angle from the direction with the cosine of half the cone
+    dot = dx * direction_x + dy * direction_y
+    length = np.sqrt((dx ** 2 + dy ** 2) * (direction_x ** 2 + direction_y ** 2))
+
+    return (length > 0) & (dot >= length * np.cos(np.radians(angle) / 2) - 1e-9)
+
+
+def get_line_mask(x, y, target_x, target_y, radius, x0, y0, shape):
+    mask = np.zeros(shape, dtype=bool)
+
+    if (x, y) == (target_x, target_y):
+        return mask
+
+    # Carry the line on past the target until it runs out of range
+    scale = radius * 2 // max(abs(target_x - x), abs(target_y - y)) + 1
+    end_x = x + (target_x - x) * scale
+    end_y = y + (target_y - y) * scale
+
+    points = tcod.los.bresenham((x, y), (end_x, end_y))[1:radius + 1]
+    points = points[(points[:, 0] >= x0) & (points[:, 0] < x0 + shape[0]) &
+                    (points[:, 1] >= y0) & (points[:, 1] < y0 + shape[1])]
+    mask[points[:, 0] - x0, points[:, 1] - y0] = True
+
+    return mask
+
+
+def get_entities_in_area(game_map, area):
+    # All the entities standing in the area, picked with one lookup into its mask
+    store = game_map.entity_store
+
+    if store is not None:
+        size = store.size
+
+        return store.get_entities(store.active[:size] & area.contains(store.x[:size], store.y[:size]))
+
+    entity_index = game_map.entity_index
+
+    # Walk whichever is smaller: the tiles reached or the occupied tiles
+    if np.count_nonzero(area.mask) < len(entity_index.cells):
+        xs, ys = np.nonzero(area.mask)
+        cells = zip((xs + area.x0).tolist(), (ys + area.y0).tolist())
+
+        return [entity for cell in cells for entity in entity_index.cells.get(cell, ())]
+
+    cells = list(entity_index.cells.keys())
+
+    if not cells:
+        return []
+
+    xs, ys = np.array(cells).T
+    reached = area.contains(xs, ys)
+
+    return [entity for cell, hit in zip(cells, reached.tolist()) if hit for entity in entity_index.cells[cell]]
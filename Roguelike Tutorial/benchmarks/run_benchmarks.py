@@ -0,0 +1,353 @@
+"""
+Seeded benchmarks for map generation (rooms, caves and BSP), FOV, rendering, pathfinding and the enemy turn.
+
+Runs headless (no window is opened). From the "Roguelike Tutorial" directory:
+
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --baseline other_baseline.json
+    python benchmarks/run_benchmarks.py --no-compare --output results.json
+
+The results are compared against the baseline (benchmarks/baseline.json unless --baseline is given): any case
+whose median time is more than --tolerance slower than the baseline's is reported and the script exits with
+status 1. No baseline is kept in the repository, since the timings depend on the machine, so run
+--save-baseline once on the machine that makes the comparisons, before the change being measured. Without a
+baseline the script exits with status 2 before running anything, unless --no-compare is given.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tcod as libtcod
+import numpy as np
+
+from components.ai import BasicMonster
+from components.fighter import Fighter
+from entity import Entity
+from fov_functions import initialize_fov, recompute_fov
+from game_messages import MessageLog
+from game_session import GameSession
+from loader_functions.initialize_new_game import get_constants
+from map_objects.game_map import GameMap
+from render_functions import RenderOrder, render_all
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+
+    return int(width), int(height)
+
+
+def get_benchmark_constants(width, height):
+    constants = get_constants()
+
+    constants['map_width'] = width
+    constants['map_height'] = height
+
+    # Keep roughly the default room density on bigger maps
+    constants['max_rooms'] = max(constants['max_rooms'], width * height // 250)
+
+    constants['screen_width'] = width
+    constants['screen_height'] = height + constants['panel_height']
+    constants['panel_y'] = height
+
+    # Keep everything in this process
+    constants['pregenerate_floors'] = False
+
+    return constants
+
+
+def build_floor(width, height, monsters, seed):
+    random.seed(seed)
+
+    constants = get_benchmark_constants(width, height)
+
+    fighter_component = Fighter(hp=10 ** 9, defense=1, power=2)
+    player = Entity(0, 0, '@', libtcod.crimson, 'Player', blocks=True, render_order=RenderOrder.ACTOR,
+                    fighter=fighter_component)
+    entities = [player]
+
+    game_map = GameMap(width, height)
+    game_map.make_map(constants['max_rooms'], constants['room_min_size'], constants['room_max_size'],
+                      width, height, player, entities)
+
+    # Drop extra monsters onto free floor tiles
+    placed = 0
+    while placed < monsters:
+        x = random.randint(0, width - 1)
+        y = random.randint(0, height - 1)
+
+        if game_map.is_blocked(x, y) or game_map.entity_index.get_entities_at(x, y):
+            continue
+
+        monster = Entity(x, y, 's', libtcod.desaturated_green, 'Ragged Sailor', blocks=True,
+                         render_order=RenderOrder.ACTOR, fighter=Fighter(hp=15, defense=1, power=4, xp=35),
+                         ai=BasicMonster())
+        entities.append(monster)
+        game_map.entity_index.add(monster)
+        placed += 1
+
+    game_map.initialize_path_map(entities)
+
+    return player, entities, game_map, constants
+
+
+def time_case(function, repeat, setup=None):
+    samples = []
+
+    for i in range(repeat):
+        # Anything that puts the case back the way it started isn't timed
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'max': max(samples),
+        'repeat': repeat
+    }
+
+
+def bench_make_map(width, height, seed, repeat, generator='rooms'):
+    constants = get_benchmark_constants(width, height)
+    constants['map_generators'] = [[generator, 1]]
+
+    def run():
+        random.seed(seed)
+        player = Entity(0, 0, '@', libtcod.crimson, 'Player', blocks=True)
+        game_map = GameMap(width, height)
+        game_map.make_floor(constants, player, [player])
+
+    return time_case(run, repeat)
+
+
+def bench_fov(width, height, seed, repeat):
+    player, entities, game_map, constants = build_floor(width, height, 0, seed)
+
+    initialize_result = time_case(lambda: initialize_fov(game_map), repeat)
+
+    fov_map = initialize_fov(game_map)
+    recompute_result = time_case(lambda: recompute_fov(fov_map, player.x, player.y, constants['fov_radius'],
+                                                       constants['fov_light_walls'], constants['fov_algorithm']),
+                                 repeat)
+
+    return initialize_result, recompute_result
+
+
+def bench_render(width, height, seed, repeat):
+    player, entities, game_map, constants = build_floor(width, height, 0, seed)
+
+    message_log = MessageLog(constants['message_x'], constants['message_width'], constants['message_height'])
+
+    session = GameSession(player, entities, game_map, message_log, None, constants)
+    session.update_fov()
+
+    # Everything is drawn to off-screen consoles, including the "root" the map and panel are blitted to
+    root = libtcod.console_new(constants['screen_width'], constants['screen_height'])
+    con = libtcod.console_new(constants['screen_width'], constants['screen_height'])
+    panel = libtcod.console_new(constants['screen_width'], constants['panel_height'])
+
+    mouse = libtcod.Mouse()
+
+    def run():
+        render_all(con, panel, entities, player, game_map, session.fov_map, True, message_log,
+                   constants['screen_width'], constants['screen_height'], constants['bar_width'],
+                   constants['panel_height'], constants['panel_y'], mouse, constants['colors'],
+                   session.game_state, root=root)
+
+    result = time_case(run, repeat)
+    session.close()
+
+    return result
+
+
+def bench_move_astar(width, height, monsters, seed, repeat):
+    player, entities, game_map, constants = build_floor(width, height, 0, seed)
+
+    # The searching monsters are put on free tiles a few steps to a little over a path's length away from the
+    # player, so the same searches are made whatever the size of the map
+    game_map.update_flow_map(player.x, player.y)
+    walking_distance = game_map.flow_map // 2
+
+    xs, ys = np.nonzero((walking_distance >= 2) & (walking_distance <= 30))
+    tiles = [(x, y) for (x, y) in zip(xs.tolist(), ys.tolist())
+             if not game_map.entity_index.get_entities_at(x, y)]
+
+    random.seed(seed)
+    starts = random.sample(tiles, min(monsters, len(tiles)))
+
+    actors = []
+    for (x, y) in starts:
+        monster = Entity(x, y, 's', libtcod.desaturated_green, 'Ragged Sailor', blocks=True,
+                         render_order=RenderOrder.ACTOR, fighter=Fighter(hp=15, defense=1, power=4, xp=35),
+                         ai=BasicMonster())
+        entities.append(monster)
+        actors.append(monster)
+
+    def setup():
+        for monster, (x, y) in zip(actors, starts):
+            monster.x, monster.y = x, y
+
+        game_map.initialize_entity_index(entities)
+        game_map.initialize_path_map(entities)
+
+    def run():
+        # Every monster searches once, whether the player can see it or not
+        for entity in actors:
+            entity.move_astar(player, entities, game_map)
+
+    return time_case(run, repeat, setup)
+
+
+def bench_enemy_turn(width, height, monsters, seed, repeat):
+    player, entities, game_map, constants = build_floor(width, height, monsters, seed)
+
+    # Nothing blocks sight and there is no limit to how far the player sees, so every monster is awake
+    game_map.tiles.block_sight[:] = False
+    game_map.tiles_changed()
+    constants['fov_radius'] = 0
+
+    message_log = MessageLog(constants['message_x'], constants['message_width'], constants['message_height'])
+
+    session = GameSession(player, entities, game_map, message_log, None, constants)
+
+    result = time_case(lambda: session.step({'wait': True}), repeat)
+    session.close()
+
+    return result
+
+
+def run_benchmarks(sizes, entity_counts, seed, repeat):
+    results = {}
+
+    for (width, height) in sizes:
+        size = '{0}x{1}'.format(width, height)
+
+        results['make_map[{0}]'.format(size)] = bench_make_map(width, height, seed, repeat)
+        results['make_map[{0},caves]'.format(size)] = bench_make_map(width, height, seed, repeat, 'caves')
+        results['make_map[{0},bsp]'.format(size)] = bench_make_map(width, height, seed, repeat, 'bsp')
+
+        initialize_result, recompute_result = bench_fov(width, height, seed, repeat)
+        results['initialize_fov[{0}]'.format(size)] = initialize_result
+        results['recompute_fov[{0}]'.format(size)] = recompute_result
+
+        results['render_all[{0}]'.format(size)] = bench_render(width, height, seed, repeat)
+
+        for monsters in entity_counts:
+            case = '{0},{1} monsters'.format(size, monsters)
+
+            results['move_astar[{0}]'.format(case)] = bench_move_astar(width, height, monsters, seed, repeat)
+            results['enemy_turn[{0}]'.format(case)] = bench_enemy_turn(width, height, monsters, seed, repeat)
+
+        print('{0} done'.format(size), file=sys.stderr)
+
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+
+    for name, baseline_result in sorted(baseline['results'].items()):
+        result = results.get(name)
+
+        if result is None:
+            continue
+
+        ratio = result['median'] / baseline_result['median'] if baseline_result['median'] else 1.0
+        status = 'REGRESSION' if ratio > 1.0 + tolerance else 'ok'
+
+        print('{0:<48} {1:>10.3f} ms {2:>10.3f} ms {3:>7.2f}x  {4}'.format(
+            name, baseline_result['median'] * 1000, result['median'] * 1000, ratio, status))
+
+        if status == 'REGRESSION':
+            regressions.append(name)
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the game headless.')
+    parser.add_argument('--sizes', default='100x50,250x250,500x500',
+                        help='comma separated map sizes, e.g. 100x50,500x500')
+    parser.add_argument('--entities', default='0,50,200', help='comma separated extra monster counts')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against this results file (default: benchmarks/baseline.json '
+                                           'if it exists)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--no-compare', action='store_true', help='only report the results, without a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline before failing (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    baseline_path = args.baseline or DEFAULT_BASELINE
+    compare = not (args.save_baseline or args.no_compare)
+
+    if compare and not os.path.isfile(baseline_path):
+        print('No baseline at {0}; make one with --save-baseline first, or pass --no-compare'.format(baseline_path),
+              file=sys.stderr)
+
+        return 2
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    entity_counts = [int(count) for count in args.entities.split(',')]
+
+    results = run_benchmarks(sizes, entity_counts, args.seed, args.repeat)
+
+    report = {
+        'meta': {
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'tcod': libtcod.__version__
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2, sort_keys=True)
+
+        return 0
+
+    if not compare:
+        if not args.output:
+            print(json.dumps(report, indent=2, sort_keys=True))
+
+        return 0
+
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+
+    if regressions:
+        print('{0} benchmark(s) slower than the baseline: {1}'.format(len(regressions), ', '.join(regressions)))
+
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,9 @@ from random import randint
 from game_messages import Message
 
 class BasicMonster:
+    # Does nothing while out of the player's sight
+    acts_in_view_only = True
+
     def take_turn(self, target, fov_map, game_map, entities):
         results = []
 
@@ -12,7 +15,10 @@ class BasicMonster:
         if libtcod.map_is_in_fov(fov_map, monster.x, monster.y):
 
             if monster.distance_to(target) >= 2:
-                monster.move_astar(target, entities, game_map)
+                if game_map.flow_map is not None:
+                    monster.move_along_flow_map(target, entities, game_map)
+                else:
+                    monster.move_astar(target, entities, game_map)
 
             elif target.fighter.hp > 0:
                 attack_results = monster.fighter.attack(target)
@@ -1,172 +1,115 @@
 from equipment_slots import EquipmentSlots
 
 
-class Equipment:
-    def __init__(self, main_hand=None, off_hand=None, head=None, torso=None, legs=None, hands=None, feet=None):
-        self.main_hand = main_hand
-        self.off_hand = off_hand
-        self.head = head
-        self.torso = torso
-        self.legs = legs
-        self.hands = hands
-        self.feet = feet
+# The slots something can be equipped in, with the attribute each one is also reachable by
+EQUIPMENT_SLOTS = [
+    (EquipmentSlots.MAIN_HAND, 'main_hand'),
+    (EquipmentSlots.OFF_HAND, 'off_hand'),
+    (EquipmentSlots.HEAD, 'head'),
+    (EquipmentSlots.TORSO, 'torso'),
+    (EquipmentSlots.LEGS, 'legs'),
+    (EquipmentSlots.HANDS, 'hands'),
+    (EquipmentSlots.FEET, 'feet')
+]
 
-    @property
-    def max_hp_bonus(self):
-        bonus = 0
 
-        if self.main_hand and self.main_hand.equippable:
-            bonus += self.main_hand.equippable.max_hp_bonus
+def slot_property(slot):
+    def get_slot(self):
+        return self.slots[slot]
 
-        if self.off_hand and self.off_hand.equippable:
-            bonus += self.off_hand.equippable.max_hp_bonus
+    def set_slot(self, equippable_entity):
+        self.slots[slot] = equippable_entity
+        self.bonuses = None
 
-        if self.head and self.head.equippable:
-            bonus += self.head.equippable.max_hp_bonus
+    return property(get_slot, set_slot)
 
-        if self.torso and self.torso.equippable:
-            bonus += self.torso.equippable.max_hp_bonus
 
-        if self.legs and self.legs.equippable:
-            bonus += self.legs.equippable.max_hp_bonus
-
-        if self.hands and self.hands.equippable:
-            bonus += self.hands.equippable.max_hp_bonus
-
-        if self.feet and self.feet.equippable:
-            bonus += self.feet.equippable.max_hp_bonus
+class Equipment:
+    def __init__(self, main_hand=None, off_hand=None, head=None, torso=None, legs=None, hands=None, feet=None):
+        self.slots = {
+            EquipmentSlots.MAIN_HAND: main_hand,
+            EquipmentSlots.OFF_HAND: off_hand,
+            EquipmentSlots.HEAD: head,
+            EquipmentSlots.TORSO: torso,
+            EquipmentSlots.LEGS: legs,
+            EquipmentSlots.HANDS: hands,
+            EquipmentSlots.FEET: feet
+        }
+
+        # (max hp, power, defense) of everything equipped, worked out again after anything is equipped or removed
+        self.bonuses = None
+
+    def __setstate__(self, state):
+        # Equipment pickled before the slots were kept in a dict had an attribute per slot
+        if 'slots' not in state:
+            state['slots'] = {slot: state.pop(name, None) for slot, name in EQUIPMENT_SLOTS}
+
+        state['bonuses'] = None
+        self.__dict__.update(state)
+
+    main_hand = slot_property(EquipmentSlots.MAIN_HAND)
+    off_hand = slot_property(EquipmentSlots.OFF_HAND)
+    head = slot_property(EquipmentSlots.HEAD)
+    torso = slot_property(EquipmentSlots.TORSO)
+    legs = slot_property(EquipmentSlots.LEGS)
+    hands = slot_property(EquipmentSlots.HANDS)
+    feet = slot_property(EquipmentSlots.FEET)
+
+    def get_bonuses(self):
+        if self.bonuses is None:
+            max_hp_bonus = power_bonus = defense_bonus = 0
+
+            for equipped in self.slots.values():
+                if equipped and equipped.equippable:
+                    max_hp_bonus += equipped.equippable.max_hp_bonus
+                    power_bonus += equipped.equippable.power_bonus
+                    defense_bonus += equipped.equippable.defense_bonus
+
+            self.bonuses = (max_hp_bonus, power_bonus, defense_bonus)
+
+        return self.bonuses
 
-        return bonus
+    @property
+    def max_hp_bonus(self):
+        return self.get_bonuses()[0]
 
     @property
     def power_bonus(self):
-        bonus = 0
-
-        if self.main_hand and self.main_hand.equippable:
-            bonus += self.main_hand.equippable.power_bonus
-
-        if self.off_hand and self.off_hand.equippable:
-            bonus += self.off_hand.equippable.power_bonus
-
-        if self.head and self.head.equippable:
-            bonus += self.head.equippable.power_bonus
-
-        if self.torso and self.torso.equippable:
-            bonus += self.torso.equippable.power_bonus
-
-        if self.legs and self.legs.equippable:
-            bonus += self.legs.equippable.power_bonus
-
-        if self.hands and self.hands.equippable:
-            bonus += self.hands.equippable.power_bonus
-
-        if self.feet and self.feet.equippable:
-            bonus += self.feet.equippable.power_bonus
-
-        return bonus
+        return self.get_bonuses()[1]
 
     @property
     def defense_bonus(self):
-        bonus = 0
-
-        if self.main_hand and self.main_hand.equippable:
-            bonus += self.main_hand.equippable.defense_bonus
-
-        if self.off_hand and self.off_hand.equippable:
-            bonus += self.off_hand.equippable.defense_bonus
+        return self.get_bonuses()[2]
 
-        if self.head and self.head.equippable:
-            bonus += self.head.equippable.defense_bonus
+    def get_slot(self, equippable_entity):
+        # The slot the entity is equipped in, or None. It can only be in the slot its equippable is for
+        slot = equippable_entity.equippable.slot if equippable_entity.equippable else None
 
-        if self.torso and self.torso.equippable:
-            bonus += self.torso.equippable.defense_bonus
+        return slot if self.slots.get(slot) is equippable_entity else None
 
-        if self.legs and self.legs.equippable:
-            bonus += self.legs.equippable.defense_bonus
+    def is_equipped(self, equippable_entity):
+        return self.get_slot(equippable_entity) is not None
 
-        if self.hands and self.hands.equippable:
-            bonus += self.hands.equippable.defense_bonus
+    def toggle_equip(self, equippable_entity):
+        results = []
 
-        if self.feet and self.feet.equippable:
-            bonus += self.feet.equippable.defense_bonus
+        slot = equippable_entity.equippable.slot
 
-        return bonus
+        if slot not in self.slots:
+            return results
 
+        equipped = self.slots[slot]
 
-    def toggle_equip(self, equippable_entity):
-        results = []
+        if equipped == equippable_entity:
+            self.slots[slot] = None
+            results.append({'dequipped': equippable_entity})
+        else:
+            if equipped:
+                results.append({'dequipped': equipped})
 
-        slot = equippable_entity.equippable.slot
+            self.slots[slot] = equippable_entity
+            results.append({'equipped': equippable_entity})
 
-        if slot == EquipmentSlots.MAIN_HAND:
-            if self.main_hand == equippable_entity:
-                self.main_hand = None
-                results.append({' dequipped': equippable_entity})
-            else:
-                if self.main_hand:
-                    results.append({'dequipped': self.main_hand})
-
-                self.main_hand = equippable_entity
-                results.append({'equipped': equippable_entity})
-        elif slot == EquipmentSlots.OFF_HAND:
-            if self.off_hand == equippable_entity:
-                self.off_hand = None
-                results.append({'dequipped': equippable_entity})
-            else:
-                if self.off_hand:
-                    results.append({'dequipped': self.off_hand})
-
-                self.off_hand = equippable_entity
-                results.append({'equipped': equippable_entity})
-        elif slot == EquipmentSlots.HEAD:
-            if self.head == equippable_entity:
-                self.head = None
-                results.append({'dequipped': equippable_entity})
-            else:
-                if self.head:
-                    results.append({'dequipped': self.head})
-
-                self.head = equippable_entity
-                results.append({'equipped': equippable_entity})
-        elif slot == EquipmentSlots.TORSO:
-            if self.torso == equippable_entity:
-                self.torso = None
-                results.append({'dequipped': equippable_entity})
-            else:
-                if self.torso:
-                    results.append({'dequipped': self.torso})
-
-                self.torso = equippable_entity
-                results.append({'equipped': equippable_entity})
-        elif slot == EquipmentSlots.LEGS:
-            if self.legs == equippable_entity:
-                self.legs = None
-                results.append({'dequipped': equippable_entity})
-            else:
-                if self.legs:
-                    results.append({'dequipped': self.legs})
-
-                self.legs = equippable_entity
-                results.append({'equipped': equippable_entity})
-        elif slot == EquipmentSlots.HANDS:
-            if self.hands == equippable_entity:
-                self.hands = None
-                results.append({'dequipped': equippable_entity})
-            else:
-                if self.hands:
-                    results.append({'dequipped': self.hands})
-
-                self.hands = equippable_entity
-                results.append({'equipped': equippable_entity})
-        elif slot == EquipmentSlots.FEET:
-            if self.feet == equippable_entity:
-                self.feet = None
-                results.append({'dequipped': equippable_entity})
-            else:
-                if self.feet:
-                    results.append({'dequipped': self.feet})
-
-                self.feet = equippable_entity
-                results.append({'equipped': equippable_entity})
+        self.bonuses = None
 
         return results
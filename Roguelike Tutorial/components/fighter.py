@@ -1,41 +1,107 @@
 import tcod as libtcod
 
+from entity_store import stored_attribute
+
 from game_messages import Message
 
 
+class Modifier:
+    """
+    A change to a fighter's stats from something other than their equipment, like a status effect or an aura.
+    """
+    def __init__(self, max_hp=0, power=0, defense=0, source=None):
+        self.max_hp = max_hp
+        self.power = power
+        self.defense = defense
+        self.source = source
+
+
 class Fighter:
+    # Kept in the entity store's arrays while the fighter's owner is in one
+    hp = stored_attribute('hp')
+    base_max_hp = stored_attribute('base_max_hp')
+    base_power = stored_attribute('base_power')
+    base_defense = stored_attribute('base_defense')
+
     def __init__(self, hp, defense, power, xp=0):
+        # Set by the entity store
+        self.store = None
+        self.store_id = None
+
         self.base_max_hp = hp
         self.hp = hp
         self.base_defense = defense
         self.base_power = power
         self.xp = xp
 
+        self.modifiers = []
+
+        # (max hp, power, defense) of all the modifiers, worked out again when one is added or removed
+        self.modifier_bonuses = (0, 0, 0)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+
+        if self.store is not None:
+            state['_hp'] = self.hp
+            state['_base_max_hp'] = self.base_max_hp
+            state['_base_power'] = self.base_power
+            state['_base_defense'] = self.base_defense
+            state['store'] = None
+            state['store_id'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        # Fighters pickled before modifiers were added, or before the entity store
+        state.setdefault('modifiers', [])
+        state.setdefault('modifier_bonuses', (0, 0, 0))
+
+        for name in ('hp', 'base_max_hp', 'base_power', 'base_defense'):
+            if name in state:
+                state['_' + name] = state.pop(name)
+
+        state.setdefault('store', None)
+        state.setdefault('store_id', None)
+        self.__dict__.update(state)
+
+    def add_modifier(self, modifier):
+        self.modifiers.append(modifier)
+        self.update_modifier_bonuses()
+
+    def remove_modifier(self, modifier):
+        self.modifiers.remove(modifier)
+        self.update_modifier_bonuses()
+
+    def update_modifier_bonuses(self):
+        self.modifier_bonuses = (sum(modifier.max_hp for modifier in self.modifiers),
+                                 sum(modifier.power for modifier in self.modifiers),
+                                 sum(modifier.defense for modifier in self.modifiers))
+
+    def get_bonuses(self):
+        # Both the equipment and the modifier totals are cached, so no slots are walked here
+        if not (self.owner and self.owner.equipment):
+            return self.modifier_bonuses
+
+        equipment_bonuses = self.owner.equipment.get_bonuses()
+
+        if not self.modifiers:
+            return equipment_bonuses
+
+        return (equipment_bonuses[0] + self.modifier_bonuses[0], equipment_bonuses[1] + self.modifier_bonuses[1],
+                equipment_bonuses[2] + self.modifier_bonuses[2])
+
     @property
     def max_hp(self):
-        if self.owner and self.owner.equipment:
-            bonus = self.owner.equipment.max_hp_bonus
-        else:
-            bonus = 0
-
-        return self.base_max_hp + bonus
+        return self.base_max_hp + self.get_bonuses()[0]
 
     @property
     def power(self):
-        if self.owner and self.owner.equipment:
-            bonus = self.owner.equipment.power_bonus
-        else:
-            bonus = 0
-
-        return self.base_power + bonus
+        return self.base_power + self.get_bonuses()[1]
 
     @property
     def defense(self):
-        if self.owner and self.owner.equipment:
-            bonus = self.owner.equipment.defense_bonus
-        else: bonus = 0
-
-        return self.base_defense + bonus
+        return self.base_defense + self.get_bonuses()[2]
 
     def take_damage(self, amount):
         results = []
@@ -59,8 +59,8 @@ class Inventory:
     def drop_item(self, item):
         results = []
 
-        if self.owner.equipment.main_hand == item or self.owner.equipment.off_hand == item or self.owner.equipment.head == item or self.owner.equipment.torso == item or self.owner.equipment.legs == item or self.owner.equipment.hands == item or self.owner.equipment.feet == item:
-                self.owner.equipment.toggle_equip(item)
+        if self.owner.equipment.is_equipped(item):
+            self.owner.equipment.toggle_equip(item)
 
         item.x = self.owner.x
         item.y = self.owner.y
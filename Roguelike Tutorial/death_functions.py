@@ -12,7 +12,7 @@ def kill_player(player):
     return Message('You Died!', libtcod.red), GameStates.PLAYER_DEAD
 
 
-def kill_monster(monster):
+def kill_monster(monster, game_map=None):
     death_message = Message('{0} is dead!'.format(monster.name.capitalize()), libtcod.orange)
 
     monster.char = '%'
@@ -23,4 +23,11 @@ def kill_monster(monster):
     monster.name = 'remains of ' + monster.name
     monster.render_order = RenderOrder.CORPSE
 
+    if game_map:
+        game_map.set_occupied(monster.x, monster.y, False)
+        game_map.entity_index.touch(monster)
+
+        if game_map.actor_scheduler is not None:
+            game_map.actor_scheduler.remove(monster)
+
     return death_message
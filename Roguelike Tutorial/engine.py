@@ -1,267 +1,118 @@
 import tcod as libtcod
 
-from death_functions import kill_monster, kill_player
-from entity import get_blocking_entities_at_location
-from fov_functions import initialize_fov, recompute_fov
-from game_messages import Message
+from frame_limiter import FrameLimiter
+from game_session import GameSession
 from game_states import GameStates
 from input_handlers import handle_keys, handle_mouse, handle_main_menu
 from loader_functions.initialize_new_game import get_constants, get_game_variables
 from loader_functions.data_loaders import load_game, save_game
 from menus import main_menu, message_box
-from render_functions import clear_all, render_all
+from phase_timer import NullPhaseTimer, PhaseTimer
+from render_functions import RenderTracker, render_all, render_timings
 
 
-def play_game(player, entities, game_map, message_log, game_state, con, panel, constants):
-    fov_recompute = True
+def get_frame_limiter(constants):
+    return FrameLimiter(constants['max_fps'], constants['event_timeout'], constants['show_loop_stats'])
 
-    fov_map = initialize_fov(game_map)
 
-    key = libtcod.Key()
-    mouse = libtcod.Mouse()
-
-    game_state = GameStates.PLAYERS_TURN
-    previous_game_state = game_state
+def get_phase_timer(constants, timings=False):
+    # timings turns timing on even if the constants leave it off
+    if timings or constants['phase_timings'] or constants['phase_trace_file']:
+        return PhaseTimer(constants['phase_timing_window'], constants['phase_trace_file'])
 
-    targeting_item = None
+    return NullPhaseTimer()
 
-    while not libtcod.console_is_window_closed():
-        libtcod.sys_check_for_event(libtcod.EVENT_KEY_PRESS | libtcod.EVENT_MOUSE, key, mouse)
-
-        if fov_recompute:
-            recompute_fov(fov_map, player.x, player.y, constants['fov_radius'], constants['fov_light_walls'],
-                          constants['fov_algorithm'])
-
-        render_all(con, panel, entities, player, game_map, fov_map, fov_recompute, message_log,
-                   constants['screen_width'], constants['screen_height'], constants['bar_width'],
-                   constants['panel_height'], constants['panel_y'], mouse, constants['colors'], game_state)
-
-        fov_recompute = False
-
-        libtcod.console_flush()
-
-        clear_all(con, entities)
-
-        action = handle_keys(key, game_state)
-        mouse_action = handle_mouse(mouse)
-
-        move = action.get('move')
-        wait = action.get('wait')
-        pickup = action.get('pickup')
-        show_inventory = action.get('show_inventory')
-        drop_inventory = action.get('drop_inventory')
-        inventory_index = action.get('inventory_index')
-        take_stairs = action.get('take_stairs')
-        level_up = action.get('level_up')
-        show_character_screen = action.get('show_character_screen')
-        exit = action.get('exit')
-        fullscreen = action.get('fullscreen')
-
-        left_click = mouse_action.get('left_click')
-        right_click = mouse_action.get('right_click')
-
-        player_turn_results = []
-
-        if move and game_state == GameStates.PLAYERS_TURN:
-            dx, dy = move
-            destination_x = player.x + dx
-            destination_y = player.y + dy
-
-            if not game_map.is_blocked(destination_x, destination_y):
-                target = get_blocking_entities_at_location(entities, destination_x, destination_y)
-
-                if target:
-                    attack_results = player.fighter.attack(target)
-                    player_turn_results.extend(attack_results)
-                else:
-                    player.move(dx, dy)
-
-                    fov_recompute = True
-
-                game_state = GameStates.ENEMY_TURN
-
-        elif wait:
-            game_state = GameStates.ENEMY_TURN
-
-        elif pickup and game_state == GameStates.PLAYERS_TURN:
-            for entity in entities:
-                if entity.item and entity.x == player.x and entity.y == player.y:
-                    pickup_results = player.inventory.add_item(entity)
-                    player_turn_results.extend(pickup_results)
-
-                    break
-            else:
-                message_log.add_message(Message('There is nothing here to pick up.', libtcod.yellow))
-
-        if show_inventory:
-            previous_game_state = game_state
-            game_state = GameStates.SHOW_INVENTORY
-
-        if drop_inventory:
-            previous_game_state = game_state
-            game_state = GameStates.DROP_INVENTORY
-
-        if inventory_index is not None and previous_game_state != GameStates.PLAYER_DEAD and inventory_index < len(
-                player.inventory.items):
-            item = player.inventory.items[inventory_index]
-
-            if game_state == GameStates.SHOW_INVENTORY:
-                player_turn_results.extend(player.inventory.use(item, entities=entities, fov_map=fov_map))
-            elif game_state == GameStates.DROP_INVENTORY:
-                player_turn_results.extend(player.inventory.drop_item(item))
-
-        if take_stairs and game_state == GameStates.PLAYERS_TURN:
-            for entity in entities:
-                if entity in entities:
-                    if entity.stairs and entity.x == player.x and entity.y == player.y:
-                        entities = game_map.next_floor(player, message_log, constants)
-                        fov_map = initialize_fov(game_map)
-                        fov_recompute = True
-                        libtcod.console_clear(con)
-
-                        break
-            else:
-                message_log.add_message(Message('There are no stairs here.', libtcod.yellow))
-
-        if level_up:
-            if level_up == 'hp':
-                player.fighter.base_max_hp += 20
-                player.fighter.hp += 20
-            elif level_up == 'str':
-                player.fighter.base_power += 1
-            elif level_up == 'def':
-                player.fighter.base_defense += 1
-
-            game_state = previous_game_state
-
-        if show_character_screen:
-            previous_game_state = game_state
-            game_state = GameStates.CHARACTER_SCREEN
-
-        if game_state == GameStates.TARGETING:
-            if left_click:
-                target_x, target_y = left_click
-
-                item_use_results = player.inventory.use(targeting_item, entities=entities, fov_map=fov_map,
-                                                        target_x=target_x, target_y=target_y)
-                player_turn_results.extend(item_use_results)
-            elif right_click:
-                player_turn_results.append({'targeting_cancelled': True})
-
-        if exit:
-            if game_state in (GameStates.SHOW_INVENTORY, GameStates.DROP_INVENTORY, GameStates.CHARACTER_SCREEN):
-                game_state = previous_game_state
-            elif game_state == GameStates.TARGETING:
-                player_turn_results.append({'targeting_cancelled': True})
-            else:
-                save_game(player, entities, game_map, message_log, game_state)
 
-                return True
+def play_game(player, entities, game_map, message_log, game_state, con, panel, constants, limiter=None):
+    session = GameSession(player, entities, game_map, message_log, game_state, constants)
+    session.timer = get_phase_timer(constants)
 
-        if fullscreen:
-            libtcod.console_set_fullscreen(not libtcod.console_is_fullscreen())
+    if limiter is None:
+        limiter = get_frame_limiter(constants)
 
-        for player_turn_result in player_turn_results:
-            message = player_turn_result.get('message')
-            dead_entity = player_turn_result.get('dead')
-            item_added = player_turn_result.get('item_added')
-            item_consumed = player_turn_result.get('consumed')
-            item_dropped = player_turn_result.get('item_dropped')
-            equip = player_turn_result.get('equip')
-            targeting = player_turn_result.get('targeting')
-            targeting_cancelled = player_turn_result.get('targeting_cancelled')
-            xp = player_turn_result.get('xp')
+    try:
+        return run_game_loop(session, con, panel, constants, limiter)
+    finally:
+        session.timer.close()
+        session.close()
 
-            if message:
-                message_log.add_message(message)
 
-            if dead_entity:
-                if dead_entity == player:
-                    message, game_state = kill_player(dead_entity)
-                else:
-                    message = kill_monster(dead_entity)
+def run_game_loop(session, con, panel, constants, limiter):
+    player = session.player
 
-                message_log.add_message(message)
-
-            if item_added:
-                entities.remove(item_added)
-
-                game_state = GameStates.ENEMY_TURN
+    key = libtcod.Key()
+    mouse = libtcod.Mouse()
 
-            if item_consumed:
-                game_state = GameStates.ENEMY_TURN
+    # Only what changed since the last frame gets drawn, and nothing is flushed if nothing changed
+    tracker = RenderTracker()
 
-            if item_dropped:
-                entities.append(item_dropped)
+    show_timings = False
 
-                game_state = GameStates.ENEMY_TURN
+    while not libtcod.console_is_window_closed():
+        # A frame runs from here to the end of the loop, and the timer is only swapped in between frames
+        timer = session.timer
 
-            if equip:
-                equip_results = player.equipment.toggle_equip(equip)
+        with timer.phase('fov'):
+            fov_recompute = session.update_fov()
 
-                for equip_result in equip_results:
-                    equipped = equip_result.get('equipped')
-                    dequipped = equip_result.get('dequipped')
+        with timer.phase('render'):
+            drawn = render_all(con, panel, session.entities, player, session.game_map, session.fov_map,
+                               fov_recompute, session.message_log, constants['screen_width'],
+                               constants['screen_height'], constants['bar_width'], constants['panel_height'],
+                               constants['panel_y'], mouse, constants['colors'], session.game_state, tracker=tracker)
 
-                    if equipped:
-                        message_log.add_message(Message('You equipped the {0}'.format(equipped.name)))
+            if show_timings:
+                render_timings(panel, timer, constants['screen_width'], constants['panel_height'],
+                               constants['panel_y'])
+                drawn = True
 
-                    if dequipped:
-                        message_log.add_message(Message('You dequipped the {0}'.format(dequipped.name)))
+        if drawn:
+            with timer.phase('flush'):
+                libtcod.console_flush()
 
-                game_state = GameStates.ENEMY_TURN
+            limiter.frame_drawn()
 
-            if targeting:
-                previous_game_state = GameStates.PLAYERS_TURN
-                game_state = GameStates.TARGETING
+        # Sleep until there is something to do
+        with timer.phase('idle'):
+            limiter.wait_for_event()
 
-                targeting_item = targeting
+        with timer.phase('input'):
+            libtcod.sys_check_for_event(libtcod.EVENT_KEY_PRESS | libtcod.EVENT_MOUSE, key, mouse)
 
-                message_log.add_message(targeting_item.item.targeting_message)
+            action = handle_keys(key, session.game_state)
+            mouse_action = handle_mouse(mouse)
 
-            if targeting_cancelled:
-                game_state = previous_game_state
+        if action.get('fullscreen'):
+            libtcod.console_set_fullscreen(not libtcod.console_is_fullscreen())
+            tracker.invalidate()
 
-                message_log.add_message(Message('Targeting cancelled'))
+        if action.get('show_timings'):
+            show_timings = not show_timings
 
-            if xp:
-                leveled_up = player.level.add_xp(xp)
-                message_log.add_message(Message('You gain {0} experience points.'.format(xp)))
+            # Draw the panel again without the timings
+            tracker.invalidate()
 
-                if leveled_up:
-                    message_log.add_message(Message(
-                        'Ye be getting stronger! Ye reached level {0}'.format(
-                        player.level.current_level) + '!', libtcod.yellow))
-                    previous_game_state = game_state
-                    game_state = GameStates.LEVEL_UP
+        with timer.phase('turn'):
+            results = session.step(action, mouse_action)
 
-        if game_state == GameStates.ENEMY_TURN:
-            for entity in entities:
-                if entity.ai:
-                    enemy_turn_results = entity.ai.take_turn(player, fov_map, game_map, entities)
+        for result in results:
+            if result.get('exit'):
+                save_game(player, session.entities, session.game_map, session.message_log, session.game_state)
 
-                    for enemy_turn_result in enemy_turn_results:
-                        message = enemy_turn_result.get('message')
-                        dead_entity = enemy_turn_result.get('dead')
+                return True
 
-                        if message:
-                            message_log.add_message(message)
+            if result.get('next_floor'):
+                libtcod.console_clear(con)
+                tracker.invalidate()
 
-                        if dead_entity:
-                            if dead_entity == player:
-                                message, game_state = kill_player(dead_entity)
-                            else:
-                                message = kill_monster(dead_entity)
+        timer.end_frame()
 
-                            message_log.add_message(message)
+        # Timing starts with the next frame if the overlay was turned on while it was off
+        if show_timings and not timer.enabled:
+            timer.close()
+            session.timer = get_phase_timer(constants, timings=True)
 
-                            if game_state == GameStates.PLAYER_DEAD:
-                                break
 
-                    if game_state == GameStates.PLAYER_DEAD:
-                        break
-            else:
-                game_state = GameStates.PLAYERS_TURN
 ## MAIN MENU
 def main():
     constants = get_constants()
@@ -287,17 +138,28 @@ def main():
     key = libtcod.Key()
     mouse = libtcod.Mouse()
 
-    while not libtcod.console_is_window_closed():
-        libtcod.sys_check_for_event(libtcod.EVENT_KEY_PRESS | libtcod.EVENT_MOUSE, key, mouse)
+    limiter = get_frame_limiter(constants)
+
+    # The menu is only drawn again when what it shows changes
+    redraw_menu = True
 
+    while not libtcod.console_is_window_closed():
         if show_main_menu:
-            main_menu(con, main_menu_background_image, constants['screen_width'],
-                      constants['screen_height'])
+            if redraw_menu:
+                main_menu(con, main_menu_background_image, constants['screen_width'],
+                          constants['screen_height'])
+
+                if show_load_error_message:
+                    message_box(con, 'No save game to load', 50, constants['screen_width'],
+                                constants['screen_height'])
+
+                libtcod.console_flush()
+                limiter.frame_drawn()
 
-            if show_load_error_message:
-                message_box(con, 'No save game to load', 50, constants['screen_width'], constants['screen_height'])
+                redraw_menu = False
 
-            libtcod.console_flush()
+            limiter.wait_for_event()
+            libtcod.sys_check_for_event(libtcod.EVENT_KEY_PRESS | libtcod.EVENT_MOUSE, key, mouse)
 
             action = handle_main_menu(key)
 
@@ -307,25 +169,36 @@ def main():
 
             if show_load_error_message and (new_game or load_saved_game or exit_game):
                 show_load_error_message = False
+                redraw_menu = True
             elif new_game:
                 player, entities, game_map, message_log, game_state = get_game_variables(constants)
                 game_state = GameStates.PLAYERS_TURN
 
+                # A new game starts a new history
+                if constants['message_history_file']:
+                    message_log.open_history(constants['message_history_file'])
+
                 show_main_menu = False
             elif load_saved_game:
                 try:
                     player, entities, game_map, message_log, game_state = load_game()
                     show_main_menu = False
+
+                    # The history is only picked up again if it was written by the same game
+                    if constants['message_history_file']:
+                        message_log.open_history(constants['message_history_file'])
                 except FileNotFoundError:
                     show_load_error_message = True
+                    redraw_menu = True
             elif exit_game:
                 break
 
         else:
             libtcod.console_clear(con)
-            play_game(player, entities, game_map, message_log, game_state, con, panel, constants)
+            play_game(player, entities, game_map, message_log, game_state, con, panel, constants, limiter)
 
             show_main_menu = True
+            redraw_menu = True
 
 
 if __name__ == '__main__':
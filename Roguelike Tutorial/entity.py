@@ -2,8 +2,12 @@ import tcod as libtcod
 
 import math
 
+import numpy as np
+
 from components.item import Item
 
+from entity_store import stored_attribute
+
 from render_functions import RenderOrder
 
 
@@ -11,8 +15,17 @@ class Entity:
     """
     A generic object to represent players, enemies, items, etc.
     """
+    # Kept in the entity store's arrays while the entity is in one
+    x = stored_attribute('x')
+    y = stored_attribute('y')
+    blocks = stored_attribute('blocks')
+
     def __init__(self, x, y, char, color, name, blocks=False, render_order=RenderOrder.CORPSE, fighter=None, ai=None,
                 item=None, inventory=None, stairs=None, level=None, equipment=None, equippable=None):
+        # The entity store the entity is in, if any, and its id there
+        self.store = None
+        self.store_id = None
+
         self.x = x
         self.y = y
         self.char = char
@@ -29,6 +42,9 @@ class Entity:
         self.equipment = equipment
         self.equippable = equippable
 
+        # The template the entity was spawned from, if any
+        self.template_id = None
+
         if self.fighter:
             self.fighter.owner = self
 
@@ -58,11 +74,65 @@ class Entity:
                 self.item = item
                 self.item.owner = self
 
-    def move(self, dx, dy):
+    def __getstate__(self):
+        # Pickled with its own values, so saves and other processes never see the store
+        state = self.__dict__.copy()
+
+        if self.store is not None:
+            state['_x'] = self.x
+            state['_y'] = self.y
+            state['_blocks'] = self.blocks
+            state['store'] = None
+            state['store_id'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        # Entities pickled before the entity store kept these attributes under their own names
+        for name in ('x', 'y', 'blocks', 'ai', 'fighter'):
+            if name in state:
+                state['_' + name] = state.pop(name)
+
+        state.setdefault('store', None)
+        state.setdefault('store_id', None)
+        self.__dict__.update(state)
+
+    @property
+    def ai(self):
+        return self._ai
+
+    @ai.setter
+    def ai(self, ai):
+        self._ai = ai
+
+        if self.store is not None:
+            self.store.attach_ai(self.store_id, ai)
+
+    @property
+    def fighter(self):
+        return self._fighter
+
+    @fighter.setter
+    def fighter(self, fighter):
+        # The fighter being replaced takes its stats back out of the store
+        if self.store is not None:
+            self.store.detach_fighter(self.store_id, self._fighter)
+
+        self._fighter = fighter
+
+        if self.store is not None:
+            self.store.attach_fighter(self.store_id, fighter)
+
+    def move(self, dx, dy, game_map=None):
         # Move the entity by a given amount
+        old_x, old_y = self.x, self.y
+
         self.x += dx
         self.y += dy
 
+        if game_map:
+            game_map.entity_moved(self, old_x, old_y)
+
     def move_towards(self, target_x, target_y, game_map, entities):
         dx = target_x - self.x
         dy = target_y - self.y
@@ -72,33 +142,29 @@ class Entity:
         dy = int(round(dy / distance))
 
         if not (game_map.is_blocked(self.x + dx, self.y + dy) or
-                    get_blocking_entities_at_location(entities, self.x + dx, self.y + dy)):
-            self.move(dx, dy)
+                    game_map.entity_index.get_blocking_entity_at(self.x + dx, self.y + dy)):
+            self.move(dx, dy, game_map)
 
     def distance(self, x, y):
         return math.sqrt((x - self.x) ** 2 + (y - self.y) ** 2)
 
     def move_astar(self, target, entities, game_map):
-        # Create a FOV map that has the dimensions of the map
-        fov = libtcod.map_new(game_map.width, game_map.height)
+        # Don't search when it can only fail because the target is walled off from self
+        if not game_map.is_reachable(self.x, self.y, target.x, target.y):
+            self.move_towards(target.x, target.y, game_map, entities)
 
-        # Scan the current map each turn and set all the walls as unwalkable
-        for y1 in range(game_map.height):
-            for x1 in range(game_map.width):
-                libtcod.map_set_properties(fov, x1, y1, not game_map.tiles[x1][y1].block_sight,
-                                           not game_map.tiles[x1][y1].blocked)
+            return
 
-        # Scan all the objects to see if there are objects that must be navigated around
-        # Check also that the object isn't self or the target (so that the start and the end points are free)
-        # The AI class handles the situation if self is next to the target so it will not use this A* function anyway
-        for entity in entities:
-            if entity.blocks and entity != self and entity != target:
-                # Set the tile as a wall so it must be navigated around
-                libtcod.map_set_properties(fov, entity.x, entity.y, True, False)
+        # The floor's path map already has walls and blocking entities set as unwalkable
+        walkable = game_map.path_map.walkable
+        my_path = game_map.path
 
-        # Allocate a A* path
-        # The 1.41 is the normal diagonal cost of moving, it can be set as 0.0 if diagonal moves are prohibited
-        my_path = libtcod.path_new_using_map(fov, 1.41)
+        # Clear self's and the target's tiles while the path is computed (so that the start and the end points are free)
+        # The AI class handles the situation if self is next to the target so it will not use this A* function anyway
+        start_walkable = walkable[self.y, self.x]
+        target_walkable = walkable[target.y, target.x]
+        walkable[self.y, self.x] = True
+        walkable[target.y, target.x] = True
 
         # Compute the path between self's coordinates and the target's coordinates
         libtcod.path_compute(my_path, self.x, self.y, target.x, target.y)
@@ -106,20 +172,41 @@ class Entity:
         # Check if the path exists, and in this case, also the path is shorter than 25 tiles
         # The path size matters if you want the monster to use alternative longer paths (for example through other rooms) if for example the player is in a corridor
         # It makes sense to keep path size relatively low to keep the monsters from running around the map if there's an alternative path really far away
-        if not libtcod.path_is_empty(my_path) and libtcod.path_size(my_path) < 25:
+        found_path = not libtcod.path_is_empty(my_path) and libtcod.path_size(my_path) < 25
+
+        if found_path:
             # Find the next coordinates in the computed full path
             x, y = libtcod.path_walk(my_path, True)
-            if x or y:
-                # Set self's coordinates to the next path tile
-                self.x = x
-                self.y = y
-        else:
+
+        walkable[self.y, self.x] = start_walkable
+        walkable[target.y, target.x] = target_walkable
+
+        if not found_path:
             # Keep the old move function as a backup so that if there are no paths (for example another monster blocks a corridor)
             # it will still try to move towards the player (closer to the corridor opening)
             self.move_towards(target.x, target.y, game_map, entities)
-
-            # Delete the path to free memory
-        libtcod.path_delete(my_path)
+        elif x or y:
+            # Step self onto the next path tile
+            self.move(x - self.x, y - self.y, game_map)
+
+    def move_along_flow_map(self, target, entities, game_map):
+        # Step to the neighbouring tile closest to the target on the floor's flow map
+        flow_map = game_map.flow_map
+
+        x1 = max(self.x - 1, 0)
+        y1 = max(self.y - 1, 0)
+        neighbours = flow_map[x1:self.x + 2, y1:self.y + 2]
+
+        best_x, best_y = np.unravel_index(np.argmin(neighbours), neighbours.shape)
+        x = x1 + int(best_x)
+        y = y1 + int(best_y)
+
+        if neighbours[best_x, best_y] >= flow_map[self.x, self.y] or \
+                game_map.entity_index.get_blocking_entity_at(x, y):
+            # No way downhill (another monster is in the way, or the target can't be reached), so search for a path
+            self.move_astar(target, entities, game_map)
+        else:
+            self.move(x - self.x, y - self.y, game_map)
 
     def distance_to(self, other):
         dx = other.x - self.x
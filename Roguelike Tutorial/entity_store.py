@@ -0,0 +1,178 @@
+import heapq
+
+import numpy as np
+
+
+class EntityStore:
+    """
+    Positions, blocking flags and combat stats of a floor's entities, kept in numpy arrays indexed by entity id so
+    they can be scanned all at once instead of one entity at a time.
+
+    An entity added to the store keeps working as before: its stored attributes (and its fighter's) are properties
+    that read and write the store's arrays while it is in a store. Removing it from the store puts the values back
+    on the entity.
+    """
+    def __init__(self, capacity=256):
+        self.capacity = 0
+        self.size = 0
+        self.free_ids = []
+
+        self.entities = []
+
+        self.active = np.zeros(0, dtype=bool)
+        self.x = np.zeros(0, dtype=np.int32)
+        self.y = np.zeros(0, dtype=np.int32)
+        self.blocks = np.zeros(0, dtype=bool)
+
+        # Whether the entity has an AI, and whether that AI only acts while the entity is in view
+        self.has_ai = np.zeros(0, dtype=bool)
+        self.acts_in_view_only = np.zeros(0, dtype=bool)
+
+        self.has_fighter = np.zeros(0, dtype=bool)
+        self.hp = np.zeros(0, dtype=np.int32)
+        self.base_max_hp = np.zeros(0, dtype=np.int32)
+        self.base_power = np.zeros(0, dtype=np.int32)
+        self.base_defense = np.zeros(0, dtype=np.int32)
+
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        for name in ('active', 'x', 'y', 'blocks', 'has_ai', 'acts_in_view_only', 'has_fighter', 'hp', 'base_max_hp',
+                     'base_power', 'base_defense'):
+            old_array = getattr(self, name)
+            new_array = np.zeros(capacity, dtype=old_array.dtype)
+            new_array[:len(old_array)] = old_array
+            setattr(self, name, new_array)
+
+        self.entities.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def add(self, entity):
+        if entity.store is not None:
+            if entity.store is self:
+                return
+
+            entity.store.remove(entity)
+
+        # Reuse the lowest free id, so the arrays stay as short as they can
+        if self.free_ids:
+            entity_id = heapq.heappop(self.free_ids)
+        else:
+            if self.size == self.capacity:
+                self.grow(self.capacity * 2)
+
+            entity_id = self.size
+            self.size += 1
+
+        self.entities[entity_id] = entity
+        self.active[entity_id] = True
+        self.x[entity_id] = entity.x
+        self.y[entity_id] = entity.y
+        self.blocks[entity_id] = entity.blocks
+
+        entity.store = self
+        entity.store_id = entity_id
+
+        self.attach_ai(entity_id, entity.ai)
+        self.attach_fighter(entity_id, entity.fighter)
+
+        return entity_id
+
+    def add_all(self, entities):
+        for entity in entities:
+            self.add(entity)
+
+    def remove(self, entity):
+        entity_id = entity.store_id
+
+        self.detach_fighter(entity_id, entity.fighter)
+
+        # Read the values back before the entity leaves the store
+        x, y, blocks = entity.x, entity.y, entity.blocks
+        entity.store = None
+        entity.store_id = None
+        entity.x, entity.y, entity.blocks = x, y, blocks
+
+        self.entities[entity_id] = None
+        self.active[entity_id] = False
+        self.has_ai[entity_id] = False
+        self.has_fighter[entity_id] = False
+        heapq.heappush(self.free_ids, entity_id)
+
+    def clear(self):
+        for entity_id in np.flatnonzero(self.active):
+            self.remove(self.entities[entity_id])
+
+    def attach_ai(self, entity_id, ai):
+        self.has_ai[entity_id] = ai is not None
+        self.acts_in_view_only[entity_id] = getattr(ai, 'acts_in_view_only', False)
+
+    def attach_fighter(self, entity_id, fighter):
+        if fighter is None:
+            self.has_fighter[entity_id] = False
+
+            return
+
+        self.has_fighter[entity_id] = True
+        self.hp[entity_id] = fighter.hp
+        self.base_max_hp[entity_id] = fighter.base_max_hp
+        self.base_power[entity_id] = fighter.base_power
+        self.base_defense[entity_id] = fighter.base_defense
+
+        fighter.store = self
+        fighter.store_id = entity_id
+
+    def detach_fighter(self, entity_id, fighter):
+        if fighter is None or fighter.store is not self:
+            return
+
+        hp, base_max_hp, base_power, base_defense = (fighter.hp, fighter.base_max_hp, fighter.base_power,
+                                                     fighter.base_defense)
+        fighter.store = None
+        fighter.store_id = None
+        fighter.hp, fighter.base_max_hp, fighter.base_power, fighter.base_defense = (hp, base_max_hp, base_power,
+                                                                                     base_defense)
+
+        self.has_fighter[entity_id] = False
+
+    def get_entities(self, mask):
+        return [self.entities[entity_id] for entity_id in np.flatnonzero(mask)]
+
+    def get_entities_at(self, x, y):
+        return self.get_entities(self.active & (self.x == x) & (self.y == y))
+
+    def get_entities_in_radius(self, x, y, radius):
+        return self.get_entities(self.active & ((self.x - x) ** 2 + (self.y - y) ** 2 <= radius ** 2))
+
+    def get_acting_entities(self, fov_map):
+        # Entities whose AI has something to do this turn: those in view, and those whose AI acts anywhere.
+        # They come back in id order. An entity that took over a freed id comes before the ones added earlier,
+        # so this is only the entity list order for entities added while no id was free (as a floor's monsters are)
+        size = self.size
+        x = self.x[:size]
+        y = self.y[:size]
+
+        in_view = np.zeros(size, dtype=bool)
+        in_view[self.active[:size]] = fov_map.fov[y[self.active[:size]], x[self.active[:size]]]
+
+        return self.get_entities(self.has_ai[:size] & (in_view | ~self.acts_in_view_only[:size]))
+
+
+def stored_attribute(name):
+    # An attribute kept on the object itself, or in the store's array of the same name while the object is in an
+    # entity store. The object needs store and store_id attributes
+    private_name = '_' + name
+
+    def get_value(self):
+        if self.store is None:
+            return self.__dict__[private_name]
+
+        return getattr(self.store, name)[self.store_id].item()
+
+    def set_value(self, value):
+        if self.store is None:
+            self.__dict__[private_name] = value
+        else:
+            getattr(self.store, name)[self.store_id] = value
+
+    return property(get_value, set_value)
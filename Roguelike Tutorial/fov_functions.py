@@ -1,15 +1,103 @@
 import tcod as libtcod
 
+import numpy as np
+
+from collections import OrderedDict
+
+
+class FovCache:
+    """
+    Fields of view already computed on a map, keyed by the origin, radius and algorithm they were computed with.
+    Each one is kept as the packed bits of the box around the origin that the radius can reach. The least
+    recently used entries are dropped first, and everything is dropped when the map's version changes.
+
+    Only the box written last is cleared when a cached view is put back, so the fov map should only be
+    computed through the cache.
+    """
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.map_version = None
+
+        # The box of the fov map holding the last view, or None for the whole map
+        self.last_box = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, fov_map, key, map_version):
+        if map_version != self.map_version:
+            self.entries.clear()
+            self.map_version = map_version
+            self.last_box = None
+
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+
+            return False
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        box, bits = entry
+
+        # The fov map's arrays are strided views, so clearing only what was visible is much cheaper
+        if self.last_box is None:
+            fov_map.fov[:] = False
+        else:
+            top, left, height, width = self.last_box
+            fov_map.fov[top:top + height, left:left + width] = False
+
+        top, left, height, width = box
+        fov_map.fov[top:top + height, left:left + width] = \
+            np.unpackbits(bits, count=height * width).reshape(height, width).view(bool)
+
+        self.last_box = box
+
+        return True
+
+    def store(self, fov_map, key):
+        x, y, radius = key[:3]
+        map_height, map_width = fov_map.fov.shape
+
+        if radius > 0:
+            top, left = max(y - radius, 0), max(x - radius, 0)
+            height, width = min(y + radius + 1, map_height) - top, min(x + radius + 1, map_width) - left
+        else:
+            top, left, height, width = 0, 0, map_height, map_width
+
+        box = (top, left, height, width)
+        self.last_box = box
+
+        if self.max_entries <= 0:
+            return
+
+        self.entries[key] = (box, np.packbits(fov_map.fov[top:top + height, left:left + width], axis=None))
+
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
 
 def initialize_fov(game_map):
     fov_map = libtcod.map_new(game_map.width, game_map.height)
 
-    for y in range(game_map.height):
-        for x in range(game_map.width):
-            libtcod.map_set_properties(fov_map, x, y, not game_map.tiles[x][y].block_sight,
-                                      not game_map.tiles[x][y].blocked)
+    # The fov map is indexed [y, x] while the tiles are indexed [x, y]
+    fov_map.transparent[:] = ~game_map.tiles.block_sight.T
+    fov_map.walkable[:] = ~game_map.tiles.blocked.T
 
     return fov_map
 
-def recompute_fov(fov_map, x, y, radius, light_walls=True, algorithm=0):
+def recompute_fov(fov_map, x, y, radius, light_walls=True, algorithm=0, cache=None, map_version=None):
+    # Stepping back onto a tile the view was already computed from reuses the cached result
+    if cache is not None:
+        key = (x, y, radius, light_walls, algorithm)
+
+        if cache.load(fov_map, key, map_version):
+            return
+
     libtcod.map_compute_fov(fov_map, x, y, radius, light_walls, algorithm)
+
+    if cache is not None:
+        cache.store(fov_map, key)
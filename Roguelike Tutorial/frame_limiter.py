@@ -0,0 +1,70 @@
+import time
+
+try:
+    from tcod.cffi import ffi, lib
+except ImportError:
+    from tcod.loader import ffi, lib
+
+
+class FrameLimiter:
+    """
+    Paces a game loop. Instead of polling for input as fast as it can, the loop sleeps until an event arrives
+    (or the timeout runs out, so anything animated keeps moving) and never draws faster than max_fps.
+    Loop iterations and frames drawn are counted every second.
+    """
+    def __init__(self, max_fps=60, event_timeout=0.5, show_stats=False):
+        self.frame_time = 1.0 / max_fps if max_fps else 0.0
+        self.event_timeout = event_timeout
+        self.show_stats = show_stats
+
+        self.last_frame = 0.0
+
+        # Counts for the current second, and the totals of the last whole one
+        self.stats_start = time.perf_counter()
+        self.iterations = 0
+        self.frames = 0
+        self.idle_time = 0.0
+        self.stats = None
+
+    def frame_drawn(self):
+        self.last_frame = time.perf_counter()
+        self.frames += 1
+
+    def wait_for_event(self):
+        start = time.perf_counter()
+
+        # Don't draw again before the frame cap allows
+        delay = self.last_frame + self.frame_time - start
+        if delay > 0:
+            time.sleep(delay)
+
+        # The event is left on the queue for sys_check_for_event to pick up
+        if self.event_timeout is None:
+            lib.SDL_WaitEvent(ffi.NULL)
+        else:
+            lib.SDL_WaitEventTimeout(ffi.NULL, int(self.event_timeout * 1000))
+
+        now = time.perf_counter()
+        self.idle_time += now - start
+        self.iterations += 1
+
+        if now - self.stats_start >= 1.0:
+            self.update_stats(now)
+
+    def update_stats(self, now):
+        elapsed = now - self.stats_start
+
+        self.stats = {
+            'iterations': self.iterations / elapsed,
+            'frames': self.frames / elapsed,
+            'idle': self.idle_time / elapsed
+        }
+
+        if self.show_stats:
+            print('{0:.1f} loops/s, {1:.1f} frames/s, {2:.0%} idle'.format(
+                self.stats['iterations'], self.stats['frames'], self.stats['idle']))
+
+        self.stats_start = now
+        self.iterations = 0
+        self.frames = 0
+        self.idle_time = 0.0
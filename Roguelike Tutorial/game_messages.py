@@ -1,6 +1,11 @@
 import tcod as libtcod
 
 import textwrap
+import uuid
+
+from array import array
+from collections import deque
+from functools import lru_cache
 
 
 class Message:
@@ -9,21 +14,144 @@ class Message:
         self.color = color
 
 
+@lru_cache(maxsize=1024)
+def wrap_text(text, width):
+    # The same combat messages come up over and over, so their wrapped lines are kept
+    return tuple(textwrap.wrap(text, width))
+
+
+# The first line of a history file, naming the game it belongs to
+HISTORY_HEADER = '# history {0}\n'
+
+
+class MessageHistory:
+    """
+    Every line ever added to a message log, appended to a file as "RRGGBB text". The offset of each line is
+    kept in memory, so any stretch of the history can be read back without loading the rest.
+    """
+    def __init__(self, path, game_id):
+        self.path = path
+        self.file = open(path, 'a+b')
+
+        # A file left by another game is started over
+        header = HISTORY_HEADER.format(game_id).encode('utf-8')
+
+        self.file.seek(0)
+        if self.file.readline() != header:
+            self.file.truncate(0)
+            self.file.write(header)
+
+        self.offsets = array('Q')
+        self.end = len(header)
+
+        # Index the lines already in the file
+        self.file.seek(self.end)
+        for line in self.file:
+            self.offsets.append(self.end)
+            self.end += len(line)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, message):
+        color = message.color
+        data = '{0:02x}{1:02x}{2:02x} {3}\n'.format(color[0], color[1], color[2], message.text).encode('utf-8')
+
+        self.file.write(data)
+        self.offsets.append(self.end)
+        self.end += len(data)
+
+    def get_lines(self, start, count):
+        start = max(start, 0)
+        stop = min(start + count, len(self.offsets))
+
+        if start >= stop:
+            return []
+
+        end = self.offsets[stop] if stop < len(self.offsets) else self.end
+
+        self.file.flush()
+        self.file.seek(self.offsets[start])
+        data = self.file.read(end - self.offsets[start])
+
+        messages = []
+        for line in data.decode('utf-8').splitlines():
+            color = libtcod.Color(int(line[0:2], 16), int(line[2:4], 16), int(line[4:6], 16))
+            messages.append(Message(line[7:], color))
+
+        return messages
+
+    def close(self):
+        self.file.close()
+
+
 class MessageLog:
-    def __init__(self, x, width, height):
-        self.messages = []
+    def __init__(self, x, width, height, history=None):
+        # Only the last height lines are shown; older ones fall off the front
+        self.messages = deque(maxlen=height)
         self.x = x
         self.width = width
         self.height = height
 
+        # Where every line also goes, if the whole history is being kept, and the game the history belongs to
+        self.history = history
+        self.game_id = None
+
+        # Goes up with every message, so the renderer can tell when the log changed
+        self.version = 0
+
+    def __getstate__(self):
+        # The history is a file; it stays where it is
+        state = self.__dict__.copy()
+        state['history'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        # Logs pickled before the version counter, the history or the ring buffer were added
+        state.setdefault('version', 0)
+        state.setdefault('game_id', None)
+        state['history'] = None
+        state['messages'] = deque(state['messages'], maxlen=state['height'])
+        self.__dict__.update(state)
+
     def add_message(self, message):
+        self.version += 1
+
         # Split the message if necessary, among multiple lines
-        new_msg_lines = textwrap.wrap(message.text, self.width)
+        new_msg_lines = wrap_text(message.text, self.width)
 
         for line in new_msg_lines:
-            # If the buffer is full, remove the first line to make room for the new one
-            if len(self.messages) == self.height:
-                del self.messages[0]
+            # Add the new line as a Message object, with the text and the color. When the buffer is full the
+            # oldest line drops out
+            line_message = Message(line, message.color)
+            self.messages.append(line_message)
+
+            if self.history is not None:
+                self.history.append(line_message)
+
+    def history_length(self):
+        if self.history is None:
+            return len(self.messages)
+
+        return len(self.history)
+
+    def get_history(self, start, count):
+        # Lines start to start + count of everything logged, oldest first, for scrolling back through
+        if self.history is None:
+            return list(self.messages)[max(start, 0):max(start + count, 0)]
+
+        return self.history.get_lines(start, count)
+
+    def open_history(self, path):
+        # A log from a new game, or from a save made before histories were tied to games, gets a new id, so
+        # whatever history is in the file is not shown as its own
+        if self.game_id is None:
+            self.game_id = uuid.uuid4().hex
+
+        self.history = MessageHistory(path, self.game_id)
 
-            # Add the new line as a Message object, witht he text and the color
-            self.messages.append(Message(line, message.color))
+    def close_history(self):
+        if self.history is not None:
+            self.history.close()
+            self.history = None
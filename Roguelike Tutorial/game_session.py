@@ -0,0 +1,354 @@
+import tcod as libtcod
+
+from actor_scheduler import ActorScheduler
+from death_functions import kill_monster, kill_player
+from entity_store import EntityStore
+from fov_functions import FovCache, initialize_fov, recompute_fov
+from game_messages import Message
+from game_states import GameStates
+
+from loader_functions.floor_store import FloorStore
+
+from map_objects.floor_generator import FloorGenerator
+
+from phase_timer import NullPhaseTimer
+
+
+class GameSession:
+    """
+    The rules of a game in progress, with no window attached. Each step takes an action dict like the ones
+    handle_keys and handle_mouse return, plays out the turn and returns the turn results.
+    """
+    def __init__(self, player, entities, game_map, message_log, game_state, constants):
+        self.player = player
+        self.entities = entities
+        self.game_map = game_map
+        self.message_log = message_log
+        self.constants = constants
+
+        self.game_state = GameStates.PLAYERS_TURN
+        self.previous_game_state = self.game_state
+
+        self.targeting_item = None
+
+        # Replaced by whoever runs the game to time the player's and the enemies' turns
+        self.timer = NullPhaseTimer()
+
+        self.fov_map = initialize_fov(game_map)
+        self.fov_recompute = True
+        self.fov_cache = FovCache(constants['fov_cache_size'])
+
+        game_map.initialize_path_map(entities)
+        game_map.initialize_entity_index(entities)
+
+        if constants['entity_store']:
+            game_map.entity_store = EntityStore()
+            game_map.entity_store.add_all(entities)
+
+        if constants['actor_scheduler']:
+            game_map.actor_scheduler = ActorScheduler()
+            game_map.actor_scheduler.add_all(entities)
+
+        if game_map.floor_store is None and constants['keep_left_floors']:
+            game_map.floor_store = FloorStore(constants['floor_cache_directory'], constants['resident_floors'])
+
+        if game_map.floor_generator is None and constants['pregenerate_floors']:
+            game_map.floor_generator = FloorGenerator()
+            game_map.pregenerate_next_floor(constants)
+
+    def close(self):
+        self.message_log.close_history()
+
+        # Drop the cached floors and stop building new ones
+        if self.game_map.floor_store is not None:
+            self.game_map.floor_store.close()
+            self.game_map.floor_store = None
+
+        if self.game_map.floor_generator is not None:
+            self.game_map.floor_generator.close()
+            self.game_map.floor_generator = None
+
+    def update_fov(self):
+        # Recompute the player's field of view if they moved since it was last computed
+        if not self.fov_recompute:
+            return False
+
+        recompute_fov(self.fov_map, self.player.x, self.player.y, self.constants['fov_radius'],
+                      self.constants['fov_light_walls'], self.constants['fov_algorithm'], self.fov_cache,
+                      self.game_map.version)
+
+        self.fov_recompute = False
+
+        return True
+
+    def step(self, action, mouse_action=None):
+        if mouse_action is None:
+            mouse_action = {}
+
+        self.update_fov()
+
+        player = self.player
+        game_map = self.game_map
+        message_log = self.message_log
+
+        move = action.get('move')
+        wait = action.get('wait')
+        pickup = action.get('pickup')
+        show_inventory = action.get('show_inventory')
+        drop_inventory = action.get('drop_inventory')
+        inventory_index = action.get('inventory_index')
+        take_stairs = action.get('take_stairs')
+        level_up = action.get('level_up')
+        show_character_screen = action.get('show_character_screen')
+        exit = action.get('exit')
+
+        left_click = mouse_action.get('left_click')
+        right_click = mouse_action.get('right_click')
+
+        results = []
+        player_turn_results = []
+
+        if move and self.game_state == GameStates.PLAYERS_TURN:
+            dx, dy = move
+            destination_x = player.x + dx
+            destination_y = player.y + dy
+
+            if not game_map.is_blocked(destination_x, destination_y):
+                target = game_map.entity_index.get_blocking_entity_at(destination_x, destination_y)
+
+                if target:
+                    attack_results = player.fighter.attack(target)
+                    player_turn_results.extend(attack_results)
+                else:
+                    player.move(dx, dy, game_map)
+
+                    self.fov_recompute = True
+
+                self.game_state = GameStates.ENEMY_TURN
+
+        elif wait and self.game_state == GameStates.PLAYERS_TURN:
+            self.game_state = GameStates.ENEMY_TURN
+
+        elif pickup and self.game_state == GameStates.PLAYERS_TURN:
+            for entity in game_map.entity_index.get_items_at(player.x, player.y):
+                pickup_results = player.inventory.add_item(entity)
+                player_turn_results.extend(pickup_results)
+
+                break
+            else:
+                message_log.add_message(Message('There is nothing here to pick up.', libtcod.yellow))
+
+        if show_inventory:
+            self.previous_game_state = self.game_state
+            self.game_state = GameStates.SHOW_INVENTORY
+
+        if drop_inventory:
+            self.previous_game_state = self.game_state
+            self.game_state = GameStates.DROP_INVENTORY
+
+        if inventory_index is not None and self.previous_game_state != GameStates.PLAYER_DEAD and \
+                inventory_index < len(player.inventory.items):
+            item = player.inventory.items[inventory_index]
+
+            if self.game_state == GameStates.SHOW_INVENTORY:
+                player_turn_results.extend(player.inventory.use(item, entities=self.entities, fov_map=self.fov_map,
+                                                                game_map=game_map))
+            elif self.game_state == GameStates.DROP_INVENTORY:
+                player_turn_results.extend(player.inventory.drop_item(item))
+
+        if take_stairs and self.game_state == GameStates.PLAYERS_TURN:
+            for entity in self.entities:
+                if entity.stairs and entity.x == player.x and entity.y == player.y:
+                    self.entities = game_map.next_floor(player, message_log, self.constants, self.entities)
+                    self.fov_map = initialize_fov(game_map)
+                    self.fov_recompute = True
+
+                    results.append({'next_floor': game_map.dungeon_level})
+
+                    break
+            else:
+                message_log.add_message(Message('There are no stairs here.', libtcod.yellow))
+
+        if level_up:
+            if level_up == 'hp':
+                player.fighter.base_max_hp += 20
+                player.fighter.hp += 20
+            elif level_up == 'str':
+                player.fighter.base_power += 1
+            elif level_up == 'def':
+                player.fighter.base_defense += 1
+
+            self.game_state = self.previous_game_state
+
+        if show_character_screen:
+            self.previous_game_state = self.game_state
+            self.game_state = GameStates.CHARACTER_SCREEN
+
+        if self.game_state == GameStates.TARGETING:
+            if left_click:
+                target_x, target_y = left_click
+
+                item_use_results = player.inventory.use(self.targeting_item, entities=self.entities,
+                                                        fov_map=self.fov_map, game_map=game_map,
+                                                        target_x=target_x, target_y=target_y)
+                player_turn_results.extend(item_use_results)
+            elif right_click:
+                player_turn_results.append({'targeting_cancelled': True})
+
+        if exit:
+            if self.game_state in (GameStates.SHOW_INVENTORY, GameStates.DROP_INVENTORY,
+                                   GameStates.CHARACTER_SCREEN):
+                self.game_state = self.previous_game_state
+            elif self.game_state == GameStates.TARGETING:
+                player_turn_results.append({'targeting_cancelled': True})
+            else:
+                # Leaving the game is up to whoever is driving the session
+                return [{'exit': True}]
+
+        with self.timer.phase('player'):
+            self.process_player_turn_results(player_turn_results)
+        results.extend(player_turn_results)
+
+        if self.game_state == GameStates.ENEMY_TURN:
+            with self.timer.phase('enemies'):
+                results.extend(self.take_enemy_turn())
+
+        return results
+
+    def process_player_turn_results(self, player_turn_results):
+        player = self.player
+        message_log = self.message_log
+
+        for player_turn_result in player_turn_results:
+            message = player_turn_result.get('message')
+            dead_entity = player_turn_result.get('dead')
+            item_added = player_turn_result.get('item_added')
+            item_consumed = player_turn_result.get('consumed')
+            item_dropped = player_turn_result.get('item_dropped')
+            equip = player_turn_result.get('equip')
+            targeting = player_turn_result.get('targeting')
+            targeting_cancelled = player_turn_result.get('targeting_cancelled')
+            xp = player_turn_result.get('xp')
+
+            if message:
+                message_log.add_message(message)
+
+            if dead_entity:
+                if dead_entity == player:
+                    message, self.game_state = kill_player(dead_entity)
+                else:
+                    message = kill_monster(dead_entity, self.game_map)
+
+                message_log.add_message(message)
+
+            if item_added:
+                self.entities.remove(item_added)
+                self.game_map.entity_index.remove(item_added)
+
+                if self.game_map.entity_store is not None:
+                    self.game_map.entity_store.remove(item_added)
+
+                self.game_state = GameStates.ENEMY_TURN
+
+            if item_consumed:
+                self.game_state = GameStates.ENEMY_TURN
+
+            if item_dropped:
+                self.entities.append(item_dropped)
+                self.game_map.entity_index.add(item_dropped)
+
+                if self.game_map.entity_store is not None:
+                    self.game_map.entity_store.add(item_dropped)
+
+                self.game_state = GameStates.ENEMY_TURN
+
+            if equip:
+                equip_results = player.equipment.toggle_equip(equip)
+
+                for equip_result in equip_results:
+                    equipped = equip_result.get('equipped')
+                    dequipped = equip_result.get('dequipped')
+
+                    if equipped:
+                        message_log.add_message(Message('You equipped the {0}'.format(equipped.name)))
+
+                    if dequipped:
+                        message_log.add_message(Message('You dequipped the {0}'.format(dequipped.name)))
+
+                self.game_state = GameStates.ENEMY_TURN
+
+            if targeting:
+                self.previous_game_state = GameStates.PLAYERS_TURN
+                self.game_state = GameStates.TARGETING
+
+                self.targeting_item = targeting
+
+                message_log.add_message(self.targeting_item.item.targeting_message)
+
+            if targeting_cancelled:
+                self.game_state = self.previous_game_state
+
+                message_log.add_message(Message('Targeting cancelled'))
+
+            if xp:
+                leveled_up = player.level.add_xp(xp)
+                message_log.add_message(Message('You gain {0} experience points.'.format(xp)))
+
+                if leveled_up:
+                    message_log.add_message(Message(
+                        'Ye be getting stronger! Ye reached level {0}'.format(
+                        player.level.current_level) + '!', libtcod.yellow))
+                    self.previous_game_state = self.game_state
+                    self.game_state = GameStates.LEVEL_UP
+
+    def take_enemy_turn(self):
+        player = self.player
+        game_map = self.game_map
+        message_log = self.message_log
+
+        results = []
+
+        if self.constants['monster_flow_map']:
+            game_map.update_flow_map(player.x, player.y)
+
+        if game_map.actor_scheduler is not None:
+            # Monsters coming into view join the queue first
+            game_map.actor_scheduler.wake_in_view(self.fov_map, player.x, player.y, self.constants['fov_radius'],
+                                                  game_map.entity_index)
+            actors = game_map.actor_scheduler.get_turn_actors()
+        elif game_map.entity_store is not None:
+            # Only the monsters with something to do, in id order
+            actors = game_map.entity_store.get_acting_entities(self.fov_map)
+        else:
+            actors = self.entities
+
+        for entity in actors:
+            # Checked again, in case the entity was killed earlier in the turn
+            if entity.ai:
+                enemy_turn_results = entity.ai.take_turn(player, self.fov_map, game_map, self.entities)
+                results.extend(enemy_turn_results)
+
+                for enemy_turn_result in enemy_turn_results:
+                    message = enemy_turn_result.get('message')
+                    dead_entity = enemy_turn_result.get('dead')
+
+                    if message:
+                        message_log.add_message(message)
+
+                    if dead_entity:
+                        if dead_entity == player:
+                            message, self.game_state = kill_player(dead_entity)
+                        else:
+                            message = kill_monster(dead_entity, game_map)
+
+                        message_log.add_message(message)
+
+                        if self.game_state == GameStates.PLAYER_DEAD:
+                            break
+
+                if self.game_state == GameStates.PLAYER_DEAD:
+                    break
+        else:
+            self.game_state = GameStates.PLAYERS_TURN
+
+        return results
@@ -5,6 +5,10 @@ from game_states import GameStates
 
 
 def handle_keys(key, game_state):
+    # F3 works whatever is on screen
+    if key.vk == libtcod.KEY_F3:
+        return {'show_timings': True}
+
     if game_state == GameStates.PLAYERS_TURN:
         return handle_player_turn_keys(key)
     elif game_state == GameStates.PLAYER_DEAD:
@@ -1,5 +1,7 @@
 import tcod as libtcod
 
+from area_of_effect import get_blast_area, get_entities_in_area
+
 from components.ai import ConfusedMonster
 
 from game_messages import Message
@@ -21,7 +23,7 @@ def heal(*args, **kwargs):
  ## GIVE THE LIGHTNING SCROLL THE ABILITY TO TARGET!
 def cast_lightning(*args, **kwargs):
     caster = args[0]
-    entities = kwargs.get('entities')
+    game_map = kwargs.get('game_map')
     fov_map = kwargs.get('fov_map')
     damage = kwargs.get('damage')
     maximum_range = kwargs.get('maximum_range')
@@ -30,15 +32,9 @@ def cast_lightning(*args, **kwargs):
 
     results = []
 
-    target = None
+    target = game_map.entity_index.get_blocking_entity_at(target_x, target_y)
     closest_distance = maximum_range + 1
 
-    for entity in entities:
-        if entity.x == target_x and entity.y == target_y:
-
-            target = entity
-
-
     if target:
         results.append({'consumed': True, 'target': target, 'message': Message('A lightning bolt strikes the {0} with a lour thunder! It deals {1} damage.'.format(target.name, damage))})
         results.extend(target.fighter.take_damage(damage))
@@ -49,7 +45,7 @@ def cast_lightning(*args, **kwargs):
     return results
 
 def cast_bullet(*args, **kwargs):
-    entities = kwargs.get('entities')
+    game_map = kwargs.get('game_map')
     fov_map = kwargs.get('fov_map')
     damage = kwargs.get('damage')
     maximum_range = kwargs.get('maximum_range')
@@ -58,14 +54,9 @@ def cast_bullet(*args, **kwargs):
 
     results = []
 
-    target = None
+    target = game_map.entity_index.get_blocking_entity_at(target_x, target_y)
     closest_distance = maximum_range + 1
 
-    for entity in entities:
-        if entity.x == target_x and entity.y == target_y:
-
-            target = entity
-
     if target:
         results.append({'consumed': True, 'target': target, 'message': Message('The flintlock pistol fires {0}! It deals {1} damage.'.format(target.name, damage))})
         results.extend(target.fighter.take_damage(damage))
@@ -76,10 +67,12 @@ def cast_bullet(*args, **kwargs):
     return results
 
 def cast_fireball(*args, **kwargs):
-    entities = kwargs.get('entities')
+    caster = args[0]
+    game_map = kwargs.get('game_map')
     fov_map = kwargs.get('fov_map')
     damage = kwargs.get('damage')
     radius = kwargs.get('radius')
+    shape = kwargs.get('shape', 'circle')
     target_x = kwargs.get('target_x')
     target_y = kwargs.get('target_y')
 
@@ -91,8 +84,14 @@ def cast_fireball(*args, **kwargs):
 
     results.append({'consumed': True, 'message': Message('The fireball explodes, burning everything within {0} tiles!'.format(radius), libtcod.orange)})
 
-    for entity in entities:
-        if entity.distance(target_x, target_y) <= radius and entity.fighter:
+    # A circle bursts at the target, a cone or line sets off from the caster towards it
+    if shape == 'circle':
+        area = get_blast_area(game_map, target_x, target_y, radius)
+    else:
+        area = get_blast_area(game_map, caster.x, caster.y, radius, shape, target_x, target_y)
+
+    for entity in get_entities_in_area(game_map, area):
+        if entity.fighter:
             results.append({'message': Message('The {0} gets burned for {1} damage.'.format(entity.name, damage), libtcod.orange)})
             results.extend(entity.fighter.take_damage(damage))
 
@@ -100,7 +99,7 @@ def cast_fireball(*args, **kwargs):
 
 
 def cast_confuse(*args, **kwargs):
-    entities = kwargs.get('entities')
+    game_map = kwargs.get('game_map')
     fov_map = kwargs.get('fov_map')
     target_x = kwargs.get('target_x')
     target_y = kwargs.get('target_y')
@@ -111,13 +110,17 @@ def cast_confuse(*args, **kwargs):
         results.append({'consumed': False, 'message': Message('You cannot target a tile outside your field of view.')})
         return results
 
-    for entity in entities:
-        if entity.x == target_x and entity.y == target_y and entity.ai:
+    for entity in game_map.entity_index.get_entities_at(target_x, target_y):
+        if entity.ai:
             confused_ai = ConfusedMonster(entity.ai, 10)
 
             confused_ai.owner = entity
             entity.ai = confused_ai
 
+            # A confused monster stumbles around whether it is seen or not
+            if game_map.actor_scheduler is not None:
+                game_map.actor_scheduler.wake(entity)
+
             results.append({'consumed': True, 'message': Message('The eyes of the {0} look vacant as he starts to stumble around.'.format(entity.name), libtcod.light_green)})
 
             break
@@ -2,20 +2,46 @@ import os
 
 import shelve
 
+from loader_functions.save_format import decode_game, encode_game
+
+
+SAVE_FILE = 'savegame.sav'
+
+# Saves made before the binary format were a shelve of the pickled game objects
+LEGACY_SAVE_FILE = 'savegame.dat'
+
 
 def save_game(player, entities, game_map, message_log, game_state):
-    with shelve.open('savegame.dat', 'n') as data_file:
-        data_file['player_index'] = entities.index(player)
-        data_file['entities'] = entities
-        data_file['game_map'] = game_map
-        data_file['message_log'] = message_log
-        data_file['game_state'] = game_state
+    data = encode_game(player, entities, game_map, message_log, game_state)
+
+    # Write to a temporary file first so a crash never leaves a half written save behind
+    temporary_file = SAVE_FILE + '.tmp'
+
+    with open(temporary_file, 'wb') as data_file:
+        data_file.write(data)
+
+    os.replace(temporary_file, SAVE_FILE)
 
 def load_game():
-    if not os.path.isfile('savegame.dat'):
+    if os.path.isfile(SAVE_FILE):
+        with open(SAVE_FILE, 'rb') as data_file:
+            return decode_game(data_file.read())
+
+    if not legacy_save_exists():
         raise FileNotFoundError
 
-    with shelve.open('savegame.dat', 'r') as data_file:
+    # Migrate the old save to the new format; the old file is left where it is
+    player, entities, game_map, message_log, game_state = load_legacy_game()
+    save_game(player, entities, game_map, message_log, game_state)
+
+    return player, entities, game_map, message_log, game_state
+
+def legacy_save_exists():
+    # Depending on the dbm module available, shelve adds its own extensions to the file name
+    return any(os.path.isfile(LEGACY_SAVE_FILE + extension) for extension in ('', '.db', '.dat', '.dir'))
+
+def load_legacy_game():
+    with shelve.open(LEGACY_SAVE_FILE, 'r') as data_file:
         player_index = data_file['player_index']
         entities = data_file['entities']
         game_map = data_file['game_map']
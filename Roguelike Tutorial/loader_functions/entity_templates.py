@@ -0,0 +1,156 @@
+import tcod as libtcod
+
+import json
+import os
+
+from functools import lru_cache
+
+import item_functions
+
+from components.ai import BasicMonster
+from components.equippable import Equippable
+from components.fighter import Fighter
+from components.item import Item
+
+from entity import Entity
+
+from equipment_slots import EquipmentSlots
+
+from game_messages import Message
+
+from render_functions import RenderOrder
+
+
+TEMPLATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                              'entity_templates.json')
+
+AI_CLASSES = {
+    'basic': BasicMonster
+}
+
+
+class EntityTemplate:
+    """
+    A kind of monster or item, compiled from the templates file into a prototype entity. Spawning copies the
+    prototype and gives the copy its own fighter and AI; the item and equippable components never change, so
+    every entity of the template shares the template's.
+    """
+    def __init__(self, template_id, data):
+        self.template_id = template_id
+        self.chances = data.get('chances')
+
+        fighter_data = data.get('fighter')
+        self.fighter_stats = (fighter_data['hp'], fighter_data['defense'], fighter_data['power'],
+                              fighter_data.get('xp', 0)) if fighter_data else None
+
+        self.ai_class = AI_CLASSES[data['ai']] if data.get('ai') else None
+
+        item_data = data.get('item')
+        if item_data:
+            targeting_message = item_data.get('targeting_message')
+            if targeting_message:
+                targeting_message = Message(targeting_message['text'], get_color(targeting_message['color']))
+
+            use_function = getattr(item_functions, item_data['use_function']) if item_data.get('use_function') \
+                else None
+            self.item = Item(use_function=use_function, targeting=item_data.get('targeting', False),
+                             targeting_message=targeting_message, **item_data.get('kwargs', {}))
+        else:
+            self.item = None
+
+        equippable_data = data.get('equippable')
+        if equippable_data:
+            self.equippable = Equippable(EquipmentSlots[equippable_data['slot']],
+                                         power_bonus=equippable_data.get('power_bonus', 0),
+                                         defense_bonus=equippable_data.get('defense_bonus', 0),
+                                         max_hp_bonus=equippable_data.get('max_hp_bonus', 0))
+        else:
+            self.equippable = None
+
+        render_order = RenderOrder[data['render_order']] if data.get('render_order') else RenderOrder.CORPSE
+
+        prototype = Entity(0, 0, data['char'], get_color(data['color']), data['name'], blocks=data.get('blocks', False),
+                           render_order=render_order, item=self.item, equippable=self.equippable)
+
+        # An equippable without an item gets an empty one, which is shared as well
+        self.item = prototype.item
+        prototype.template_id = template_id
+
+        self.prototype = prototype.__dict__
+
+    def spawn(self, x, y):
+        entity = Entity.__new__(Entity)
+        entity.__dict__.update(self.prototype)
+
+        entity.x = x
+        entity.y = y
+
+        if self.fighter_stats:
+            entity.fighter = Fighter(*self.fighter_stats)
+            entity.fighter.owner = entity
+
+        if self.ai_class:
+            entity.ai = self.ai_class()
+            entity.ai.owner = entity
+
+        return entity
+
+    def shares_item(self, item):
+        # Whether the item component is the template's, or one just like it (from another process, say)
+        if item is self.item:
+            return True
+
+        if item is None or self.item is None:
+            return False
+
+        return (item.use_function, item.targeting, item.function_kwargs) == \
+            (self.item.use_function, self.item.targeting, self.item.function_kwargs) and \
+            same_message(item.targeting_message, self.item.targeting_message)
+
+    def shares_equippable(self, equippable):
+        if equippable is self.equippable:
+            return True
+
+        if equippable is None or self.equippable is None:
+            return False
+
+        return (equippable.slot, equippable.power_bonus, equippable.defense_bonus, equippable.max_hp_bonus) == \
+            (self.equippable.slot, self.equippable.power_bonus, self.equippable.defense_bonus,
+             self.equippable.max_hp_bonus)
+
+
+class TemplateRegistry:
+    def __init__(self, data):
+        self.max_monsters_per_room = data['max_monsters_per_room']
+        self.max_items_per_room = data['max_items_per_room']
+
+        self.monsters = {template_id: EntityTemplate(template_id, template_data)
+                         for template_id, template_data in data['monsters'].items()}
+        self.items = {template_id: EntityTemplate(template_id, template_data)
+                      for template_id, template_data in data['items'].items()}
+
+        self.templates = {**self.monsters, **self.items}
+
+    def __getitem__(self, template_id):
+        return self.templates[template_id]
+
+    def get(self, template_id):
+        return self.templates.get(template_id)
+
+
+def get_color(name):
+    return getattr(libtcod, name)
+
+
+def same_message(message, other_message):
+    if message is None or other_message is None:
+        return message is other_message
+
+    return message.text == other_message.text and tuple(message.color) == tuple(other_message.color)
+
+
+@lru_cache(maxsize=None)
+def get_templates(path=TEMPLATES_FILE):
+    # Loaded and compiled once, the first time anything is spawned
+    with open(path) as templates_file:
+        return TemplateRegistry(json.load(templates_file))
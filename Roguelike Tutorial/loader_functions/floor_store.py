@@ -0,0 +1,82 @@
+import os
+
+import shutil
+import tempfile
+
+from collections import OrderedDict
+
+from loader_functions.save_format import decode_floor, encode_floor
+
+
+class FloorStore:
+    """
+    Floors the player has left, keyed by dungeon level. The most recently left floors stay in memory;
+    older ones are compressed to files in a cache directory and read back when they are needed again.
+    """
+    def __init__(self, directory=None, resident_floors=2):
+        # Without a directory, a temporary one is made the first time a floor is written out
+        self.directory = directory
+        self.owns_directory = directory is None
+        self.resident_floors = resident_floors
+
+        # dungeon level -> (tiles, entities, player position, rooms, corridors), least recently used first
+        self.resident = OrderedDict()
+
+    def floor_path(self, dungeon_level):
+        if self.directory is None:
+            return None
+
+        return os.path.join(self.directory, 'floor_{0}.dat'.format(dungeon_level))
+
+    def has_floor(self, dungeon_level):
+        if dungeon_level in self.resident:
+            return True
+
+        path = self.floor_path(dungeon_level)
+
+        return path is not None and os.path.isfile(path)
+
+    def store_floor(self, dungeon_level, tiles, entities, player_position, rooms, corridors):
+        self.resident[dungeon_level] = (tiles, entities, player_position, rooms, corridors)
+        self.resident.move_to_end(dungeon_level)
+
+        while len(self.resident) > self.resident_floors:
+            evicted_level, evicted_floor = self.resident.popitem(last=False)
+            self.write_floor(evicted_level, *evicted_floor)
+
+    def write_floor(self, dungeon_level, tiles, entities, player_position, rooms, corridors):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='piyrate_floors_')
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+
+        with open(self.floor_path(dungeon_level), 'wb') as floor_file:
+            floor_file.write(encode_floor(dungeon_level, tiles, entities, player_position, rooms, corridors))
+
+    def load_floor(self, dungeon_level):
+        # The floor becomes the active one again, so it is taken out of the store
+        if dungeon_level in self.resident:
+            return self.resident.pop(dungeon_level)
+
+        path = self.floor_path(dungeon_level)
+
+        with open(path, 'rb') as floor_file:
+            floor = decode_floor(floor_file.read())
+
+        os.remove(path)
+
+        return floor
+
+    def close(self):
+        self.resident.clear()
+
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+
+        if self.owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+        else:
+            for file_name in os.listdir(self.directory):
+                if file_name.startswith('floor_') and file_name.endswith('.dat'):
+                    os.remove(os.path.join(self.directory, file_name))
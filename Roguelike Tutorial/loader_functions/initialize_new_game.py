@@ -1,19 +1,18 @@
 import tcod as libtcod
 
 from components.equipment import Equipment
-from components.equippable import Equippable
 from components.fighter import Fighter
 from components.inventory import Inventory
 from components.level import Level
 
 from entity import Entity
 
-from equipment_slots import EquipmentSlots
-
 from game_messages import MessageLog
 
 from game_states import GameStates
 
+from loader_functions.entity_templates import get_templates
+
 from map_objects.game_map import GameMap
 
 from random_utils import from_dungeon_level
@@ -42,13 +41,59 @@ def get_constants():
     room_min_size = 6
     max_rooms = 20
 
+    # Which generator builds each dungeon level, as [GENERATOR, FIRST DUNGEON LEVEL]. 'rooms' scatters
+    # rectangular rooms, 'bsp' splits the map into rooms, 'caves' grows a cave out of noise
+    map_generators = [['rooms', 1]]
+
+    # Caves start with this share of wall tiles and are smoothed this many times
+    cave_wall_chance = 0.45
+    cave_smoothing_passes = 4
+
     fov_algorithm = 0
     fov_light_walls = True
     fov_radius = 10
 
+    # How many fields of view to remember, so walking back over the same tiles doesn't compute them again
+    fov_cache_size = 64
+
+    # Every message is also written to this file, so the whole log can be scrolled back through (None keeps
+    # only what fits in the panel)
+    message_history_file = 'savegame.log'
+
     max_monsters_per_room = 3
     max_items_per_room = 2
 
+    # Chase the player using one shared distance map instead of an A* search per monster
+    monster_flow_map = False
+
+    # Keep the floors that were left, on disk (in a temporary directory if None) with this many also kept in
+    # memory. Off for now: there are no stairs back up, and saved games only hold the floor being played
+    keep_left_floors = False
+    floor_cache_directory = None
+    resident_floors = 2
+
+    # Build the next floor in a worker process while the current one is played
+    pregenerate_floors = True
+
+    # Keep positions, blocking flags and combat stats of the floor's entities in numpy arrays, and pick the
+    # monsters that act each turn from those
+    entity_store = False
+
+    # Queue the monsters for the enemy turn, leaving out the ones that have yet to see the player
+    actor_scheduler = True
+
+    # The game loop sleeps until there is input, waking at least every event_timeout seconds, and draws at most
+    # max_fps frames a second. show_loop_stats prints how busy the loop was each second.
+    max_fps = 60
+    event_timeout = 0.5
+    show_loop_stats = False
+
+    # Time each phase of every frame (F3 shows the timings over the panel, and turns timing on if it was off).
+    # phase_trace_file also writes every frame to a file: Chrome trace events if it ends in .json, JSON lines if not
+    phase_timings = False
+    phase_timing_window = 120
+    phase_trace_file = None
+
     colors = {
         'dark_wall': libtcod.Color(0, 0, 100),
         'dark_ground': libtcod.Color(50, 50, 150),
@@ -71,11 +116,29 @@ def get_constants():
         'room_max_size': room_max_size,
         'room_min_size': room_min_size,
         'max_rooms': max_rooms,
+        'map_generators': map_generators,
+        'cave_wall_chance': cave_wall_chance,
+        'cave_smoothing_passes': cave_smoothing_passes,
         'fov_algorithm': fov_algorithm,
         'fov_light_walls': fov_light_walls,
         'fov_radius': fov_radius,
+        'fov_cache_size': fov_cache_size,
+        'message_history_file': message_history_file,
         'max_monsters_per_room': max_monsters_per_room,
         'max_items_per_room': max_items_per_room,
+        'monster_flow_map': monster_flow_map,
+        'keep_left_floors': keep_left_floors,
+        'floor_cache_directory': floor_cache_directory,
+        'resident_floors': resident_floors,
+        'pregenerate_floors': pregenerate_floors,
+        'entity_store': entity_store,
+        'actor_scheduler': actor_scheduler,
+        'max_fps': max_fps,
+        'event_timeout': event_timeout,
+        'show_loop_stats': show_loop_stats,
+        'phase_timings': phase_timings,
+        'phase_timing_window': phase_timing_window,
+        'phase_trace_file': phase_trace_file,
         'colors': colors
     }
 
@@ -92,14 +155,12 @@ def get_game_variables(constants):
                     equipment=equipment_component)
     entities = [player]
 
-    equippable_component = Equippable(EquipmentSlots.MAIN_HAND, power_bonus=2)
-    dagger = Entity(0, 0, '-', libtcod.sky, 'Dagger', equippable=equippable_component)
+    dagger = get_templates()['dagger'].spawn(0, 0)
     player.inventory.add_item(dagger)
     player.equipment.toggle_equip(dagger)
 
     game_map = GameMap(constants['map_width'], constants['map_height'])
-    game_map.make_map(constants['max_rooms'], constants['room_min_size'], constants['room_max_size'],
-                        constants['map_width'], constants['map_height'], player, entities)
+    game_map.make_floor(constants, player, entities)
 
     message_log = MessageLog(constants['message_x'], constants['message_width'], constants['message_height'])
 
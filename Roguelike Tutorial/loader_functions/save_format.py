@@ -0,0 +1,446 @@
+import tcod as libtcod
+
+import json
+import struct
+import zlib
+
+import numpy as np
+
+import item_functions
+
+from components.ai import BasicMonster, ConfusedMonster
+from components.equipment import Equipment
+from components.equippable import Equippable
+from components.fighter import Fighter, Modifier
+from components.inventory import Inventory
+from components.item import Item
+from components.level import Level
+from components.stairs import Stairs
+
+from entity import Entity
+
+from equipment_slots import EquipmentSlots
+
+from game_messages import Message, MessageLog
+
+from game_states import GameStates
+
+from loader_functions.entity_templates import get_templates
+
+from map_objects.game_map import GameMap
+from map_objects.rectangle import Rect
+from map_objects.tile import new_tile_array
+
+from render_functions import RenderOrder
+
+
+# Every save file starts with the magic bytes and the format version; the rest is zlib compressed
+MAGIC = b'PIYR'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sH')
+
+# Which components an entity record carries
+HAS_FIGHTER = 1
+HAS_AI = 2
+HAS_ITEM = 4
+HAS_INVENTORY = 8
+HAS_STAIRS = 16
+HAS_LEVEL = 32
+HAS_EQUIPMENT = 64
+HAS_EQUIPPABLE = 128
+
+# The item or equippable is the one shared by the entity's template, so only the template id is stored
+TEMPLATE_ITEM = 256
+TEMPLATE_EQUIPPABLE = 512
+
+AI_BASIC = 1
+AI_CONFUSED = 2
+
+EQUIPMENT_SLOT_NAMES = ['main_hand', 'off_hand', 'head', 'torso', 'legs', 'hands', 'feet']
+
+
+class RecordWriter:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack('<' + fmt, *values))
+
+    def string(self, text):
+        data = text.encode('utf-8')
+        self.pack('H', len(data))
+        self.parts.append(data)
+
+    def blob(self, data):
+        self.pack('I', len(data))
+        self.parts.append(data)
+
+    def color(self, color):
+        self.pack('3B', color[0], color[1], color[2])
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class RecordReader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, fmt):
+        fmt = '<' + fmt
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+
+        return values
+
+    def unpack_one(self, fmt):
+        return self.unpack(fmt)[0]
+
+    def string(self):
+        length = self.unpack_one('H')
+        text = self.data[self.offset:self.offset + length].decode('utf-8')
+        self.offset += length
+
+        return text
+
+    def blob(self):
+        length = self.unpack_one('I')
+        data = self.data[self.offset:self.offset + length]
+        self.offset += length
+
+        return data
+
+    def color(self):
+        return libtcod.Color(*self.unpack('3B'))
+
+
+def write_tiles(writer, tiles):
+    # Each tile attribute is stored as its own bit plane
+    writer.pack('HH', tiles.shape[0], tiles.shape[1])
+
+    for plane in (tiles.blocked, tiles.block_sight, tiles.explored):
+        writer.blob(np.packbits(plane, axis=None).tobytes())
+
+
+def read_tiles(reader):
+    width, height = reader.unpack('HH')
+    tiles = new_tile_array(width, height)
+
+    for plane in (tiles.blocked, tiles.block_sight, tiles.explored):
+        bits = np.frombuffer(reader.blob(), dtype=np.uint8)
+        plane[:] = np.unpackbits(bits, count=width * height).reshape(width, height)
+
+    return tiles
+
+
+def write_message(writer, message):
+    writer.string(message.text)
+    writer.color(message.color)
+
+
+def read_message(reader):
+    text = reader.string()
+
+    return Message(text, reader.color())
+
+
+def write_ai(writer, ai):
+    if isinstance(ai, ConfusedMonster):
+        writer.pack('BH', AI_CONFUSED, ai.number_of_turns)
+        write_ai(writer, ai.previous_ai)
+    else:
+        writer.pack('B', AI_BASIC)
+
+
+def read_ai(reader):
+    kind = reader.unpack_one('B')
+
+    if kind == AI_CONFUSED:
+        number_of_turns = reader.unpack_one('H')
+
+        return ConfusedMonster(read_ai(reader), number_of_turns)
+
+    return BasicMonster()
+
+
+def write_entity(writer, entity):
+    template_id = getattr(entity, 'template_id', None)
+    template = get_templates().get(template_id) if template_id else None
+
+    flags = 0
+    for component, flag in ((entity.fighter, HAS_FIGHTER), (entity.ai, HAS_AI), (entity.item, HAS_ITEM),
+                            (entity.inventory, HAS_INVENTORY), (entity.stairs, HAS_STAIRS),
+                            (entity.level, HAS_LEVEL), (entity.equipment, HAS_EQUIPMENT),
+                            (entity.equippable, HAS_EQUIPPABLE)):
+        if component:
+            flags |= flag
+
+    if template is not None:
+        if entity.item and template.shares_item(entity.item):
+            flags |= TEMPLATE_ITEM
+
+        if entity.equippable and template.shares_equippable(entity.equippable):
+            flags |= TEMPLATE_EQUIPPABLE
+
+    writer.pack('hhH', entity.x, entity.y, flags)
+    writer.string(template_id if template is not None else '')
+    writer.string(entity.char)
+    writer.color(entity.color)
+    writer.string(entity.name)
+    writer.pack('?B', entity.blocks, entity.render_order.value)
+
+    if entity.fighter:
+        fighter = entity.fighter
+        writer.pack('5i', fighter.base_max_hp, fighter.hp, fighter.base_defense, fighter.base_power, fighter.xp)
+
+        # Only a source that is a name can be stored; any other source comes back as None
+        writer.pack('H', len(fighter.modifiers))
+        for modifier in fighter.modifiers:
+            writer.pack('3i', modifier.max_hp, modifier.power, modifier.defense)
+            writer.string(modifier.source if isinstance(modifier.source, str) else '')
+
+    if entity.ai:
+        write_ai(writer, entity.ai)
+
+    if entity.item and not flags & TEMPLATE_ITEM:
+        item = entity.item
+        writer.string(item.use_function.__name__ if item.use_function else '')
+        writer.pack('??', item.targeting, item.targeting_message is not None)
+
+        if item.targeting_message is not None:
+            write_message(writer, item.targeting_message)
+
+        writer.string(json.dumps(item.function_kwargs, separators=(',', ':')))
+
+    if entity.inventory:
+        writer.pack('HH', entity.inventory.capacity, len(entity.inventory.items))
+
+        for item_entity in entity.inventory.items:
+            write_entity(writer, item_entity)
+
+    if entity.stairs:
+        writer.pack('H', entity.stairs.floor)
+
+    if entity.level:
+        level = entity.level
+        writer.pack('4i', level.current_level, level.current_xp, level.level_up_base, level.level_up_factor)
+
+    if entity.equipment:
+        # Equipped items are stored as indexes into the owner's inventory
+        items = entity.inventory.items if entity.inventory else []
+
+        for slot_name in EQUIPMENT_SLOT_NAMES:
+            equipped = getattr(entity.equipment, slot_name)
+            writer.pack('h', items.index(equipped) if equipped in items else -1)
+
+    if entity.equippable and not flags & TEMPLATE_EQUIPPABLE:
+        equippable = entity.equippable
+        writer.pack('B3i', equippable.slot.value, equippable.power_bonus, equippable.defense_bonus,
+                    equippable.max_hp_bonus)
+
+
+def read_entity(reader):
+    x, y, flags = reader.unpack('hhH')
+    template_id = reader.string()
+
+    template = None
+    if template_id:
+        template = get_templates().get(template_id)
+
+        if template is None:
+            raise ValueError('Save file uses an unknown entity template: {0}'.format(template_id))
+
+    char = reader.string()
+    color = reader.color()
+    name = reader.string()
+    blocks, render_order = reader.unpack('?B')
+
+    fighter = ai = item = inventory = stairs = level = equipment = equippable = None
+
+    if flags & HAS_FIGHTER:
+        base_max_hp, hp, base_defense, base_power, xp = reader.unpack('5i')
+        fighter = Fighter(hp=base_max_hp, defense=base_defense, power=base_power, xp=xp)
+        fighter.hp = hp
+
+        for i in range(reader.unpack_one('H')):
+            max_hp, power, defense = reader.unpack('3i')
+            fighter.add_modifier(Modifier(max_hp, power, defense, reader.string() or None))
+
+    if flags & HAS_AI:
+        ai = read_ai(reader)
+
+    if flags & TEMPLATE_ITEM:
+        item = template.item
+    elif flags & HAS_ITEM:
+        use_function_name = reader.string()
+        targeting, has_targeting_message = reader.unpack('??')
+        targeting_message = read_message(reader) if has_targeting_message else None
+        function_kwargs = json.loads(reader.string())
+
+        use_function = getattr(item_functions, use_function_name) if use_function_name else None
+        item = Item(use_function=use_function, targeting=targeting, targeting_message=targeting_message,
+                    **function_kwargs)
+
+    if flags & HAS_INVENTORY:
+        capacity, count = reader.unpack('HH')
+        inventory = Inventory(capacity)
+        inventory.items = [read_entity(reader) for i in range(count)]
+
+    if flags & HAS_STAIRS:
+        stairs = Stairs(reader.unpack_one('H'))
+
+    if flags & HAS_LEVEL:
+        current_level, current_xp, level_up_base, level_up_factor = reader.unpack('4i')
+        level = Level(current_level, current_xp, level_up_base, level_up_factor)
+
+    if flags & HAS_EQUIPMENT:
+        items = inventory.items if inventory else []
+        indexes = reader.unpack('{0}h'.format(len(EQUIPMENT_SLOT_NAMES)))
+
+        equipment = Equipment(**{slot_name: items[index] if index >= 0 else None
+                                 for slot_name, index in zip(EQUIPMENT_SLOT_NAMES, indexes)})
+
+    if flags & TEMPLATE_EQUIPPABLE:
+        equippable = template.equippable
+    elif flags & HAS_EQUIPPABLE:
+        slot, power_bonus, defense_bonus, max_hp_bonus = reader.unpack('B3i')
+        equippable = Equippable(EquipmentSlots(slot), power_bonus=power_bonus, defense_bonus=defense_bonus,
+                                max_hp_bonus=max_hp_bonus)
+
+    entity = Entity(x, y, char, color, name, blocks=blocks, render_order=RenderOrder(render_order), fighter=fighter,
+                    ai=ai, item=item, inventory=inventory, stairs=stairs, level=level, equipment=equipment,
+                    equippable=equippable)
+    entity.template_id = template_id or None
+
+    # A confused monster's original AI still belongs to the same entity
+    previous_ai = getattr(ai, 'previous_ai', None)
+    while previous_ai:
+        previous_ai.owner = entity
+        previous_ai = getattr(previous_ai, 'previous_ai', None)
+
+    return entity
+
+
+def write_floor(writer, dungeon_level, tiles, entities, rooms, corridors):
+    writer.pack('H', dungeon_level)
+    write_tiles(writer, tiles)
+
+    writer.pack('I', len(entities))
+    for entity in entities:
+        write_entity(writer, entity)
+
+    # The rooms and the corridors between them
+    writer.pack('I', len(rooms))
+    for room in rooms:
+        writer.pack('hhhh', room.x1, room.y1, room.x2, room.y2)
+
+    writer.pack('I', len(corridors))
+    for corridor in corridors:
+        writer.pack('II', *corridor)
+
+
+def read_floor(reader):
+    dungeon_level = reader.unpack_one('H')
+    tiles = read_tiles(reader)
+
+    count = reader.unpack_one('I')
+    entities = [read_entity(reader) for i in range(count)]
+
+    rooms = []
+    for i in range(reader.unpack_one('I')):
+        x1, y1, x2, y2 = reader.unpack('hhhh')
+        rooms.append(Rect(x1, y1, x2 - x1, y2 - y1))
+
+    corridors = [reader.unpack('II') for i in range(reader.unpack_one('I'))]
+
+    return dungeon_level, tiles, entities, rooms, corridors
+
+
+def write_message_log(writer, message_log):
+    writer.pack('HHHH', message_log.x, message_log.width, message_log.height, len(message_log.messages))
+
+    for message in message_log.messages:
+        write_message(writer, message)
+
+    writer.string(message_log.game_id or '')
+
+
+def read_message_log(reader):
+    x, width, height, count = reader.unpack('HHHH')
+
+    message_log = MessageLog(x, width, height)
+    message_log.messages.extend(read_message(reader) for i in range(count))
+    message_log.game_id = reader.string() or None
+
+    return message_log
+
+
+def pack_file(writer):
+    return HEADER.pack(MAGIC, FORMAT_VERSION) + zlib.compress(writer.getvalue())
+
+
+def unpack_file(data):
+    if len(data) < HEADER.size:
+        raise ValueError('Save file is truncated')
+
+    magic, version = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise ValueError('Not a save file')
+
+    if version != FORMAT_VERSION:
+        raise ValueError('Save file version {0} is not supported by this game'.format(version))
+
+    return RecordReader(zlib.decompress(data[HEADER.size:]))
+
+
+def encode_floor(dungeon_level, tiles, entities, player_position, rooms, corridors):
+    writer = RecordWriter()
+
+    write_floor(writer, dungeon_level, tiles, entities, rooms, corridors)
+    writer.pack('hh', *player_position)
+
+    return pack_file(writer)
+
+
+def decode_floor(data):
+    reader = unpack_file(data)
+
+    dungeon_level, tiles, entities, rooms, corridors = read_floor(reader)
+    player_position = reader.unpack('hh')
+
+    return tiles, entities, player_position, rooms, corridors
+
+
+def encode_game(player, entities, game_map, message_log, game_state):
+    writer = RecordWriter()
+
+    write_floor(writer, game_map.dungeon_level, game_map.tiles, entities, game_map.rooms, game_map.corridors)
+    writer.pack('IB', entities.index(player), game_state.value)
+    write_message_log(writer, message_log)
+
+    # The run's seed, so floors still to come are generated the same after loading
+    writer.pack('I', game_map.seed)
+
+    return pack_file(writer)
+
+
+def decode_game(data):
+    reader = unpack_file(data)
+
+    dungeon_level, tiles, entities, rooms, corridors = read_floor(reader)
+    player_index, game_state = reader.unpack('IB')
+    message_log = read_message_log(reader)
+
+    seed = reader.unpack_one('I')
+
+    width, height = tiles.shape
+    game_map = GameMap(width, height, dungeon_level, seed)
+    game_map.tiles = tiles
+    game_map.tiles_changed()
+    game_map.rooms = rooms
+    game_map.corridors = corridors
+
+    return entities[player_index], entities, game_map, message_log, GameStates(game_state)
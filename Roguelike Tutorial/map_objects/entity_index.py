@@ -0,0 +1,79 @@
+class EntityIndex:
+    """
+    The entities on a floor, bucketed by the tile they stand on.
+    """
+    def __init__(self, entities=()):
+        self.cells = {}
+
+        # Tiles whose entities changed since the renderer last looked; None until something renders the floor
+        self.dirty_cells = None
+
+        for entity in entities:
+            self.add(entity)
+
+    def add(self, entity):
+        self.cells.setdefault((entity.x, entity.y), []).append(entity)
+
+        if self.dirty_cells is not None:
+            self.dirty_cells.add((entity.x, entity.y))
+
+    def remove(self, entity):
+        self.remove_at(entity, entity.x, entity.y)
+
+    def remove_at(self, entity, x, y):
+        cell = self.cells.get((x, y))
+
+        if cell and entity in cell:
+            cell.remove(entity)
+
+            if not cell:
+                del self.cells[(x, y)]
+
+            if self.dirty_cells is not None:
+                self.dirty_cells.add((x, y))
+
+    def move(self, entity, old_x, old_y):
+        # The entity has already been given its new coordinates
+        self.remove_at(entity, old_x, old_y)
+        self.add(entity)
+
+    def touch(self, entity):
+        # The entity looks different but hasn't moved
+        if self.dirty_cells is not None:
+            self.dirty_cells.add((entity.x, entity.y))
+
+    def take_dirty_cells(self):
+        dirty_cells = self.dirty_cells or set()
+        self.dirty_cells = set()
+
+        return dirty_cells
+
+    def get_entities_at(self, x, y):
+        return list(self.cells.get((x, y), ()))
+
+    def get_blocking_entity_at(self, x, y):
+        for entity in self.cells.get((x, y), ()):
+            if entity.blocks:
+                return entity
+
+        return None
+
+    def get_items_at(self, x, y):
+        return [entity for entity in self.cells.get((x, y), ()) if entity.item]
+
+    def get_entities_in_radius(self, x, y, radius):
+        entities = []
+
+        # Walk whichever is smaller: the tiles inside the radius or the occupied tiles
+        reach = int(radius)
+        if (2 * reach + 1) ** 2 < len(self.cells):
+            cells = ((cell_x, cell_y) for cell_x in range(x - reach, x + reach + 1)
+                     for cell_y in range(y - reach, y + reach + 1))
+        else:
+            cells = list(self.cells.keys())
+
+        for (cell_x, cell_y) in cells:
+            if (cell_x - x) ** 2 + (cell_y - y) ** 2 <= radius ** 2:
+                entities.extend(self.cells.get((cell_x, cell_y), ()))
+
+        return entities
@@ -0,0 +1,59 @@
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+from map_objects.game_map import generate_floor
+
+
+# Only these constants affect how a floor is generated
+FLOOR_CONSTANTS = ('map_width', 'map_height', 'max_rooms', 'room_min_size', 'room_max_size', 'map_generators',
+                   'cave_wall_chance', 'cave_smoothing_passes')
+
+
+class FloorGenerator:
+    """
+    Builds upcoming floors in a worker process while the current one is being played. A floor built
+    here is identical to one built by generate_floor in the game's own process with the same seed.
+    """
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self.executor = None
+
+        # (dungeon level, seed) -> future
+        self.pending = {}
+
+    def request_floor(self, dungeon_level, seed, constants):
+        key = (dungeon_level, seed)
+
+        if key in self.pending:
+            return
+
+        if self.executor is None:
+            # Spawn rather than fork, so the workers don't inherit the window
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+
+        floor_constants = {name: constants[name] for name in FLOOR_CONSTANTS}
+        self.pending[key] = self.executor.submit(generate_floor, dungeon_level, seed, floor_constants)
+
+    def take_floor(self, dungeon_level, seed, constants):
+        future = self.pending.pop((dungeon_level, seed), None)
+
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                # A broken worker is no reason to stop the game; build the floor here instead
+                pass
+
+        return generate_floor(dungeon_level, seed, constants)
+
+    def close(self):
+        for future in self.pending.values():
+            future.cancel()
+
+        self.pending.clear()
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
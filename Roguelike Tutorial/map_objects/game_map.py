@@ -1,65 +1,185 @@
 import tcod as libtcod
-from random import randint
+import numpy as np
+import random
+
+from functools import lru_cache
+from itertools import count
 
-from components.ai import BasicMonster
-from components.equipment import EquipmentSlots
-from components.equippable import Equippable
-from components.fighter import Fighter
-from components.item import Item
 from components.stairs import Stairs
 
 from entity import Entity
 
 from game_messages import Message
 
-from item_functions import cast_bullet, cast_confuse, cast_fireball, cast_lightning, heal
+from loader_functions.entity_templates import get_templates
 
+from map_objects.entity_index import EntityIndex
+from map_objects.map_generators import MAP_GENERATORS
 from map_objects.rectangle import Rect
-from map_objects.tile import Tile
+from map_objects.regions import label_regions
+from map_objects.room_index import RoomIndex
+from map_objects.tile import new_tile_array, tiles_from_list
 
-from random_utils import from_dungeon_level, random_choice_from_dict
+from random_utils import SpawnTable, from_dungeon_level
 
 from render_functions import RenderOrder
 
 
+@lru_cache(maxsize=None)
+def get_spawn_tables(dungeon_level):
+    # The spawn limits and chances only depend on the dungeon level, so they are worked out once per level
+    templates = get_templates()
+
+    # [NUMBER OF ITEMS/MONSTERS PER ROOM, DUNGEON LEVEL]
+    max_monsters_per_room = from_dungeon_level(templates.max_monsters_per_room, dungeon_level)
+    max_items_per_room = from_dungeon_level(templates.max_items_per_room, dungeon_level)
+
+    # [CHANCE OF SPAWNING, DUNGEON LEVEL]; templates without chances are never spawned at random
+    monster_chances = {template_id: from_dungeon_level(template.chances, dungeon_level)
+                       for template_id, template in templates.monsters.items() if template.chances}
+    item_chances = {template_id: from_dungeon_level(template.chances, dungeon_level)
+                    for template_id, template in templates.items.items() if template.chances}
+
+    return max_monsters_per_room, max_items_per_room, SpawnTable(monster_chances), SpawnTable(item_chances)
+
+
+# Every change to any map's tiles gets a new version number, so anything derived from them can tell it is stale
+map_versions = count(1)
+
+
+def get_floor_seed(seed, dungeon_level):
+    # Every floor of a run is generated from its own seed, so it comes out the same wherever it is built
+    return '{0}:{1}'.format(seed, dungeon_level)
+
+
 class GameMap:
-    def __init__(self, width, height, dungeon_level=1):
+    def __init__(self, width, height, dungeon_level=1, seed=None):
         self.width = width
         self.height = height
         self.tiles = self.initialize_tiles()
+        self.version = next(map_versions)
 
         self.dungeon_level = dungeon_level
 
+        # The seed of the whole run
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        self.seed = seed
+        self.rng = random.Random(get_floor_seed(seed, dungeon_level))
+
+        self.path_map = None
+        self.path = None
+
+        # Which connected area each tile belongs to, worked out when first asked for and again after the tiles change
+        self.regions = None
+        self.regions_version = None
+
+        # The rooms carved by make_map, and the corridors between them as pairs of room numbers
+        self.rooms = []
+        self.corridors = []
+
+        self.entity_index = EntityIndex()
+
+        # Set by the game session when the entity store or actor scheduler is turned on
+        self.entity_store = None
+        self.actor_scheduler = None
+
+        self.flow_map = None
+        self.flow_origin = None
+
+        # Set by whoever runs the game when floors that were left should be kept, or built ahead of time
+        self.floor_store = None
+        self.floor_generator = None
+
+    def __getstate__(self):
+        # The path map, entity index and flow map are rebuilt from the tiles and entities when the game is loaded
+        state = self.__dict__.copy()
+        state['path_map'] = None
+        state['path'] = None
+        state['regions'] = None
+        state['regions_version'] = None
+        state['entity_index'] = None
+        state['entity_store'] = None
+        state['actor_scheduler'] = None
+        state['flow_map'] = None
+        state['flow_origin'] = None
+        state['floor_store'] = None
+        state['floor_generator'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        # Games saved before tiles were stored as an array hold a list of lists of Tile objects
+        if isinstance(state.get('tiles'), list):
+            state['tiles'] = tiles_from_list(state['tiles'])
+
+        state.setdefault('path_map', None)
+        state.setdefault('path', None)
+        state['regions'] = None
+        state['regions_version'] = None
+        state.setdefault('entity_index', None)
+        state.setdefault('rooms', [])
+        state.setdefault('corridors', [])
+        state['entity_store'] = None
+        state['actor_scheduler'] = None
+        state['flow_map'] = None
+        state['flow_origin'] = None
+        state['floor_store'] = None
+        state['floor_generator'] = None
+
+        if 'seed' not in state:
+            state['seed'] = random.getrandbits(32)
+            state['rng'] = random.Random()
+
+        state['version'] = next(map_versions)
+
+        self.__dict__.update(state)
+
     def initialize_tiles(self):
-        tiles = [[Tile(True) for y in range(self.height)] for x in range(self.width)]
+        tiles = new_tile_array(self.width, self.height)
 
         return tiles
 
+    def tiles_changed(self):
+        self.version = next(map_versions)
+
+    def make_floor(self, constants, player, entities):
+        # Each dungeon level is built by the generator the constants pick for it
+        generator = from_dungeon_level(constants['map_generators'], self.dungeon_level)
+
+        MAP_GENERATORS[generator](self, constants, player, entities)
+
     def make_map(self, max_rooms, room_min_size, room_max_size, map_width, map_height, player, entities):
+        self.rng = random.Random(get_floor_seed(self.seed, self.dungeon_level))
+
+        # Rooms are never bigger than the map, so small maps still get one
+        room_max_size = min(room_max_size, map_width - 1, map_height - 1)
+        room_min_size = min(room_min_size, room_max_size)
+
         rooms = []
+        corridors = []
         num_rooms = 0
 
+        # Candidate rooms are only checked against the rooms near them
+        room_index = RoomIndex(room_max_size + 1)
+
         center_of_last_room_x = None
         center_of_last_room_y = None
 
         for r in range(max_rooms):
             # random width and height
-            w = randint(room_min_size, room_max_size)
-            h = randint(room_min_size, room_max_size)
+            w = self.rng.randint(room_min_size, room_max_size)
+            h = self.rng.randint(room_min_size, room_max_size)
             # random position without going out of the boundaries of the map
-            x = randint(0, map_width - w - 1)
-            y = randint(0, map_height - h - 1)
+            x = self.rng.randint(0, map_width - w - 1)
+            y = self.rng.randint(0, map_height - h - 1)
 
             # "Rect" class makes rectangles easier to work with
             new_room = Rect(x, y, w, h)
 
-            # run through the other rooms and see if they intersect with this one
-            for other_room in rooms:
-                if new_room.intersect(other_room):
-                    break
-            else:
-                # this means there are no intersections, so this room is valid
-
+            # skip it if it intersects with any of the other rooms
+            if not room_index.intersects(new_room):
                 # "paint" it to the map's tiles
                 self.create_room(new_room)
 
@@ -73,6 +193,8 @@ class GameMap:
                     # this is the first room, where the player starts at
                     player.x = new_x
                     player.y = new_y
+
+                    self.entity_index = EntityIndex(entities)
                 else:
                     # all rooms after the first:
                     # connect it to the previous room with a tunnel
@@ -81,7 +203,7 @@ class GameMap:
                     (prev_x, prev_y) = rooms[num_rooms - 1].center()
 
                     # flip a coin (random number that is either 0 or 1)
-                    if randint(0, 1) == 1:
+                    if self.rng.randint(0, 1) == 1:
                         # first move horizontally, then vertically
                         self.create_h_tunnel(prev_x, new_x, prev_y)
                         self.create_v_tunnel(prev_y, new_y, new_x)
@@ -90,160 +212,248 @@ class GameMap:
                         self.create_v_tunnel(prev_y, new_y, prev_x)
                         self.create_h_tunnel(prev_x, new_x, new_y)
 
+                    corridors.append((num_rooms - 1, num_rooms))
+
                 self.place_entities(new_room, entities)
 
                 # finally, append the new room to the list
                 rooms.append(new_room)
+                room_index.add(new_room)
                 num_rooms += 1
 
+        self.rooms = rooms
+        self.corridors = corridors
+
+        self.finish_map(center_of_last_room_x, center_of_last_room_y, entities)
+
+    def finish_map(self, stairs_x, stairs_y, entities):
+        # Make sure every part of the floor can be walked to from the stairs
+        self.connect_regions(stairs_x, stairs_y)
+
+        # Put down the stairs to the next level once the floor is carved and populated
         stairs_component = Stairs(self.dungeon_level + 1)
-        down_stairs = Entity(center_of_last_room_x, center_of_last_room_y, '>', libtcod.white, 'Stairs',
+        down_stairs = Entity(stairs_x, stairs_y, '>', libtcod.white, 'Stairs',
                             render_order=RenderOrder.STAIRS, stairs=stairs_component)
         entities.append(down_stairs)
+        self.entity_index.add(down_stairs)
+
+        self.initialize_path_map(entities)
+
+        self.flow_map = None
+        self.flow_origin = None
+
+    def initialize_path_map(self, entities):
+        # One walkability grid per floor, shared by every monster's A* search. Walls are copied from
+        # the tiles once, and tiles holding a blocking entity are kept unwalkable as they move or die
+        self.path_map = libtcod.map_new(self.width, self.height)
+        self.path_map.transparent[:] = ~self.tiles.block_sight.T
+        self.path_map.walkable[:] = ~self.tiles.blocked.T
+
+        for entity in entities:
+            if entity.blocks:
+                self.path_map.walkable[entity.y, entity.x] = False
+
+        # The 1.41 is the normal diagonal cost of moving, it can be set as 0.0 if diagonal moves are prohibited
+        self.path = libtcod.path_new_using_map(self.path_map, 1.41)
+
+    def initialize_entity_index(self, entities):
+        self.entity_index = EntityIndex(entities)
+
+    def entity_moved(self, entity, old_x, old_y):
+        # Keep the entity index and the path map in step with an entity that changed tiles
+        self.entity_index.move(entity, old_x, old_y)
+
+        if entity.blocks:
+            self.set_occupied(old_x, old_y, False)
+            self.set_occupied(entity.x, entity.y, True)
+
+    def set_occupied(self, x, y, occupied):
+        # Record that a blocking entity has entered or left a tile
+        if self.path_map is not None:
+            self.path_map.walkable[y, x] = not (occupied or self.tiles.blocked[x, y])
+
+    def get_regions(self):
+        if self.regions is None or self.regions_version != self.version:
+            self.regions = label_regions(self.tiles.blocked)
+            self.regions_version = self.version
+
+        return self.regions
+
+    def is_reachable(self, x1, y1, x2, y2):
+        # Whether there is any way to walk between the two tiles, leaving entities aside. A tile is always
+        # reachable from itself, wall or not
+        if (x1, y1) == (x2, y2):
+            return True
+
+        regions = self.get_regions()
+
+        return regions[x1, y1] != 0 and regions[x1, y1] == regions[x2, y2]
+
+    def connect_regions(self, x, y):
+        # Dig a tunnel from every area that can't be reached from (x, y) to the nearest tile that can
+        regions = self.get_regions()
+        main_region = regions[x, y]
+
+        if regions.max() <= 1:
+            return
+
+        main_xs, main_ys = np.nonzero(regions == main_region)
+
+        for region in range(1, regions.max() + 1):
+            if region == main_region:
+                continue
+
+            region_x, region_y = np.unravel_index(np.argmax(regions == region), regions.shape)
+            nearest = np.argmin((main_xs - region_x) ** 2 + (main_ys - region_y) ** 2)
+            main_x, main_y = int(main_xs[nearest]), int(main_ys[nearest])
+
+            self.create_h_tunnel(int(region_x), main_x, int(region_y))
+            self.create_v_tunnel(int(region_y), main_y, main_x)
+
+    def update_flow_map(self, x, y):
+        # Walking distance from every tile to (x, y), going around walls but not entities. Monsters chasing
+        # the player step to whichever neighbouring tile is closest, so one search serves all of them
+        if self.flow_map is not None and self.flow_origin == (x, y):
+            return
+
+        cost = np.logical_not(self.tiles.blocked).astype(np.int8)
+
+        self.flow_map = np.full((self.width, self.height), np.iinfo(np.int32).max, dtype=np.int32)
+        self.flow_map[x, y] = 0
+
+        # 2 and 3 keep roughly the same 1.41 diagonal cost that the A* path uses
+        libtcod.path.dijkstra2d(self.flow_map, cost, 2, 3, out=self.flow_map)
+
+        self.flow_origin = (x, y)
 
     def create_room(self, room):
-        # go through the tiles in the rectangle and make them passable
-        for x in range(room.x1 + 1, room.x2):
-            for y in range(room.y1 + 1, room.y2):
-                self.tiles[x][y].blocked = False
-                self.tiles[x][y].block_sight = False
+        # make the tiles inside the rectangle passable
+        self.tiles.blocked[room.x1 + 1:room.x2, room.y1 + 1:room.y2] = False
+        self.tiles.block_sight[room.x1 + 1:room.x2, room.y1 + 1:room.y2] = False
+        self.tiles_changed()
 
     def create_h_tunnel(self, x1, x2, y):
-        for x in range(min(x1, x2), max(x1, x2) + 1):
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
+        self.tiles.blocked[min(x1, x2):max(x1, x2) + 1, y] = False
+        self.tiles.block_sight[min(x1, x2):max(x1, x2) + 1, y] = False
+        self.tiles_changed()
 
     def create_v_tunnel(self, y1, y2, x):
-        for y in range(min(y1, y2), max(y1, y2) + 1):
-            self.tiles[x][y].blocked = False
-            self.tiles[x][y].block_sight = False
+        self.tiles.blocked[x, min(y1, y2):max(y1, y2) + 1] = False
+        self.tiles.block_sight[x, min(y1, y2):max(y1, y2) + 1] = False
+        self.tiles_changed()
 
     def place_entities(self, room, entities):
-        # [NUMBER OF ITEMS/MONSTERS PER ROOM, DUNGEON LEVEL]
-        max_monsters_per_room = from_dungeon_level([[2, 1], [3, 4], [5, 6]], self.dungeon_level)
-        max_items_per_room = from_dungeon_level([[10, 1], [2, 4]], self.dungeon_level)
+        max_monsters_per_room, max_items_per_room, monster_table, item_table = get_spawn_tables(self.dungeon_level)
+        templates = get_templates()
+        blocked = self.tiles.blocked
+
         # Get a random number of monsters
-        number_of_monsters = randint(0, max_monsters_per_room)
+        number_of_monsters = self.rng.randint(0, max_monsters_per_room)
 
         # Get a random number of items
-        number_of_items = randint(0, max_items_per_room)
-
-        # [CHANCE OF SPAWNING, DUNGEON LEVEL]
-        monster_chances = {
-            'ragged_sailor': 60,
-            'skeleton': from_dungeon_level([[30, 1], [40, 2], [50, 3]], self.dungeon_level),
-            'troll': from_dungeon_level([[15, 1], [30, 2], [60, 3]], self.dungeon_level)
-        }
-
-        item_chances = {
-            'healing_potion': 35,
-            'rapier': from_dungeon_level([[5, 1]], self.dungeon_level),
-            'buckler': from_dungeon_level([[15, 1]], self.dungeon_level),
-            'fancy_hat': from_dungeon_level([[5, 1]], self.dungeon_level),
-            'fancy_shirt': from_dungeon_level([[5, 1]], self.dungeon_level),
-            'lightning_scroll': from_dungeon_level([[25, 1]], self.dungeon_level),
-            'fireball_scroll': from_dungeon_level([[25, 1]], self.dungeon_level),
-            'confusion_scroll': from_dungeon_level([[10, 1]], self.dungeon_level),
-            'flintlock': from_dungeon_level([[50, 1]], self.dungeon_level)
-        }
+        number_of_items = self.rng.randint(0, max_items_per_room)
 
         for i in range(number_of_monsters):
             #Choose a random location in the room
-            x = randint(room.x1 + 1, room.x2 - 1)
-            y = randint(room.y1 + 1, room.y2 - 1)
-
-            # Check if an entity is already at that lockation
-            if not any([entity for entity in entities if entity.x == x and entity.y == y]):
-                monster_choice = random_choice_from_dict(monster_chances)
+            x = self.rng.randint(room.x1 + 1, room.x2 - 1)
+            y = self.rng.randint(room.y1 + 1, room.y2 - 1)
 
-                if monster_choice == 'ragged_sailor':
-                    fighter_component = Fighter(hp=15, defense=1, power=4, xp=35)
-                    ai_component = BasicMonster()
-
-                    monster = Entity(x, y, 's', libtcod.desaturated_green, 'Ragged Sailor', blocks=True,
-                                    render_order=RenderOrder.ACTOR, fighter=fighter_component, ai=ai_component)
-                elif monster_choice == 'skeleton':
-                    fighter_component = Fighter(hp=20, defense=3, power=4, xp=100)
-                    ai_component = BasicMonster()
-
-                    monster = Entity(x, y, 'k', libtcod.darker_green, 'Skeleton', blocks=True, fighter=fighter_component,
-                                    render_order=RenderOrder.ACTOR, ai=ai_component)
-                else:
-                    fighter_component = Fighter(hp=30, defense=4, power=8, xp=100)
-                    ai_component = BasicMonster()
-
-                    monster = Entity(x, y, 'T', libtcod.darker_green, 'Troll', blocks=True, fighter=fighter_component,
-                                    render_order=RenderOrder.ACTOR, ai=ai_component)
+            # Check if an entity is already at that lockation, or if it's a wall (in a cave)
+            if not blocked[x, y] and not self.entity_index.get_entities_at(x, y):
+                monster = templates[monster_table.choose(self.rng)].spawn(x, y)
 
                 entities.append(monster)
+                self.entity_index.add(monster)
 
         for i in range(number_of_items):
-            x = randint(room.x1 + 1, room.x2 - 1)
-            y = randint(room.y1 + 1, room.y2 - 1)
-
-            if not any([entity for entity in entities if entity.x == x and entity.y == y]):
-                item_choice = random_choice_from_dict(item_chances)
-                ## ADD SOME ITEMS HERE FOR FUN
-                if item_choice == 'healing_potion':
-                    item_component = Item(use_function=heal, amount=40)
-                    item = Entity(x, y, '!', libtcod.violet, 'Healing Potion', render_order=RenderOrder.ITEM,
-                                item=item_component)
-                elif item_choice == 'rapier':
-                    equippable_component = Equippable(EquipmentSlots.MAIN_HAND, power_bonus=3)
-                    item = Entity(x, y, '/', libtcod.sky, 'Rapier', equippable=equippable_component)
-                elif item_choice == 'buckler':
-                    equippable_component = Equippable(EquipmentSlots.OFF_HAND, defense_bonus=1)
-                    item = Entity(x, y, '[', libtcod.darker_orange, 'Buckler', equippable=equippable_component)
-                elif item_choice == 'fancy_hat':
-                    equippable_component = Equippable(EquipmentSlots.HEAD, defense_bonus=1)
-                    item = Entity(x, y, '^', libtcod.crimson, 'Fancy Hat', equippable=equippable_component)
-                elif item_choice == 'fancy_shirt':
-                    equippable_component = Equippable(EquipmentSlots.TORSO, defense_bonus=1)
-                    item = Entity(x, y, ';', libtcod.crimson, 'Fancy Shirt', equippable=equippable_component)
-                elif item_choice == 'fireball_scroll':
-                    item_component = Item(use_function=cast_fireball, targeting=True, targeting_message=Message(
-                    'Left-click a target for the fireball, or right-click to cancel.', libtcod.light_cyan),
-                                    damage=25, radius=3)
-                    item = Entity(x, y, '#', libtcod.red, 'Fireball Scroll', render_order=RenderOrder.ITEM,
-                                    item=item_component)
-                elif item_choice == 'confusion_scroll':
-                    item_component = Item(use_function=cast_confuse, targeting=True, targeting_message=Message(
-                        'Left-click an enemy to confuse it, or right-click to cancel.', libtcod.light_cyan))
-                    item = Entity(x, y, '#', libtcod.light_pink, 'Confusion Scroll', render_order=RenderOrder.ITEM,
-                                    item=item_component)
-                elif item_choice == 'flintlock':
-                    item_component = Item(use_function=cast_bullet, targeting=True, targeting_message=Message(
-                        'Left-click an enemy to shoot it, or right-click to cancel.', libtcod.light_cyan),
-                                    damage=40, maximum_range=5)
-                    item = Entity(x, y, '+', libtcod.light_pink, 'Flintlock', render_order=RenderOrder.ITEM,
-                                    item=item_component)
-                else:
-                    item_component = Item(use_function=cast_lightning, targeting=True, targeting_message=Message(
-                        'Left-click an enemy to lightning strike it, or right-click to cancel.', libtcod.light_cyan),
-                                    damage=40, maximum_range=5)
-                    item = Entity(x, y, '#', libtcod.yellow, 'Lightning Scroll', render_order=RenderOrder.ITEM,
-                                    item=item_component)
+            x = self.rng.randint(room.x1 + 1, room.x2 - 1)
+            y = self.rng.randint(room.y1 + 1, room.y2 - 1)
 
-                entities. append(item)
+            if not blocked[x, y] and not self.entity_index.get_entities_at(x, y):
+                item = templates[item_table.choose(self.rng)].spawn(x, y)
+
+                entities.append(item)
+                self.entity_index.add(item)
 
 
     def is_blocked(self, x, y):
-        if self.tiles[x][y].blocked:
+        if self.tiles.blocked[x, y]:
             return True
 
         return False
 
 
-    def next_floor(self, player, message_log, constants):
-        self.dungeon_level += 1
-        entities = [player]
-
-        self.tiles = self.initialize_tiles()
-        self.make_map(constants['max_rooms'], constants['room_min_size'], constants['room_max_size'],
-                        constants['map_width'], constants['map_height'], player, entities)
+    def next_floor(self, player, message_log, constants, entities=None):
+        entities = self.change_floor(self.dungeon_level + 1, player, constants, entities)
 
         player.fighter.heal(player.fighter.max_hp // 2)
 
         message_log.add_message(Message('You take a moment to rest and recover your strength.', libtcod.light_violet))
 
         return entities
+
+    def change_floor(self, dungeon_level, player, constants, entities=None):
+        # The entities being left become plain entities again
+        if self.entity_store is not None:
+            self.entity_store.clear()
+
+        if self.actor_scheduler is not None:
+            self.actor_scheduler.clear()
+
+        # Hand the floor being left to the floor store, if there is one, so it can be visited again
+        if self.floor_store is not None and entities is not None:
+            floor_entities = [entity for entity in entities if entity is not player]
+            self.floor_store.store_floor(self.dungeon_level, self.tiles, floor_entities, (player.x, player.y),
+                                         self.rooms, self.corridors)
+
+        self.dungeon_level = dungeon_level
+
+        if self.floor_store is not None and self.floor_store.has_floor(dungeon_level):
+            floor = self.floor_store.load_floor(dungeon_level)
+        elif self.floor_generator is not None:
+            # Use the floor built in the background if there is one, otherwise build it now
+            floor = self.floor_generator.take_floor(dungeon_level, self.seed, constants)
+        else:
+            floor = generate_floor(dungeon_level, self.seed, constants)
+
+        self.tiles, floor_entities, (player.x, player.y), self.rooms, self.corridors = floor
+        self.width, self.height = self.tiles.shape
+        self.tiles_changed()
+
+        entities = [player] + floor_entities
+
+        self.initialize_entity_index(entities)
+        self.initialize_path_map(entities)
+
+        if self.entity_store is not None:
+            self.entity_store.add_all(entities)
+
+        if self.actor_scheduler is not None:
+            self.actor_scheduler.add_all(entities)
+
+        self.flow_map = None
+        self.flow_origin = None
+
+        self.pregenerate_next_floor(constants)
+
+        return entities
+
+    def pregenerate_next_floor(self, constants):
+        next_level = self.dungeon_level + 1
+
+        if self.floor_generator is not None and not (self.floor_store is not None and
+                                                     self.floor_store.has_floor(next_level)):
+            self.floor_generator.request_floor(next_level, self.seed, constants)
+
+
+def generate_floor(dungeon_level, seed, constants):
+    # Build a brand new floor from its seed alone, without touching the game in progress, so the same
+    # floor comes out whether it is built here or in a worker process. A stand-in takes the player's place
+    game_map = GameMap(constants['map_width'], constants['map_height'], dungeon_level, seed)
+
+    stand_in = Entity(0, 0, '@', libtcod.white, 'Player', blocks=True)
+    entities = [stand_in]
+
+    game_map.make_floor(constants, stand_in, entities)
+
+    return game_map.tiles, entities[1:], (stand_in.x, stand_in.y), game_map.rooms, game_map.corridors
@@ -0,0 +1,202 @@
+import tcod as libtcod
+import numpy as np
+
+from map_objects.entity_index import EntityIndex
+from map_objects.rectangle import Rect
+
+
+# How many fills generate_caves tries before giving up on a cave and carving rooms instead
+CAVE_ATTEMPTS = 8
+
+
+def generate_rooms(game_map, constants, player, entities):
+    # The original generator: rectangular rooms dropped at random, each joined to the one before
+    game_map.make_map(constants['max_rooms'], constants['room_min_size'], constants['room_max_size'],
+                      constants['map_width'], constants['map_height'], player, entities)
+
+
+def count_wall_neighbours(walls):
+    # How many of the eight tiles around each tile are walls, for the whole grid at once. Off the map counts as wall
+    width, height = walls.shape
+    padded = np.pad(walls, 1, mode='constant', constant_values=True).astype(np.int8)
+
+    counts = np.zeros((width, height), dtype=np.int8)
+    for dx in range(3):
+        for dy in range(3):
+            counts += padded[dx:dx + width, dy:dy + height]
+
+    return counts - walls
+
+
+def flood_distances(open_tiles, x, y):
+    # Walking distance from (x, y) to every open tile; tiles that can't be reached are left at the maximum
+    distances = np.full(open_tiles.shape, np.iinfo(np.int32).max, dtype=np.int32)
+    distances[x, y] = 0
+
+    libtcod.path.dijkstra2d(distances, open_tiles.astype(np.int8), 1, 1, out=distances)
+
+    return distances
+
+
+def fill_cave(rng, width, height, constants):
+    # Start from noise, then smooth it: a tile becomes wall when most of its neighbours are
+    walls = rng.random((width, height)) < constants['cave_wall_chance']
+
+    for i in range(constants['cave_smoothing_passes']):
+        counts = count_wall_neighbours(walls)
+        walls = (counts >= 5) | (walls & (counts >= 4))
+
+    walls[0, :] = walls[-1, :] = walls[:, 0] = walls[:, -1] = True
+
+    return walls
+
+
+def generate_caves(game_map, constants, player, entities):
+    width, height = game_map.width, game_map.height
+    rng = np.random.default_rng(game_map.rng.getrandbits(64))
+
+    # A small map or a high wall chance can leave no open tile at all, so try a few fills
+    for i in range(CAVE_ATTEMPTS):
+        walls = fill_cave(rng, width, height, constants)
+
+        if not walls.all():
+            break
+    else:
+        generate_rooms(game_map, constants, player, entities)
+
+        return
+
+    # Keep only the cave reachable from the player's start, taking the biggest of a few tries
+    open_tiles = ~walls
+    open_count = np.count_nonzero(open_tiles)
+    open_xs, open_ys = np.nonzero(open_tiles)
+
+    best = None
+    for i in range(8):
+        start = rng.integers(len(open_xs))
+        distances = flood_distances(open_tiles, open_xs[start], open_ys[start])
+        reached = np.count_nonzero(distances < np.iinfo(np.int32).max)
+
+        if best is None or reached > best[0]:
+            best = (reached, int(open_xs[start]), int(open_ys[start]), distances)
+
+        if reached * 2 > open_count:
+            break
+
+    reached, player.x, player.y, distances = best
+
+    cave = distances < np.iinfo(np.int32).max
+    game_map.tiles.blocked[:] = ~cave
+    game_map.tiles.block_sight[:] = ~cave
+    game_map.tiles_changed()
+
+    game_map.entity_index = EntityIndex(entities)
+
+    # Entities are spread over the cave in room-sized blocks, skipping the blocks that are mostly rock
+    size = constants['room_max_size']
+    rooms = []
+
+    for x in range(0, width - 2, size):
+        for y in range(0, height - 2, size):
+            block = Rect(x, y, min(size, width - 1 - x), min(size, height - 1 - y))
+
+            if np.count_nonzero(cave[block.x1 + 1:block.x2, block.y1 + 1:block.y2]) * 3 >= \
+                    (block.x2 - block.x1 - 1) * (block.y2 - block.y1 - 1):
+                game_map.place_entities(block, entities)
+                rooms.append(block)
+
+    game_map.rooms = rooms
+    game_map.corridors = []
+
+    # The stairs go as far from the start as the cave allows
+    stairs_x, stairs_y = np.unravel_index(np.argmax(np.where(cave, distances, -1)), cave.shape)
+
+    game_map.finish_map(int(stairs_x), int(stairs_y), entities)
+
+
+def generate_bsp(game_map, constants, player, entities):
+    room_min_size = constants['room_min_size']
+    room_max_size = constants['room_max_size']
+
+    # Leaves are never split smaller than the largest room plus its walls, so only a leaf the size of the whole
+    # map can be too small for the room sizes. The room there is shrunk to fit
+    leaf_size = room_max_size + 2
+
+    rooms = []
+    corridors = []
+
+    def split(x, y, w, h):
+        # Returns the numbers of the rooms carved inside this part of the map
+        can_split_x = w >= leaf_size * 2
+        can_split_y = h >= leaf_size * 2
+
+        if can_split_x and can_split_y:
+            # Cut across the longer side, or either way if the part is roughly square
+            if w > h * 1.25:
+                can_split_y = False
+            elif h > w * 1.25:
+                can_split_x = False
+            elif game_map.rng.randint(0, 1) == 1:
+                can_split_y = False
+            else:
+                can_split_x = False
+
+        if can_split_x:
+            cut = game_map.rng.randint(leaf_size, w - leaf_size)
+            first = split(x, y, cut, h)
+            second = split(x + cut, y, w - cut, h)
+        elif can_split_y:
+            cut = game_map.rng.randint(leaf_size, h - leaf_size)
+            first = split(x, y, w, cut)
+            second = split(x, y + cut, w, h - cut)
+        else:
+            room_w = game_map.rng.randint(min(room_min_size, w - 1), min(room_max_size, w - 1))
+            room_h = game_map.rng.randint(min(room_min_size, h - 1), min(room_max_size, h - 1))
+            room = Rect(game_map.rng.randint(x, x + w - room_w - 1), game_map.rng.randint(y, y + h - room_h - 1),
+                        room_w, room_h)
+
+            game_map.create_room(room)
+            rooms.append(room)
+
+            return [len(rooms) - 1]
+
+        # Join the two halves with a corridor between a room on either side of the cut
+        first_room = first[-1]
+        second_room = second[0]
+        (prev_x, prev_y) = rooms[first_room].center()
+        (new_x, new_y) = rooms[second_room].center()
+
+        if game_map.rng.randint(0, 1) == 1:
+            game_map.create_h_tunnel(prev_x, new_x, prev_y)
+            game_map.create_v_tunnel(prev_y, new_y, new_x)
+        else:
+            game_map.create_v_tunnel(prev_y, new_y, prev_x)
+            game_map.create_h_tunnel(prev_x, new_x, new_y)
+
+        corridors.append((first_room, second_room))
+
+        return first + second
+
+    split(0, 0, game_map.width, game_map.height)
+
+    game_map.rooms = rooms
+    game_map.corridors = corridors
+
+    # The player starts in the first room and the stairs are in the last
+    (player.x, player.y) = rooms[0].center()
+    game_map.entity_index = EntityIndex(entities)
+
+    for room in rooms:
+        game_map.place_entities(room, entities)
+
+    (stairs_x, stairs_y) = rooms[-1].center()
+
+    game_map.finish_map(stairs_x, stairs_y, entities)
+
+
+# Generator names, as used by the map_generators constant
+MAP_GENERATORS = {
+    'rooms': generate_rooms,
+    'caves': generate_caves,
+    'bsp': generate_bsp
+}
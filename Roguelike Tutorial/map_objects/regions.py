@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def label_regions(blocked):
+    # Number every connected area of open tiles from 1 up, leaving walls at 0. Diagonal steps connect tiles, like
+    # they do for movement. Areas are numbered in the order of their first tile in the array
+    width, height = blocked.shape
+    open_tiles = ~blocked
+    tile_ids = np.arange(width * height).reshape(width, height)
+
+    # Each pair of neighbouring open tiles, looking right, down and along both diagonals
+    firsts = []
+    seconds = []
+
+    for first_slice, second_slice in (((slice(None), slice(None, -1)), (slice(None), slice(1, None))),
+                                      ((slice(None, -1), slice(None)), (slice(1, None), slice(None))),
+                                      ((slice(None, -1), slice(None, -1)), (slice(1, None), slice(1, None))),
+                                      ((slice(None, -1), slice(1, None)), (slice(1, None), slice(None, -1)))):
+        both_open = open_tiles[first_slice] & open_tiles[second_slice]
+        firsts.append(tile_ids[first_slice][both_open])
+        seconds.append(tile_ids[second_slice][both_open])
+
+    firsts = np.concatenate(firsts)
+    seconds = np.concatenate(seconds)
+
+    # Union-find over all the pairs at once: each root is hooked under the smaller root across any pair, then every
+    # tile jumps straight to its root. Once nothing changes, each area's root is its first tile
+    parents = np.arange(width * height)
+
+    while True:
+        first_roots = parents[firsts]
+        second_roots = parents[seconds]
+        unjoined = first_roots != second_roots
+
+        if not unjoined.any():
+            break
+
+        low_roots = np.minimum(first_roots[unjoined], second_roots[unjoined])
+        high_roots = np.maximum(first_roots[unjoined], second_roots[unjoined])
+        np.minimum.at(parents, high_roots, low_roots)
+
+        while True:
+            grandparents = parents[parents]
+
+            if np.array_equal(grandparents, parents):
+                break
+
+            parents = grandparents
+
+        # Pairs already inside one area stay that way
+        firsts = firsts[unjoined]
+        seconds = seconds[unjoined]
+
+    labels = np.zeros(width * height, dtype=np.int32)
+    open_ids = np.flatnonzero(open_tiles)
+    labels[open_ids] = np.unique(parents[open_ids], return_inverse=True)[1].reshape(-1) + 1
+
+    return labels.reshape(width, height)
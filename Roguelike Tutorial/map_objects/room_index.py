@@ -0,0 +1,28 @@
+class RoomIndex:
+    """
+    Rooms bucketed by the cells of a coarse grid that they touch, so a new room is only checked for overlaps
+    against the rooms near it instead of every room on the map.
+    """
+    def __init__(self, cell_size=16):
+        self.cell_size = cell_size
+        self.buckets = {}
+
+    def get_cells(self, room):
+        # The edges of a room count as part of it, like in Rect.intersect
+        cell_size = self.cell_size
+
+        for cell_x in range(room.x1 // cell_size, room.x2 // cell_size + 1):
+            for cell_y in range(room.y1 // cell_size, room.y2 // cell_size + 1):
+                yield (cell_x, cell_y)
+
+    def add(self, room):
+        for cell in self.get_cells(room):
+            self.buckets.setdefault(cell, []).append(room)
+
+    def intersects(self, room):
+        for cell in self.get_cells(room):
+            for other_room in self.buckets.get(cell, ()):
+                if room.intersect(other_room):
+                    return True
+
+        return False
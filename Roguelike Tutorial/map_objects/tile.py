@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Tile:
     """
     A tile on a map. It may or may not be blocked, and may or may not block sight.
@@ -12,3 +15,40 @@ class Tile:
         self.block_sight = block_sight
 
         self.explored = False
+
+
+# One record per map cell. The fields mirror the attributes of Tile, so a cell read through
+# tiles[x][y] still exposes .blocked, .block_sight and .explored
+tile_dt = np.dtype([
+    ('blocked', np.bool_),
+    ('block_sight', np.bool_),
+    ('explored', np.bool_)
+])
+
+
+def new_tile_array(width, height, blocked=True, block_sight=None):
+    """
+    Build a width x height grid of tiles, indexed as tiles[x][y] or tiles[x, y].
+    Whole planes are available as tiles.blocked, tiles.block_sight and tiles.explored.
+    """
+    if block_sight is None:
+        block_sight = blocked
+
+    fill = np.array((blocked, block_sight, False), dtype=tile_dt)
+
+    return np.full((width, height), fill, dtype=tile_dt).view(np.recarray)
+
+
+def tiles_from_list(tile_list):
+    # Convert a legacy list of lists of Tile objects (older save games) into a tile array
+    width = len(tile_list)
+    height = len(tile_list[0]) if width else 0
+
+    tiles = new_tile_array(width, height)
+
+    for x, column in enumerate(tile_list):
+        tiles.blocked[x] = [tile.blocked for tile in column]
+        tiles.block_sight[x] = [tile.block_sight for tile in column]
+        tiles.explored[x] = [tile.explored for tile in column]
+
+    return tiles
@@ -1,28 +1,95 @@
 import tcod as libtcod
 
+from collections import OrderedDict
+
+from equipment_slots import EquipmentSlots
+
+
+# How the inventory shows where an item is equipped
+EQUIPPED_LABELS = {
+    EquipmentSlots.MAIN_HAND: 'in main hand',
+    EquipmentSlots.OFF_HAND: 'in off hand',
+    EquipmentSlots.HEAD: 'on head',
+    EquipmentSlots.TORSO: 'on torso',
+    EquipmentSlots.LEGS: 'on legs',
+    EquipmentSlots.HANDS: 'on hands',
+    EquipmentSlots.FEET: 'on feet'
+}
+
+
+class WindowCache:
+    """
+    Menu windows that were already drawn, keyed by everything drawn on them, so a menu that stays open is only
+    blitted again. The consoles of windows that fall out of the cache are kept to draw new windows of the same
+    size on.
+    """
+    def __init__(self, max_windows=8, max_free_consoles=2):
+        self.windows = OrderedDict()
+        self.free_consoles = {}
+
+        self.max_windows = max_windows
+        self.max_free_consoles = max_free_consoles
+
+    def get(self, key):
+        window = self.windows.get(key)
+
+        if window is not None:
+            self.windows.move_to_end(key)
+
+        return window
+
+    def new_window(self, key, width, height):
+        free_consoles = self.free_consoles.get((width, height))
+
+        if free_consoles:
+            window = free_consoles.pop()
+            libtcod.console_clear(window)
+        else:
+            window = libtcod.console_new(width, height)
+
+        self.windows[key] = window
+
+        while len(self.windows) > self.max_windows:
+            old_key, old_window = self.windows.popitem(last=False)
+            free_consoles = self.free_consoles.setdefault((old_window.width, old_window.height), [])
+
+            if len(free_consoles) < self.max_free_consoles:
+                free_consoles.append(old_window)
+
+        return window
+
+
+menu_windows = WindowCache()
+
 
 def menu (con, header, options, width, screen_width, screen_height):
     if len(options) > 26: raise ValueError ('Cannot have a menu with more than 26 options')
 
-    # calculate total height for the header (after auto-wrap) and one line per option
-    header_height = libtcod.console_get_height_rect(con, 0, 0, width, screen_height, header)
-    height = len(options) + header_height
+    key = ('menu', header, tuple(options), width, screen_height)
+    window = menu_windows.get(key)
 
-    # create an off-screen console that represents the menu's window
-    window = libtcod.console_new(width, height)
+    if window is None:
+        # calculate total height for the header (after auto-wrap) and one line per option
+        header_height = libtcod.console_get_height_rect(con, 0, 0, width, screen_height, header)
+        height = len(options) + header_height
 
-    # print the header, with auto-wrap
-    libtcod.console_set_default_foreground(window, libtcod.white)
-    libtcod.console_print_rect_ex(window, 0, 0, width, height, libtcod.BKGND_NONE, libtcod.LEFT, header)
+        # create an off-screen console that represents the menu's window
+        window = menu_windows.new_window(key, width, height)
+
+        # print the header, with auto-wrap
+        libtcod.console_set_default_foreground(window, libtcod.white)
+        libtcod.console_print_rect_ex(window, 0, 0, width, height, libtcod.BKGND_NONE, libtcod.LEFT, header)
 
-    # print all the options
-    y = header_height
-    letter_index = ord('a')
-    for option_text in options:
-        text = '(' + chr(letter_index) + ')' + option_text
-        libtcod.console_print_ex(window, 0, y, libtcod.BKGND_NONE, libtcod.LEFT, text)
-        y += 1
-        letter_index += 1
+        # print all the options
+        y = header_height
+        letter_index = ord('a')
+        for option_text in options:
+            text = '(' + chr(letter_index) + ')' + option_text
+            libtcod.console_print_ex(window, 0, y, libtcod.BKGND_NONE, libtcod.LEFT, text)
+            y += 1
+            letter_index += 1
+
+    height = window.height
 
     # blit the contents of "window" to the root console
     x = int(screen_width / 2 - width / 2)
@@ -37,20 +104,10 @@ def inventory_menu(con, header, player, inventory_width, screen_width, screen_he
         options = []
 
         for item in player.inventory.items:
-            if player.equipment.main_hand == item:
-                options.append('{0} (in main hand)'.format(item.name))
-            elif player.equipment.off_hand == item:
-                options.append('{0} (in off hand)'.format(item.name))
-            elif player.equipment.head == item:
-                options.append('{0} (on head)'.format(item.name))
-            elif player.equipment.torso == item:
-                options.append('{0} (on torso)'.format(item.name))
-            elif player.equipment.legs == item:
-                options.append('{0} (on legs)'.format(item.name))
-            elif player.equipment.hands == item:
-                options.append('{0} (on hands)'.format(item.name))
-            elif player.equipment.feet == item:
-                options.append('{0} (on feet)'.format(item.name))
+            slot = player.equipment.get_slot(item)
+
+            if slot:
+                options.append('{0} ({1})'.format(item.name, EQUIPPED_LABELS[slot]))
             else:
                 options.append(item.name)
 
@@ -75,8 +132,21 @@ def level_up_menu(con, header, player, menu_width, screen_width, screen_height):
     menu(con, header, options, menu_width, screen_width, screen_height)
 
 def character_screen(player, character_screen_width, character_screen_height, screen_width, screen_height):
-    window = libtcod.console_new(character_screen_width, character_screen_height)
+    key = ('character_screen', character_screen_width, character_screen_height, player.level.current_level,
+           player.level.current_xp, player.level.experience_to_next_level, player.fighter.max_hp,
+           player.fighter.power, player.fighter.defense)
+    window = menu_windows.get(key)
+
+    if window is None:
+        window = menu_windows.new_window(key, character_screen_width, character_screen_height)
+        draw_character_screen(window, player, character_screen_width, character_screen_height)
+
+    x = screen_width // 2 - character_screen_width // 2
+    y = screen_height // 2 - character_screen_height // 2
+    libtcod.console_blit(window, 0, 0, character_screen_width, character_screen_height, 0, x, y, 1.0, 0.7)
+
 
+def draw_character_screen(window, player, character_screen_width, character_screen_height):
     libtcod.console_set_default_foreground(window, libtcod.white)
 
     libtcod.console_print_rect_ex(window, 0, 1, character_screen_width, character_screen_height, libtcod.BKGND_NONE,
@@ -94,10 +164,6 @@ def character_screen(player, character_screen_width, character_screen_height, sc
     libtcod.console_print_rect_ex(window, 0, 8, character_screen_width, character_screen_height, libtcod.BKGND_NONE,
                                   libtcod.LEFT, 'Defense: {0}'.format(player.fighter.defense))
 
-    x = screen_width // 2 - character_screen_width // 2
-    y = screen_height // 2 - character_screen_height // 2
-    libtcod.console_blit(window, 0, 0, character_screen_width, character_screen_height, 0, x, y, 1.0, 0.7)
-
 
 def message_box(con, header, width, screen_width, screen_height):
     menu(con, header, [], width, screen_width, screen_height)
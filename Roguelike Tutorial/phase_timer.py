@@ -0,0 +1,138 @@
+import json
+import time
+
+from collections import deque
+from contextlib import nullcontext
+
+
+# The phases of the game loop, in the order they are shown
+PHASES = ('idle', 'input', 'fov', 'render', 'flush', 'turn', 'player', 'enemies')
+
+# Handed out by NullPhaseTimer for every phase, so a disabled timer costs one call and an empty with block
+NULL_PHASE = nullcontext()
+
+
+class Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.record(self.name, self.start, time.perf_counter())
+
+
+class PhaseTimer:
+    """
+    Times the phases of each frame of the game loop. The totals of the last few frames are kept for each phase
+    for the overlay, and every frame can also be written to a trace file: JSON lines, or the Chrome trace event
+    format (chrome://tracing, Perfetto) if the file name ends in .json.
+    """
+    enabled = True
+
+    def __init__(self, window=120, trace_path=None):
+        self.window = window
+        self.samples = {phase: deque(maxlen=window) for phase in PHASES}
+
+        self.origin = time.perf_counter()
+        self.frame_number = 0
+        self.frame_start = self.origin
+
+        # (phase, start, end) for the frame in progress
+        self.events = []
+
+        self.trace_file = None
+        self.chrome_trace = False
+
+        if trace_path:
+            self.trace_file = open(trace_path, 'w')
+            self.chrome_trace = trace_path.endswith('.json')
+
+            if self.chrome_trace:
+                self.trace_file.write('[\n')
+
+        self.first_trace_event = True
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def record(self, name, start, end):
+        self.events.append((name, start, end))
+
+    def end_frame(self):
+        totals = dict.fromkeys(PHASES, 0.0)
+
+        for (name, start, end) in self.events:
+            totals[name] = totals.get(name, 0.0) + end - start
+
+        for name, total in totals.items():
+            self.samples.setdefault(name, deque(maxlen=self.window)).append(total)
+
+        if self.trace_file is not None:
+            self.write_frame(totals)
+
+        self.events = []
+        self.frame_number += 1
+        self.frame_start = time.perf_counter()
+
+    def write_frame(self, totals):
+        if self.chrome_trace:
+            # Complete events, with times in microseconds since the timer started
+            for (name, start, end) in self.events:
+                event = {'name': name, 'ph': 'X', 'pid': 1, 'tid': 1, 'ts': (start - self.origin) * 1e6,
+                         'dur': (end - start) * 1e6, 'args': {'frame': self.frame_number}}
+
+                self.trace_file.write(('' if self.first_trace_event else ',\n') + json.dumps(event))
+                self.first_trace_event = False
+        else:
+            frame = {
+                'frame': self.frame_number,
+                'start_ms': (self.frame_start - self.origin) * 1000,
+                'phases_ms': {name: total * 1000 for name, total in totals.items() if total}
+            }
+
+            self.trace_file.write(json.dumps(frame) + '\n')
+
+    def get_stats(self):
+        # p50, p95 and max of each phase over the recent frames, in milliseconds
+        stats = []
+
+        for name in PHASES:
+            samples = sorted(self.samples[name])
+
+            if samples:
+                stats.append((name, samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.95)] * 1000,
+                              samples[-1] * 1000))
+
+        return stats
+
+    def close(self):
+        if self.trace_file is not None:
+            if self.chrome_trace:
+                self.trace_file.write('\n]\n')
+
+            self.trace_file.close()
+            self.trace_file = None
+
+
+class NullPhaseTimer:
+    # Stands in for PhaseTimer when timing is off
+    enabled = False
+
+    def phase(self, name):
+        return NULL_PHASE
+
+    def end_frame(self):
+        pass
+
+    def get_stats(self):
+        return []
+
+    def close(self):
+        pass
+
@@ -1,4 +1,8 @@
-from random import randint
+import random
+
+from bisect import bisect_left
+
+import numpy as np
 
 
 def from_dungeon_level(table, dungeon_level):
@@ -9,8 +13,8 @@ def from_dungeon_level(table, dungeon_level):
     return 0
 
 
-def random_choice_index(chances):
-    random_chance = randint(1, sum(chances))
+def random_choice_index(chances, rng=random):
+    random_chance = rng.randint(1, sum(chances))
 
     running_sum = 0
     choice = 0
@@ -22,8 +26,43 @@ def random_choice_index(chances):
         choice += 1
 
 
-def random_choice_from_dict(choice_dict):
+def random_choice_from_dict(choice_dict, rng=random):
     choices = list(choice_dict.keys())
     chances = list(choice_dict.values())
 
-    return choices[random_choice_index(chances)]
+    return choices[random_choice_index(chances, rng)]
+
+
+class SpawnTable:
+    """
+    A weighted choice compiled once: the running sums of the chances are kept so each draw is a binary search.
+    Draws use the random numbers random_choice_from_dict would, so the same seed picks the same things.
+    """
+    def __init__(self, choice_dict):
+        self.choices = list(choice_dict.keys())
+        self.cumulative = []
+
+        running_sum = 0
+        for chance in choice_dict.values():
+            running_sum += chance
+            self.cumulative.append(running_sum)
+
+        self.total = running_sum
+
+    def choose(self, rng=random):
+        return self.choices[bisect_left(self.cumulative, rng.randint(1, self.total))]
+
+    def choose_many(self, count, rng=random):
+        # A numpy Generator draws the whole batch at once
+        if isinstance(rng, np.random.Generator):
+            rolls = rng.integers(1, self.total + 1, size=count)
+            indexes = np.searchsorted(np.asarray(self.cumulative), rolls, side='left')
+
+            return [self.choices[index] for index in indexes]
+
+        choices = self.choices
+        cumulative = self.cumulative
+        randint = rng.randint
+        total = self.total
+
+        return [choices[bisect_left(cumulative, randint(1, total))] for i in range(count)]
@@ -1,5 +1,7 @@
 import tcod as libtcod
 
+import numpy as np
+
 from enum import Enum
 
 from game_states import GameStates
@@ -14,11 +16,31 @@ class RenderOrder(Enum):
     ACTOR = 4
 
 
-def get_names_under_mouse(mouse, entities, fov_map):
+# States that draw a window over the map
+MENU_STATES = (GameStates.SHOW_INVENTORY, GameStates.DROP_INVENTORY, GameStates.LEVEL_UP,
+               GameStates.CHARACTER_SCREEN)
+
+
+class RenderTracker:
+    """
+    Remembers what the last frame drew, so the next one only redraws the map cells and panel that changed,
+    or nothing at all.
+    """
+    def __init__(self):
+        self.redraw_all = True
+        self.entity_index = None
+        self.game_state = None
+        self.panel_signature = None
+
+    def invalidate(self):
+        self.redraw_all = True
+
+
+def get_names_under_mouse(mouse, game_map, fov_map):
     (x, y) = (mouse.cx, mouse.cy)
 
-    names = [entity.name for entity in entities
-            if entity.x == x and entity.y == y and libtcod.map_is_in_fov(fov_map, entity.x, entity.y)]
+    names = [entity.name for entity in game_map.entity_index.get_entities_at(x, y)
+            if libtcod.map_is_in_fov(fov_map, entity.x, entity.y)]
     names = ', '.join(names)
 
     return names.capitalize()
@@ -39,37 +61,121 @@ def render_bar(panel, x, y, total_width, name, value, maximum, bar_color, back_c
     ###libtcod.console_print_ex(panel, int(x + total_width / 2), y, libtcod.BKGND_NONE, libtcod.CENTER,
                             ###'{0}: {1}/{2}'.format(name, value, maximum))
 
+def render_map(con, game_map, fov_map, colors):
+    # Only the part of the map that fits on the console is drawn
+    width = min(game_map.width, con.width)
+    height = min(game_map.height, con.height)
+
+    # Work on [y, x] views so the masks line up with the fov map and the console buffers
+    tiles = game_map.tiles[:width, :height]
+    visible = fov_map.fov[:height, :width]
+    wall = tiles.block_sight.T
+    explored = tiles.explored.T
+
+    # Everything in view becomes explored
+    explored |= visible
+
+    background = con.bg[:height, :width]
+
+    # Unexplored cells keep whatever background they already have
+    background[:] = np.select(
+        [(visible & wall)[..., np.newaxis], visible[..., np.newaxis],
+         (explored & wall)[..., np.newaxis], explored[..., np.newaxis]],
+        [colors.get('light_wall'), colors.get('light_ground'), colors.get('dark_wall'), colors.get('dark_ground')],
+        default=background
+    )
+
+
 def render_all(con, panel, entities, player, game_map, fov_map, fov_recompute, message_log, screen_width, screen_height,
-                bar_width, panel_height, panel_y, mouse, colors, game_state):
-
-    if fov_recompute:
-        # Draw all the tiles in the game map
-        for y in range(game_map.height):
-            for x in range(game_map.width):
-                visible = libtcod.map_is_in_fov(fov_map, x, y)
-                wall = game_map.tiles[x][y].block_sight
-
-                if visible:
-                    if wall:
-                        libtcod.console_set_char_background(con, x, y, colors.get('light_wall'), libtcod.BKGND_SET)
-                    else:
-                        libtcod.console_set_char_background(con, x, y, colors.get('light_ground'), libtcod.BKGND_SET)
-
-                    game_map.tiles[x][y].explored = True
-                elif game_map.tiles[x][y].explored:
-                    if wall:
-                        libtcod.console_set_char_background(con, x, y, colors.get('dark_wall'), libtcod.BKGND_SET)
-                    else:
-                        libtcod.console_set_char_background(con, x, y, colors.get('dark_ground'), libtcod.BKGND_SET)
+                bar_width, panel_height, panel_y, mouse, colors, game_state, root=0, tracker=None):
+    # Without a tracker everything is drawn; with one, only what changed. Returns whether anything was drawn.
+    if tracker is None:
+        if fov_recompute:
+            # Draw all the tiles in the game map
+            render_map(con, game_map, fov_map, colors)
 
-    entities_in_render_order = sorted(entities, key=lambda x: x.render_order.value)
+        draw_entities(con, entities, fov_map, game_map)
+        libtcod.console_blit(con, 0, 0, screen_width, screen_height, root, 0, 0)
 
-    # Draw all entities in the list
-    for entity in entities_in_render_order:
-        draw_entity(con, entity, fov_map, game_map)
+        render_panel(panel, player, game_map, fov_map, message_log, bar_width, mouse)
+        libtcod.console_blit(panel, 0, 0, screen_width, panel_height, root, 0, panel_y)
+
+        render_menus(con, player, screen_width, screen_height, game_state)
+
+        return True
+
+    entity_index = game_map.entity_index
+
+    # A new floor, a new field of view or a window opening or closing means drawing the whole map again
+    redraw_map = tracker.redraw_all or fov_recompute or entity_index is not tracker.entity_index or \
+        game_state != tracker.game_state
+    dirty_cells = entity_index.take_dirty_cells()
+
+    panel_signature = (message_log.version, player.fighter.hp, player.fighter.max_hp, game_map.dungeon_level,
+                       get_names_under_mouse(mouse, game_map, fov_map))
+    redraw_panel = panel_signature != tracker.panel_signature
+
+    if not (redraw_map or redraw_panel or dirty_cells):
+        return False
+
+    # Anything drawn under a window means drawing the window again on top
+    if game_state in MENU_STATES:
+        redraw_map = True
+
+    if redraw_map:
+        render_map(con, game_map, fov_map, colors)
 
-    libtcod.console_blit(con, 0, 0, screen_width, screen_height, 0, 0, 0)
+        # Wipe the characters left from the last frame, then draw every entity
+        con.ch[:game_map.height, :game_map.width] = ord(' ')
+        draw_entities(con, entities, fov_map, game_map)
 
+        libtcod.console_blit(con, 0, 0, screen_width, screen_height, root, 0, 0)
+    else:
+        for (x, y) in dirty_cells:
+            if x >= con.width or y >= con.height:
+                continue
+
+            draw_cell(con, x, y, fov_map, game_map)
+            libtcod.console_blit(con, x, y, 1, 1, root, x, y)
+
+    if redraw_map or redraw_panel:
+        render_panel(panel, player, game_map, fov_map, message_log, bar_width, mouse)
+        libtcod.console_blit(panel, 0, 0, screen_width, panel_height, root, 0, panel_y)
+
+    if redraw_map:
+        render_menus(con, player, screen_width, screen_height, game_state)
+
+    tracker.redraw_all = False
+    tracker.entity_index = entity_index
+    tracker.game_state = game_state
+    tracker.panel_signature = panel_signature
+
+    return True
+
+
+def render_timings(panel, timer, screen_width, panel_height, panel_y, root=0):
+    # The timings of the recent frames, in two columns over the right of the panel
+    column_width = 30
+    x = screen_width - column_width * 2
+
+    header = '{0:<8}{1:>7}{2:>7}{3:>7}'.format('ms', 'p50', 'p95', 'max')
+    lines = ['{0:<8}{1:>7.2f}{2:>7.2f}{3:>7.2f}'.format(*phase_stats) for phase_stats in timer.get_stats()]
+
+    libtcod.console_set_default_background(panel, libtcod.black)
+    libtcod.console_set_default_foreground(panel, libtcod.light_yellow)
+
+    for column in range(2):
+        column_lines = [header] + lines[column * (panel_height - 1):(column + 1) * (panel_height - 1)]
+
+        for y in range(panel_height):
+            line = column_lines[y] if y < len(column_lines) else ''
+            libtcod.console_print_ex(panel, x + column * column_width, y, libtcod.BKGND_SET, libtcod.LEFT,
+                                     line.ljust(column_width))
+
+    libtcod.console_blit(panel, x, 0, column_width * 2, panel_height, root, x, panel_y)
+
+
+def render_panel(panel, player, game_map, fov_map, message_log, bar_width, mouse):
     libtcod.console_set_default_background(panel, libtcod.black)
     libtcod.console_clear(panel)
 
@@ -87,10 +193,10 @@ def render_all(con, panel, entities, player, game_map, fov_map, fov_recompute, m
 
     libtcod.console_set_default_foreground(panel, libtcod.light_gray)
     libtcod.console_print_ex(panel, 1, 0, libtcod.BKGND_NONE, libtcod.LEFT,
-                            get_names_under_mouse(mouse, entities, fov_map))
+                            get_names_under_mouse(mouse, game_map, fov_map))
 
-    libtcod.console_blit(panel, 0, 0, screen_width, panel_height, 0, 0, panel_y)
 
+def render_menus(con, player, screen_width, screen_height, game_state):
     if game_state in (GameStates.SHOW_INVENTORY, GameStates.DROP_INVENTORY):
         if game_state == GameStates.SHOW_INVENTORY:
             inventory_title = 'Press the key next to an item to use it, or Esc to cancel.\n'
@@ -105,16 +211,20 @@ def render_all(con, panel, entities, player, game_map, fov_map, fov_recompute, m
     elif game_state == GameStates.CHARACTER_SCREEN:
         character_screen(player, 30, 10, screen_width, screen_height)
 
-def clear_all(con, entities):
-    for entity in entities:
-        clear_entity(con, entity)
+def draw_entities(con, entities, fov_map, game_map):
+    entities_in_render_order = sorted(entities, key=lambda x: x.render_order.value)
+
+    # Draw all entities in the list
+    for entity in entities_in_render_order:
+        draw_entity(con, entity, fov_map, game_map)
+
+def draw_cell(con, x, y, fov_map, game_map):
+    # Redraw a single tile: clear it, then draw whatever stands there now
+    libtcod.console_put_char(con, x, y, ' ', libtcod.BKGND_NONE)
+
+    draw_entities(con, game_map.entity_index.get_entities_at(x, y), fov_map, game_map)
 
 def draw_entity(con, entity, fov_map, game_map):
     if libtcod.map_is_in_fov(fov_map, entity.x, entity.y) or (entity.stairs and game_map.tiles[entity.x][entity.y].explored):
         libtcod.console_set_default_foreground(con, entity.color)
         libtcod.console_put_char(con, entity.x, entity.y, entity.char, libtcod.BKGND_NONE)
-
-
-def clear_entity(con, entity):
-    # erase the character that represents this object
-    libtcod.console_put_char(con, entity.x, entity.y, ' ', libtcod.BKGND_NONE)
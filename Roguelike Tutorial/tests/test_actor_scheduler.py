@@ -0,0 +1,162 @@
+import random
+
+import tcod as libtcod
+
+from actor_scheduler import ActorScheduler
+from components.ai import BasicMonster, ConfusedMonster
+from entity import Entity
+from fov_functions import initialize_fov, recompute_fov
+from game_session import GameSession
+from game_states import GameStates
+from item_functions import cast_confuse
+from loader_functions.entity_templates import get_templates
+from loader_functions.initialize_new_game import get_constants, get_game_variables
+from map_objects.entity_index import EntityIndex
+from map_objects.game_map import GameMap
+from map_objects.rectangle import Rect
+
+
+class RestlessAI:
+    # Acts every turn, seen or not
+    def __init__(self, speed=100):
+        self.speed = speed
+
+
+def make_actor(name, ai):
+    return Entity(0, 0, 's', libtcod.white, name, blocks=True, ai=ai)
+
+
+def test_actors_act_in_the_order_they_were_added():
+    scheduler = ActorScheduler()
+    actors = [make_actor(str(i), RestlessAI()) for i in range(5)]
+    scheduler.add_all(actors + [Entity(0, 0, '>', libtcod.white, 'Stairs')])
+
+    assert list(scheduler.get_turn_actors()) == actors
+    assert list(scheduler.get_turn_actors()) == actors
+
+
+def test_faster_actors_act_more_often():
+    scheduler = ActorScheduler()
+    fast = make_actor('fast', RestlessAI(200))
+    normal = make_actor('normal', RestlessAI())
+    slow = make_actor('slow', RestlessAI(50))
+    scheduler.add_all([slow, normal, fast])
+
+    turns = [list(scheduler.get_turn_actors()) for i in range(4)]
+
+    assert turns[0] == [slow, normal, fast, fast]
+    assert turns[1] == [normal, fast, fast]
+    assert sum(turn.count(fast) for turn in turns) == 8
+    assert sum(turn.count(normal) for turn in turns) == 4
+    assert sum(turn.count(slow) for turn in turns) == 2
+
+
+def test_removed_actors_do_not_act():
+    scheduler = ActorScheduler()
+    actors = [make_actor(str(i), RestlessAI()) for i in range(3)]
+    scheduler.add_all(actors)
+
+    scheduler.remove(actors[1])
+
+    assert list(scheduler.get_turn_actors()) == [actors[0], actors[2]]
+
+
+def test_monsters_sleep_until_woken():
+    scheduler = ActorScheduler()
+    monster = make_actor('monster', BasicMonster())
+    scheduler.add(monster)
+
+    assert list(scheduler.get_turn_actors()) == []
+
+    scheduler.wake(monster)
+
+    assert list(scheduler.get_turn_actors()) == [monster]
+
+
+def make_room_with_monsters(*positions):
+    game_map = GameMap(30, 12)
+    game_map.create_room(Rect(0, 0, 10, 10))
+    game_map.create_room(Rect(20, 0, 8, 8))
+
+    monsters = [Entity(x, y, 's', libtcod.white, 'Monster', blocks=True, ai=BasicMonster()) for (x, y) in positions]
+
+    game_map.entity_index = EntityIndex(monsters)
+    game_map.actor_scheduler = ActorScheduler()
+    game_map.actor_scheduler.add_all(monsters)
+
+    fov_map = initialize_fov(game_map)
+    recompute_fov(fov_map, 2, 2, 10)
+
+    return game_map, fov_map, monsters
+
+
+def test_monsters_in_view_are_woken():
+    game_map, fov_map, (near, far) = make_room_with_monsters((5, 5), (23, 3))
+
+    game_map.actor_scheduler.wake_in_view(fov_map, 2, 2, 10, game_map.entity_index)
+
+    assert list(game_map.actor_scheduler.get_turn_actors()) == [near]
+
+
+def test_confused_monsters_are_woken():
+    game_map, fov_map, (monster,) = make_room_with_monsters((5, 5))
+
+    results = cast_confuse(game_map=game_map, fov_map=fov_map, target_x=5, target_y=5)
+
+    assert results[0]['consumed']
+    assert isinstance(monster.ai, ConfusedMonster)
+    assert list(game_map.actor_scheduler.get_turn_actors()) == [monster]
+
+
+def play(seed, actor_scheduler):
+    random.seed(seed)
+
+    constants = get_constants()
+    constants['pregenerate_floors'] = False
+    constants['message_history_file'] = None
+    constants['actor_scheduler'] = actor_scheduler
+
+    player, entities, game_map, message_log, game_state = get_game_variables(constants)
+    player.fighter.base_max_hp = player.fighter.hp = 10 ** 6
+
+    for i in range(20):
+        player.inventory.add_item(get_templates()['confusion_scroll'].spawn(0, 0))
+
+    session = GameSession(player, entities, game_map, message_log, game_state, constants)
+    moves = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+
+    positions = []
+    confused_turns = 0
+
+    for i in range(300):
+        if session.game_state == GameStates.LEVEL_UP:
+            session.step({'level_up': 'hp'})
+        elif i % 20 == 0:
+            # Confuse the first monster in view, which will then wander out of sight
+            targets = [entity for entity in session.entities if entity.ai and
+                       libtcod.map_is_in_fov(session.fov_map, entity.x, entity.y)]
+
+            scrolls = [index for index, item in enumerate(player.inventory.items) if item.name == 'Confusion Scroll']
+
+            if targets and scrolls:
+                session.step({'show_inventory': True})
+                session.step({'inventory_index': scrolls[0]})
+                session.step({}, {'left_click': (targets[0].x, targets[0].y)})
+        else:
+            session.step({'move': random.choice(moves)})
+
+        positions.append([(entity.name, entity.x, entity.y) for entity in session.entities])
+        confused_turns += sum(isinstance(entity.ai, ConfusedMonster) for entity in session.entities)
+
+    session.close()
+
+    return positions, confused_turns
+
+
+def test_seeded_play_is_the_same_with_the_scheduler():
+    # Seeds where the player meets monsters early on
+    for seed in (1, 3, 5):
+        positions, confused_turns = play(seed, True)
+
+        assert confused_turns
+        assert positions == play(seed, False)[0]
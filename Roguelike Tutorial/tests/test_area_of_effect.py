@@ -0,0 +1,156 @@
+import numpy as np
+import tcod as libtcod
+
+from area_of_effect import get_blast_area, get_cone_mask, get_entities_in_area, get_line_mask
+from components.fighter import Fighter
+from entity import Entity
+from entity_store import EntityStore
+from fov_functions import initialize_fov, recompute_fov
+from item_functions import cast_fireball
+from map_objects.game_map import GameMap
+
+
+def make_map(wall_x=None):
+    # An open map, with a wall all the way down column wall_x
+    game_map = GameMap(20, 15)
+    game_map.tiles.blocked[:] = False
+    game_map.tiles.block_sight[:] = False
+
+    if wall_x is not None:
+        game_map.tiles.blocked[wall_x, :] = True
+        game_map.tiles.block_sight[wall_x, :] = True
+
+    return game_map
+
+
+def make_monster(x, y, name='Monster'):
+    return Entity(x, y, 'o', libtcod.white, name, blocks=True, fighter=Fighter(hp=30, defense=0, power=3))
+
+
+def get_disc(game_map, x, y, radius):
+    return {(i, j) for i in range(game_map.width) for j in range(game_map.height)
+            if (i - x) ** 2 + (j - y) ** 2 <= radius ** 2}
+
+
+def test_circle_in_the_open():
+    game_map = make_map()
+
+    area = get_blast_area(game_map, 8, 7, 3)
+
+    assert set(area.get_tiles()) == get_disc(game_map, 8, 7, 3)
+    assert area.contains(8, 7) and not area.contains(12, 7)
+    assert area.contains(np.array([8, 11, 30]), np.array([4, 7, -2])).tolist() == [True, True, False]
+
+
+def test_shapes_are_clipped_at_the_map_border():
+    game_map = make_map()
+
+    circle = get_blast_area(game_map, 0, 0, 3)
+    assert (circle.x0, circle.y0) == (0, 0)
+    assert set(circle.get_tiles()) == get_disc(game_map, 0, 0, 3)
+
+    circle = get_blast_area(game_map, 19, 14, 3)
+    assert set(circle.get_tiles()) == get_disc(game_map, 19, 14, 3)
+
+    # Pointing off the map reaches nothing
+    cone = get_blast_area(game_map, 0, 7, 4, 'cone', -3, 7)
+    assert cone.get_tiles() == []
+
+    line = get_blast_area(game_map, 2, 5, 5, 'line', 1, 5)
+    assert sorted(line.get_tiles()) == [(0, 5), (1, 5)]
+
+    line = get_blast_area(game_map, 17, 12, 5, 'line', 18, 13)
+    assert sorted(line.get_tiles()) == [(18, 13), (19, 14)]
+
+
+def test_shapes_stop_at_walls():
+    game_map = make_map(wall_x=10)
+
+    # The wall itself is hit, nothing behind it is
+    for area in (get_blast_area(game_map, 8, 7, 5),
+                 get_blast_area(game_map, 8, 7, 5, 'cone', 12, 7),
+                 get_blast_area(game_map, 8, 7, 5, 'line', 9, 7)):
+        tiles = area.get_tiles()
+
+        assert (10, 7) in tiles
+        assert all(x <= 10 for (x, y) in tiles)
+
+    line = get_blast_area(game_map, 8, 7, 5, 'line', 9, 7)
+    assert sorted(line.get_tiles()) == [(9, 7), (10, 7)]
+
+
+def test_cone_mask():
+    dx, dy = np.ogrid[-4:5, -4:5]
+
+    mask = get_cone_mask(dx, dy, 1, 0, 90)
+
+    assert mask[4 + 3, 4 + 0] and mask[4 + 3, 4 + 3] and mask[4 + 3, 4 - 3]
+    assert not mask[4 + 3, 4 + 4] and not mask[4 - 1, 4 + 0]
+
+    # The origin is never part of a cone
+    assert not mask[4, 4]
+
+    # No direction means no cone at all
+    mask = get_cone_mask(dx, dy, 0, 0, 90)
+    assert mask.shape == (9, 9) and not mask.any()
+
+
+def test_line_mask():
+    # The line carries on past its target until the radius runs out
+    mask = get_line_mask(5, 5, 6, 5, 4, 1, 1, (9, 9))
+    assert [(x + 1, y + 1) for (x, y) in zip(*np.nonzero(mask))] == [(6, 5), (7, 5), (8, 5), (9, 5)]
+
+    mask = get_line_mask(5, 5, 7, 7, 3, 2, 2, (7, 7))
+    assert [(x + 2, y + 2) for (x, y) in zip(*np.nonzero(mask))] == [(6, 6), (7, 7), (8, 8)]
+
+    # Points outside the box are dropped
+    mask = get_line_mask(5, 5, 6, 5, 4, 2, 2, (5, 7))
+    assert [(x + 2, y + 2) for (x, y) in zip(*np.nonzero(mask))] == [(6, 5)]
+
+    assert not get_line_mask(5, 5, 5, 5, 4, 1, 1, (9, 9)).any()
+
+
+def test_entities_in_area_from_the_store_and_the_index():
+    game_map = make_map(wall_x=10)
+    monsters = [make_monster(x, y) for x in range(0, 20, 3) for y in range(0, 15, 2)]
+    game_map.initialize_entity_index(monsters)
+
+    store = EntityStore()
+    store.add_all(monsters)
+
+    # A small blast walks its own tiles, a big one walks the occupied tiles
+    for area in (get_blast_area(game_map, 6, 6, 1), get_blast_area(game_map, 6, 6, 8),
+                 get_blast_area(game_map, 6, 6, 6, 'cone', 9, 6)):
+        expected = {id(monster) for monster in monsters if area.contains(monster.x, monster.y)}
+        assert expected
+
+        game_map.entity_store = None
+        assert {id(entity) for entity in get_entities_in_area(game_map, area)} == expected
+
+        game_map.entity_store = store
+        assert {id(entity) for entity in get_entities_in_area(game_map, area)} == expected
+
+    # Nobody left behind the wall is reached
+    behind_wall = get_blast_area(game_map, 12, 6, 8)
+    assert all(entity.x > 10 for entity in get_entities_in_area(game_map, behind_wall))
+
+
+def test_fireball_does_not_burn_through_walls():
+    # The caster stands just out of range
+    for wall_x, burned in ((None, ['Near', 'Far']), (10, ['Near'])):
+        game_map = make_map(wall_x)
+
+        player = Entity(4, 7, '@', libtcod.white, 'Player', blocks=True, fighter=Fighter(hp=30, defense=0, power=3))
+        near = make_monster(8, 7, 'Near')
+        far = make_monster(12, 7, 'Far')
+        game_map.initialize_entity_index([player, near, far])
+
+        fov_map = initialize_fov(game_map)
+        recompute_fov(fov_map, player.x, player.y, 10)
+
+        results = cast_fireball(player, game_map=game_map, fov_map=fov_map, damage=12, radius=4, target_x=9,
+                                target_y=7)
+
+        assert results[0]['consumed']
+        assert [monster.name for monster in (near, far) if monster.fighter.hp == 18] == burned
+        assert player.fighter.hp == 30
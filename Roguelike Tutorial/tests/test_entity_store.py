@@ -0,0 +1,115 @@
+import pickle
+
+import tcod as libtcod
+
+from components.ai import BasicMonster, ConfusedMonster
+from components.fighter import Fighter
+from entity import Entity
+from entity_store import EntityStore
+from fov_functions import initialize_fov, recompute_fov
+from map_objects.game_map import GameMap
+from map_objects.rectangle import Rect
+
+
+def make_monster(x, y):
+    return Entity(x, y, 's', libtcod.white, 'Monster', blocks=True, fighter=Fighter(hp=10, defense=1, power=3),
+                  ai=BasicMonster())
+
+
+def test_stored_attributes_live_in_the_arrays():
+    store = EntityStore(2)
+    monsters = [make_monster(i, i + 1) for i in range(5)]
+    store.add_all(monsters)
+
+    monsters[0].move(2, 3)
+    monsters[1].fighter.take_damage(4)
+    monsters[2].blocks = False
+
+    assert store.x[:5].tolist() == [2, 1, 2, 3, 4]
+    assert store.y[:5].tolist() == [4, 2, 3, 4, 5]
+    assert store.hp[:5].tolist() == [10, 6, 10, 10, 10]
+    assert store.blocks[:5].tolist() == [True, True, False, True, True]
+    assert store.get_entities_at(2, 4) == [monsters[0]]
+
+
+def test_replaced_components_update_the_store():
+    store = EntityStore()
+    monster = make_monster(1, 1)
+    store.add(monster)
+
+    monster.ai = ConfusedMonster(monster.ai)
+    assert store.has_ai[0] and not store.acts_in_view_only[0]
+
+    fighter = monster.fighter
+    fighter.hp = 7
+    monster.fighter = None
+
+    assert not store.has_fighter[0]
+    assert fighter.store is None and fighter.hp == 7
+
+
+def test_removed_entities_keep_their_values():
+    store = EntityStore()
+    monster = make_monster(1, 1)
+    store.add(monster)
+
+    monster.move(1, 0)
+    monster.fighter.hp = 4
+    store.remove(monster)
+    store.add(make_monster(8, 8))
+
+    assert monster.store is None
+    assert (monster.x, monster.y, monster.fighter.hp) == (2, 1, 4)
+    assert store.get_entities_at(8, 8)[0] is not monster
+
+
+def test_freed_ids_are_reused_lowest_first():
+    store = EntityStore()
+    monsters = [make_monster(i, 0) for i in range(6)]
+    store.add_all(monsters)
+
+    for i in (4, 1, 3):
+        store.remove(monsters[i])
+
+    added = [make_monster(i, 5) for i in range(4)]
+    store.add_all(added)
+
+    assert [entity.store_id for entity in added] == [1, 3, 4, 6]
+    assert store.size == 7
+
+    # Reused ids come back in id order, ahead of the entities added before them
+    assert store.get_entities(store.active) == [monsters[0], added[0], monsters[2], added[1], added[2],
+                                                monsters[5], added[3]]
+
+
+def test_pickled_entities_leave_the_store_behind():
+    store = EntityStore()
+    monster = make_monster(3, 4)
+    store.add(monster)
+    monster.fighter.hp = 5
+
+    loaded = pickle.loads(pickle.dumps(monster))
+
+    assert loaded.store is None and loaded.fighter.store is None
+    assert (loaded.x, loaded.y, loaded.blocks, loaded.fighter.hp) == (3, 4, True, 5)
+    assert loaded.fighter.owner is loaded
+
+
+def test_acting_entities():
+    game_map = GameMap(30, 12)
+    game_map.create_room(Rect(0, 0, 10, 10))
+    game_map.create_room(Rect(20, 0, 8, 8))
+
+    fov_map = initialize_fov(game_map)
+    recompute_fov(fov_map, 2, 2, 10)
+
+    near = make_monster(5, 5)
+    far = make_monster(23, 3)
+    confused = make_monster(24, 4)
+    confused.ai = ConfusedMonster(confused.ai)
+    stairs = Entity(4, 4, '>', libtcod.white, 'Stairs')
+
+    store = EntityStore()
+    store.add_all([far, near, stairs, confused])
+
+    assert store.get_acting_entities(fov_map) == [near, confused]
@@ -0,0 +1,44 @@
+from game_messages import MessageLog
+from game_states import GameStates
+from loader_functions.entity_templates import get_templates
+from loader_functions.save_format import decode_game, encode_game
+from map_objects.game_map import GameMap
+
+
+def test_spawns_share_only_immutable_components():
+    templates = get_templates()
+
+    first = templates['troll'].spawn(1, 2)
+    second = templates['troll'].spawn(3, 4)
+
+    assert (first.x, first.y, second.x, second.y) == (1, 2, 3, 4)
+    assert first.fighter is not second.fighter
+    assert first.ai is not second.ai
+    assert first.fighter.owner is first and first.ai.owner is first
+
+    first.fighter.take_damage(5)
+    assert second.fighter.hp == second.fighter.max_hp
+
+    potion = templates['healing_potion'].spawn(0, 0)
+    rapier = templates['rapier'].spawn(0, 0)
+
+    assert potion.item is templates['healing_potion'].item
+    assert rapier.equippable is templates['rapier'].equippable
+    assert potion.template_id == 'healing_potion'
+
+
+def test_saved_spawns_keep_their_template():
+    templates = get_templates()
+
+    entities = [templates[template_id].spawn(i, 1) for i, template_id in
+                enumerate(('ragged_sailor', 'healing_potion', 'rapier', 'fireball_scroll', 'confusion_scroll'), 1)]
+    game_map = GameMap(10, 5)
+
+    player, loaded_entities, game_map, message_log, game_state = decode_game(
+        encode_game(entities[0], entities, game_map, MessageLog(0, 10, 2), GameStates.PLAYERS_TURN))
+
+    for entity, loaded in zip(entities, loaded_entities):
+        assert loaded.template_id == entity.template_id
+        assert (loaded.name, loaded.x, loaded.y) == (entity.name, entity.x, entity.y)
+        assert loaded.item is entity.item
+        assert loaded.equippable is entity.equippable
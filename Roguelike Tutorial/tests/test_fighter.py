@@ -0,0 +1,93 @@
+import tcod as libtcod
+
+from components.equipment import Equipment
+from components.equippable import Equippable
+from components.fighter import Fighter, Modifier
+from components.inventory import Inventory
+from components.item import Item
+from entity import Entity
+from equipment_slots import EquipmentSlots
+
+
+def make_player():
+    return Entity(1, 1, '@', libtcod.white, 'Player', blocks=True, fighter=Fighter(hp=100, defense=1, power=2),
+                  inventory=Inventory(26), equipment=Equipment())
+
+
+def make_equippable(name, slot, **bonuses):
+    return Entity(1, 1, '/', libtcod.sky, name, item=Item(), equippable=Equippable(slot, **bonuses))
+
+
+def get_stats(fighter):
+    return fighter.max_hp, fighter.power, fighter.defense
+
+
+def test_bonuses_follow_equipment_and_modifiers():
+    player = make_player()
+    fighter = player.fighter
+    equipment = player.equipment
+
+    sword = make_equippable('Sword', EquipmentSlots.MAIN_HAND, power_bonus=3)
+    dagger = make_equippable('Dagger', EquipmentSlots.MAIN_HAND, power_bonus=1)
+    shield = make_equippable('Shield', EquipmentSlots.OFF_HAND, defense_bonus=2, max_hp_bonus=10)
+    player.inventory.items.extend([sword, dagger, shield])
+
+    assert get_stats(fighter) == (100, 2, 1)
+
+    # Each change throws the cached totals away, and the next read works them out again
+    steps = [
+        (lambda: equipment.toggle_equip(sword), (100, 5, 1)),
+        (lambda: equipment.toggle_equip(shield), (110, 5, 3)),
+        (lambda: equipment.toggle_equip(dagger), (110, 3, 3)),
+        (lambda: equipment.toggle_equip(dagger), (110, 2, 3)),
+        (lambda: player.inventory.drop_item(shield), (100, 2, 1)),
+        (lambda: setattr(equipment, 'main_hand', sword), (100, 5, 1))
+    ]
+
+    for change, stats in steps:
+        assert equipment.bonuses is not None
+
+        change()
+
+        assert equipment.bonuses is None
+        assert get_stats(fighter) == stats
+
+    blessing = Modifier(max_hp=5, power=1, source='blessing')
+    curse = Modifier(defense=-2, source='curse')
+
+    fighter.add_modifier(blessing)
+    assert get_stats(fighter) == (105, 6, 1)
+
+    fighter.add_modifier(curse)
+    assert get_stats(fighter) == (105, 6, -1)
+
+    fighter.remove_modifier(blessing)
+    assert get_stats(fighter) == (100, 5, -1)
+
+    fighter.remove_modifier(curse)
+    assert get_stats(fighter) == (100, 5, 1)
+
+
+def test_modifiers_without_equipment():
+    monster = Entity(1, 1, 'o', libtcod.white, 'Orc', blocks=True, fighter=Fighter(hp=10, defense=0, power=3))
+    rage = Modifier(power=2)
+
+    monster.fighter.add_modifier(rage)
+    assert get_stats(monster.fighter) == (10, 5, 0)
+
+    monster.fighter.remove_modifier(rage)
+    assert get_stats(monster.fighter) == (10, 3, 0)
+
+
+def test_get_slot():
+    player = make_player()
+    sword = make_equippable('Sword', EquipmentSlots.MAIN_HAND, power_bonus=3)
+    other_sword = make_equippable('Sword', EquipmentSlots.MAIN_HAND, power_bonus=3)
+    potion = Entity(1, 1, '!', libtcod.violet, 'Potion', item=Item())
+
+    player.equipment.toggle_equip(sword)
+
+    assert player.equipment.get_slot(sword) == EquipmentSlots.MAIN_HAND
+    assert player.equipment.get_slot(other_sword) is None
+    assert player.equipment.get_slot(potion) is None
+    assert not player.equipment.is_equipped(other_sword)
@@ -0,0 +1,46 @@
+from loader_functions.initialize_new_game import get_constants
+from loader_functions.save_format import encode_floor
+from map_objects.floor_generator import FloorGenerator
+from map_objects.game_map import generate_floor
+
+
+def encode(floor):
+    tiles, entities, player_position, rooms, corridors = floor
+
+    return encode_floor(1, tiles, entities, player_position, rooms, corridors)
+
+
+def test_worker_floors_are_the_same_as_floors_built_here():
+    constants = get_constants()
+    constants['map_generators'] = [['rooms', 1], ['caves', 3], ['bsp', 4]]
+
+    floor_generator = FloorGenerator()
+
+    try:
+        for dungeon_level in (2, 3, 4):
+            floor_generator.request_floor(dungeon_level, 1234, constants)
+
+        for dungeon_level in (2, 3, 4):
+            floor = floor_generator.take_floor(dungeon_level, 1234, constants)
+
+            assert encode(floor) == encode(generate_floor(dungeon_level, 1234, constants))
+    finally:
+        floor_generator.close()
+
+
+def test_floors_not_requested_are_built_here():
+    constants = get_constants()
+    floor_generator = FloorGenerator()
+
+    floor = floor_generator.take_floor(2, 99, constants)
+
+    assert floor_generator.executor is None
+    assert encode(floor) == encode(generate_floor(2, 99, constants))
+
+
+def test_floors_depend_on_the_seed():
+    constants = get_constants()
+
+    assert encode(generate_floor(2, 1, constants)) == encode(generate_floor(2, 1, constants))
+    assert encode(generate_floor(2, 1, constants)) != encode(generate_floor(2, 2, constants))
+    assert encode(generate_floor(2, 1, constants)) != encode(generate_floor(3, 1, constants))
@@ -0,0 +1,99 @@
+import os
+import random
+
+import numpy as np
+import tcod as libtcod
+
+from entity import Entity
+from loader_functions.floor_store import FloorStore
+from loader_functions.initialize_new_game import get_constants
+from loader_functions.save_format import encode_floor
+from map_objects.game_map import GameMap, generate_floor
+
+
+def make_floor(dungeon_level):
+    tiles, entities, player_position, rooms, corridors = generate_floor(dungeon_level, 7, get_constants())
+    tiles.explored[:dungeon_level * 5, :] = True
+
+    return tiles, entities, player_position, rooms, corridors
+
+
+def encode(dungeon_level, floor):
+    return encode_floor(dungeon_level, *floor)
+
+
+def test_floors_are_evicted_to_disk_and_loaded_back(tmp_path):
+    floor_store = FloorStore(str(tmp_path), resident_floors=1)
+    floors = {dungeon_level: make_floor(dungeon_level) for dungeon_level in range(1, 5)}
+    expected = {dungeon_level: encode(dungeon_level, floor) for dungeon_level, floor in floors.items()}
+
+    for dungeon_level, floor in floors.items():
+        floor_store.store_floor(dungeon_level, *floor)
+
+    assert list(floor_store.resident) == [4]
+    assert sorted(os.listdir(str(tmp_path))) == ['floor_1.dat', 'floor_2.dat', 'floor_3.dat']
+
+    for dungeon_level in (3, 4, 1, 2):
+        assert floor_store.has_floor(dungeon_level)
+
+        floor = floor_store.load_floor(dungeon_level)
+
+        # The explored tiles come back with the rest of the floor
+        assert encode(dungeon_level, floor) == expected[dungeon_level]
+        assert np.array_equal(floor[0].explored, floors[dungeon_level][0].explored)
+        assert not floor_store.has_floor(dungeon_level)
+
+    assert not os.listdir(str(tmp_path))
+
+
+def test_temporary_directory_is_removed():
+    floor_store = FloorStore(resident_floors=0)
+    floor_store.store_floor(1, *make_floor(1))
+
+    directory = floor_store.directory
+    assert os.path.isfile(os.path.join(directory, 'floor_1.dat'))
+
+    floor_store.close()
+
+    assert not os.path.exists(directory)
+
+
+def test_floor_comes_back_with_its_index_and_path_map(tmp_path):
+    random.seed(3)
+
+    constants = get_constants()
+    player = Entity(0, 0, '@', libtcod.white, 'Player', blocks=True)
+    entities = [player]
+
+    game_map = GameMap(constants['map_width'], constants['map_height'])
+    game_map.make_floor(constants, player, entities)
+    game_map.floor_store = FloorStore(str(tmp_path), resident_floors=1)
+    game_map.initialize_entity_index(entities)
+    game_map.initialize_path_map(entities)
+
+    left_behind = [(entity.name, entity.x, entity.y) for entity in entities[1:]]
+    player_position = (player.x, player.y)
+    tiles = game_map.tiles.copy()
+
+    # Down two floors, so the first one is written to disk, then back up to it
+    entities = game_map.change_floor(2, player, constants, entities)
+    entities = game_map.change_floor(3, player, constants, entities)
+    assert os.path.isfile(os.path.join(str(tmp_path), 'floor_1.dat'))
+
+    entities = game_map.change_floor(1, player, constants, entities)
+
+    assert (player.x, player.y) == player_position
+    assert [(entity.name, entity.x, entity.y) for entity in entities[1:]] == left_behind
+    assert np.array_equal(game_map.tiles, tiles)
+
+    for entity in entities:
+        assert entity in game_map.entity_index.get_entities_at(entity.x, entity.y)
+
+    walkable = ~tiles.blocked.T
+    for entity in entities:
+        if entity.blocks:
+            walkable[entity.y, entity.x] = False
+
+    assert np.array_equal(game_map.path_map.walkable, walkable)
+
+    game_map.floor_store.close()
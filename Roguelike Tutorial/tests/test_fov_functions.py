@@ -0,0 +1,86 @@
+import numpy as np
+
+from fov_functions import FovCache, initialize_fov, recompute_fov
+from map_objects.game_map import GameMap
+from map_objects.rectangle import Rect
+
+
+def make_map():
+    game_map = GameMap(40, 20)
+    game_map.create_room(Rect(0, 0, 12, 12))
+    game_map.create_room(Rect(20, 0, 12, 12))
+    game_map.create_h_tunnel(6, 26, 6)
+
+    return game_map
+
+
+def get_view(game_map, x, y, radius):
+    fov_map = initialize_fov(game_map)
+    recompute_fov(fov_map, x, y, radius)
+
+    return fov_map.fov.copy()
+
+
+def test_cached_views_match_computed_views():
+    game_map = make_map()
+    fov_map = initialize_fov(game_map)
+    cache = FovCache()
+
+    path = [(3, 3), (6, 6), (10, 6), (6, 6), (24, 4), (3, 3), (10, 6), (24, 4)]
+
+    for radius in (0, 5):
+        for (x, y) in path:
+            recompute_fov(fov_map, x, y, radius, cache=cache, map_version=game_map.version)
+
+            assert np.array_equal(fov_map.fov, get_view(game_map, x, y, radius))
+
+    assert cache.misses == 8
+    assert cache.hits == 8
+
+
+def test_changed_map_is_computed_again():
+    game_map = make_map()
+    fov_map = initialize_fov(game_map)
+    cache = FovCache()
+
+    recompute_fov(fov_map, 3, 3, 0, cache=cache, map_version=game_map.version)
+    assert not fov_map.fov[15, 3]
+
+    # Open a way down, so more is seen from the same tile
+    game_map.create_v_tunnel(3, 18, 3)
+    fov_map = initialize_fov(game_map)
+
+    recompute_fov(fov_map, 3, 3, 0, cache=cache, map_version=game_map.version)
+
+    assert cache.hits == 0
+    assert cache.misses == 2
+    assert fov_map.fov[15, 3]
+    assert np.array_equal(fov_map.fov, get_view(game_map, 3, 3, 0))
+
+
+def test_least_recently_used_views_are_dropped():
+    game_map = make_map()
+    fov_map = initialize_fov(game_map)
+    cache = FovCache(2)
+
+    for (x, y) in ((3, 3), (4, 4), (3, 3), (5, 5), (3, 3), (4, 4)):
+        recompute_fov(fov_map, x, y, 5, cache=cache, map_version=game_map.version)
+
+    # (4, 4) was dropped for (5, 5), since (3, 3) had been used more recently
+    assert cache.hits == 2
+    assert cache.misses == 4
+    assert list(cache.entries) == [(3, 3, 5, True, 0), (4, 4, 5, True, 0)]
+
+
+def test_cache_without_entries():
+    game_map = make_map()
+    fov_map = initialize_fov(game_map)
+    cache = FovCache(0)
+
+    for (x, y) in ((3, 3), (24, 4), (3, 3)):
+        recompute_fov(fov_map, x, y, 5, cache=cache, map_version=game_map.version)
+
+        assert np.array_equal(fov_map.fov, get_view(game_map, x, y, 5))
+
+    assert cache.hits == 0
+    assert not cache.entries
@@ -0,0 +1,112 @@
+import random
+
+import tcod as libtcod
+
+from game_messages import Message, MessageHistory, MessageLog
+from game_states import GameStates
+from loader_functions.initialize_new_game import get_constants, get_game_variables
+from loader_functions.save_format import decode_game, encode_game
+
+
+def get_lines(messages):
+    return [(message.text, tuple(message.color)) for message in messages]
+
+
+def test_history_is_indexed_again_when_reopened(tmp_path):
+    path = str(tmp_path / 'game.log')
+    lines = [Message('Line {0}'.format(i), libtcod.Color(i, 255 - i, 16 * (i % 16))) for i in range(40)]
+
+    history = MessageHistory(path, 'a')
+    for message in lines[:25]:
+        history.append(message)
+    history.close()
+
+    history = MessageHistory(path, 'a')
+    assert len(history) == 25
+
+    for message in lines[25:]:
+        history.append(message)
+
+    # The text and the colour of every line come back, whether it was indexed on open or appended since
+    assert get_lines(history.get_lines(0, 40)) == get_lines(lines)
+    assert get_lines(history.get_lines(20, 10)) == get_lines(lines[20:30])
+
+    history.close()
+
+
+def test_history_bounds(tmp_path):
+    history = MessageHistory(str(tmp_path / 'game.log'), 'a')
+    for i in range(5):
+        history.append(Message('Line {0}'.format(i)))
+
+    assert [message.text for message in history.get_lines(-3, 5)] == ['Line 0', 'Line 1', 'Line 2', 'Line 3',
+                                                                        'Line 4']
+    assert [message.text for message in history.get_lines(3, 10)] == ['Line 3', 'Line 4']
+    assert history.get_lines(5, 3) == []
+    assert history.get_lines(2, 0) == []
+
+    history.close()
+
+
+def test_history_from_another_game_is_discarded(tmp_path):
+    path = str(tmp_path / 'game.log')
+
+    history = MessageHistory(path, 'a')
+    history.append(Message('From the first game'))
+    history.close()
+
+    history = MessageHistory(path, 'b')
+    assert len(history) == 0
+
+    history.append(Message('From the second game'))
+    assert [message.text for message in history.get_lines(0, 5)] == ['From the second game']
+
+    history.close()
+
+
+def test_saved_game_picks_its_history_up_again(tmp_path):
+    random.seed(1)
+
+    path = str(tmp_path / 'game.log')
+    constants = get_constants()
+
+    player, entities, game_map, message_log, game_state = get_game_variables(constants)
+    message_log.open_history(path)
+    message_log.add_message(Message('Before the save'))
+
+    data = encode_game(player, entities, game_map, message_log, GameStates.PLAYERS_TURN)
+    message_log.close_history()
+
+    loaded_log = decode_game(data)[3]
+    loaded_log.open_history(path)
+    assert [message.text for message in loaded_log.get_history(0, 10)][-1] == 'Before the save'
+    loaded_log.close_history()
+
+    # A new game does not show the saved game's history, and the saved game then starts over too
+    new_log = get_game_variables(constants)[3]
+    new_log.open_history(path)
+    assert new_log.history_length() == 0
+    new_log.close_history()
+
+    loaded_log.open_history(path)
+    assert loaded_log.history_length() == 0
+    loaded_log.close_history()
+
+
+def test_log_keeps_only_the_last_lines():
+    message_log = MessageLog(0, 20, 3)
+
+    for i in range(5):
+        message_log.add_message(Message('Message {0}'.format(i)))
+
+    assert [message.text for message in message_log.messages] == ['Message 2', 'Message 3', 'Message 4']
+    assert message_log.version == 5
+
+    # A wrapped message pushes out one line per line it takes up
+    message_log.add_message(Message('A message that needs two lines', libtcod.red))
+
+    assert [message.text for message in message_log.messages] == ['Message 4', 'A message that needs',
+                                                                  'two lines']
+    assert all(message.color == libtcod.red for message in list(message_log.messages)[1:])
+    assert message_log.version == 6
+    assert message_log.get_history(1, 5) == list(message_log.messages)[1:]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from loader_functions.initialize_new_game import get_constants
+from map_objects.game_map import GameMap, generate_floor
+
+
+def get_floor_constants(width, height, generator, **overrides):
+    constants = get_constants()
+
+    constants['map_width'] = width
+    constants['map_height'] = height
+    constants['map_generators'] = [[generator, 1]]
+    constants.update(overrides)
+
+    return constants
+
+
+def check_floor(floor):
+    tiles, entities, (player_x, player_y), rooms, corridors = floor
+
+    game_map = GameMap(*tiles.shape)
+    game_map.tiles = tiles
+
+    stairs = [entity for entity in entities if entity.stairs]
+
+    assert not tiles.blocked[player_x, player_y]
+    assert len(stairs) == 1
+    assert game_map.is_reachable(player_x, player_y, stairs[0].x, stairs[0].y)
+
+    for entity in entities:
+        assert not tiles.blocked[entity.x, entity.y]
+
+
+@pytest.mark.parametrize('generator', ['rooms', 'caves', 'bsp'])
+@pytest.mark.parametrize('width, height', [(3, 3), (5, 4), (8, 6), (12, 12), (30, 9)])
+def test_small_maps(generator, width, height):
+    constants = get_floor_constants(width, height, generator)
+
+    for seed in range(5):
+        check_floor(generate_floor(1, seed, constants))
+
+
+def test_caves_without_open_tiles_fall_back_to_rooms():
+    constants = get_floor_constants(20, 20, 'caves', cave_wall_chance=1.0)
+
+    floor = generate_floor(1, 1, constants)
+
+    check_floor(floor)
+    assert floor[3]
+
+
+def test_caves_are_one_connected_area():
+    constants = get_floor_constants(80, 43, 'caves')
+
+    tiles = generate_floor(1, 7, constants)[0]
+
+    game_map = GameMap(*tiles.shape)
+    game_map.tiles = tiles
+
+    assert game_map.get_regions().max() == 1
+    assert np.count_nonzero(~tiles.blocked) > 80 * 43 // 4
+
+
+def test_bsp_rooms_do_not_overlap():
+    constants = get_floor_constants(120, 80, 'bsp')
+
+    rooms = generate_floor(1, 3, constants)[3]
+
+    assert len(rooms) > 1
+
+    for i, room in enumerate(rooms):
+        for other_room in rooms[i + 1:]:
+            assert not room.intersect(other_room)
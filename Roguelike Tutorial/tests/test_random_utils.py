@@ -0,0 +1,56 @@
+import random
+
+from collections import Counter
+
+import numpy as np
+
+from random_utils import SpawnTable, from_dungeon_level, random_choice_from_dict
+
+
+CHANCES = {'ragged_sailor': 80, 'skeleton': 0, 'troll': 15, 'kraken': 5}
+
+
+def check_distribution(choices):
+    counts = Counter(choices)
+    total = sum(CHANCES.values())
+
+    assert counts['skeleton'] == 0
+
+    for choice, chance in CHANCES.items():
+        assert abs(counts[choice] / len(choices) - chance / total) < 0.01
+
+
+def test_choose_distribution():
+    table = SpawnTable(CHANCES)
+    rng = random.Random(1)
+
+    check_distribution([table.choose(rng) for i in range(50000)])
+
+
+def test_choose_many_distribution():
+    table = SpawnTable(CHANCES)
+
+    check_distribution(table.choose_many(50000, random.Random(2)))
+    check_distribution(table.choose_many(50000, np.random.default_rng(3)))
+
+
+def test_same_choices_as_random_choice_from_dict():
+    table = SpawnTable(CHANCES)
+    rng = random.Random(4)
+    other_rng = random.Random(4)
+
+    assert [table.choose(rng) for i in range(1000)] == \
+        [random_choice_from_dict(CHANCES, other_rng) for i in range(1000)]
+    assert table.choose_many(1000, rng) == [random_choice_from_dict(CHANCES, other_rng) for i in range(1000)]
+
+
+def test_single_choice():
+    table = SpawnTable({'troll': 3})
+
+    assert table.choose_many(10, random.Random(5)) == ['troll'] * 10
+
+
+def test_from_dungeon_level():
+    table = [[15, 3], [30, 5], [60, 7]]
+
+    assert [from_dungeon_level(table, level) for level in range(1, 9)] == [0, 0, 15, 15, 30, 30, 60, 60]
@@ -0,0 +1,83 @@
+import numpy as np
+
+from map_objects.game_map import GameMap
+from map_objects.rectangle import Rect
+from map_objects.regions import label_regions
+
+
+def make_rooms_map(*rooms):
+    game_map = GameMap(40, 12)
+
+    for room in rooms:
+        game_map.create_room(room)
+
+    return game_map
+
+
+def test_label_regions():
+    blocked = np.ones((6, 5), dtype=bool)
+    blocked[1, 1] = blocked[2, 2] = False
+    blocked[4, 1:4] = False
+
+    labels = label_regions(blocked)
+
+    # The diagonal step joins the first two tiles
+    assert labels[1, 1] == labels[2, 2] == 1
+    assert (labels[4, 1:4] == 2).all()
+    assert (labels[blocked] == 0).all()
+
+
+def test_label_regions_without_open_tiles():
+    assert not label_regions(np.ones((4, 3), dtype=bool)).any()
+
+
+def test_is_reachable():
+    game_map = make_rooms_map(Rect(0, 0, 5, 5), Rect(20, 0, 5, 5))
+
+    assert game_map.is_reachable(1, 1, 4, 4)
+    assert not game_map.is_reachable(2, 2, 22, 3)
+
+    # A wall is only reachable from itself
+    assert game_map.is_reachable(0, 0, 0, 0)
+    assert not game_map.is_reachable(0, 0, 1, 1)
+
+
+def test_regions_follow_tile_changes():
+    game_map = make_rooms_map(Rect(0, 0, 5, 5), Rect(20, 0, 5, 5))
+
+    assert not game_map.is_reachable(2, 2, 22, 3)
+
+    game_map.create_h_tunnel(2, 22, 3)
+
+    assert game_map.is_reachable(2, 2, 22, 3)
+
+
+def test_connect_regions_with_the_main_region_labelled_last():
+    game_map = make_rooms_map(Rect(0, 0, 5, 5), Rect(20, 0, 5, 5))
+
+    assert game_map.get_regions()[22, 3] == game_map.get_regions().max()
+
+    game_map.connect_regions(22, 3)
+
+    assert game_map.is_reachable(2, 2, 22, 3)
+
+
+def test_connect_regions():
+    game_map = make_rooms_map(Rect(0, 0, 5, 5), Rect(10, 6, 5, 5), Rect(20, 0, 5, 5), Rect(30, 6, 5, 5))
+
+    game_map.connect_regions(12, 8)
+
+    assert game_map.get_regions().max() == 1
+
+    for (x, y) in ((2, 2), (22, 3), (32, 8)):
+        assert game_map.is_reachable(12, 8, x, y)
+
+
+def test_connect_regions_leaves_a_connected_map_alone():
+    game_map = make_rooms_map(Rect(0, 0, 5, 5), Rect(20, 0, 5, 5))
+    game_map.create_h_tunnel(2, 22, 3)
+
+    blocked = game_map.tiles.blocked.copy()
+    game_map.connect_regions(2, 2)
+
+    assert np.array_equal(game_map.tiles.blocked, blocked)
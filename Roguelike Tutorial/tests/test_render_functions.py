@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import tcod as libtcod
+
+from fov_functions import initialize_fov, recompute_fov
+from game_states import GameStates
+from loader_functions.initialize_new_game import get_constants, get_game_variables
+from render_functions import RenderTracker, render_all
+
+
+def make_frame():
+    random.seed(1)
+
+    constants = get_constants()
+    player, entities, game_map, message_log, game_state = get_game_variables(constants)
+
+    fov_map = initialize_fov(game_map)
+    recompute_fov(fov_map, player.x, player.y, constants['fov_radius'], constants['fov_light_walls'],
+                  constants['fov_algorithm'])
+
+    con = libtcod.console_new(constants['screen_width'], constants['screen_height'])
+    panel = libtcod.console_new(constants['screen_width'], constants['panel_height'])
+    root = libtcod.console_new(constants['screen_width'], constants['screen_height'])
+
+    def render(tracker, fov_recompute=False):
+        return render_all(con, panel, entities, player, game_map, fov_map, fov_recompute, message_log,
+                          constants['screen_width'], constants['screen_height'], constants['bar_width'],
+                          constants['panel_height'], constants['panel_y'], libtcod.Mouse(), constants['colors'],
+                          GameStates.PLAYERS_TURN, root=root, tracker=tracker)
+
+    return player, game_map, root, render
+
+
+def snapshot(root):
+    return root.ch.copy(), root.fg.copy(), root.bg.copy()
+
+
+def changed_cells(before, after):
+    changed = np.zeros(before[0].shape, dtype=bool)
+    for old, new in zip(before, after):
+        difference = old != new
+        changed |= difference if difference.ndim == 2 else difference.any(axis=-1)
+
+    return {(int(x), int(y)) for (y, x) in zip(*np.nonzero(changed))}
+
+
+def test_idle_frame_draws_nothing():
+    player, game_map, root, render = make_frame()
+    tracker = RenderTracker()
+
+    assert render(tracker, fov_recompute=True)
+    assert not render(tracker)
+
+
+def test_moving_entity_only_redraws_its_cells():
+    player, game_map, root, render = make_frame()
+    tracker = RenderTracker()
+    render(tracker, fov_recompute=True)
+
+    # Step onto the first free tile next to the player
+    (dx, dy) = next((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                    if (dx, dy) != (0, 0) and not game_map.is_blocked(player.x + dx, player.y + dy) and
+                    not game_map.entity_index.get_entities_at(player.x + dx, player.y + dy))
+    old_position = (player.x, player.y)
+
+    before = snapshot(root)
+    player.move(dx, dy, game_map)
+
+    assert render(tracker)
+    assert changed_cells(before, snapshot(root)) == {old_position, (player.x, player.y)}
+
+    assert not render(tracker)
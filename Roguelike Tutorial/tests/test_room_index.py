@@ -0,0 +1,87 @@
+import random
+
+import tcod as libtcod
+
+from entity import Entity
+from game_messages import MessageLog
+from game_states import GameStates
+from loader_functions.initialize_new_game import get_constants
+from loader_functions.save_format import decode_game, encode_game
+from map_objects.game_map import GameMap, generate_floor
+from map_objects.rectangle import Rect
+from map_objects.room_index import RoomIndex
+
+
+def random_room(rng, size=100):
+    w = rng.randint(1, 12)
+    h = rng.randint(1, 12)
+
+    return Rect(rng.randint(0, size - w), rng.randint(0, size - h), w, h)
+
+
+def test_agrees_with_rect_intersect():
+    rng = random.Random(1)
+
+    for cell_size in (1, 4, 11, 50):
+        room_index = RoomIndex(cell_size)
+        rooms = []
+
+        for i in range(300):
+            room = random_room(rng)
+
+            assert room_index.intersects(room) == any(room.intersect(other_room) for other_room in rooms)
+
+            if rng.random() < 0.3:
+                room_index.add(room)
+                rooms.append(room)
+
+
+def test_touching_edges_intersect():
+    room_index = RoomIndex(10)
+    room_index.add(Rect(0, 0, 9, 9))
+
+    assert room_index.intersects(Rect(9, 9, 5, 5))
+    assert not room_index.intersects(Rect(10, 0, 5, 5))
+
+
+def test_make_map_keeps_rooms_and_corridors():
+    constants = get_constants()
+
+    tiles, entities, player_position, rooms, corridors = generate_floor(1, 5, constants)
+
+    assert len(rooms) > 1
+    assert corridors == [(i, i + 1) for i in range(len(rooms) - 1)]
+    assert player_position == rooms[0].center()
+
+    for i, room in enumerate(rooms):
+        assert not tiles.blocked[room.x1 + 1:room.x2, room.y1 + 1:room.y2].any()
+
+        for other_room in rooms[i + 1:]:
+            assert not room.intersect(other_room)
+
+
+def make_game():
+    random.seed(2)
+
+    constants = get_constants()
+    player = Entity(0, 0, '@', libtcod.white, 'Player', blocks=True)
+    entities = [player]
+
+    game_map = GameMap(constants['map_width'], constants['map_height'])
+    game_map.make_floor(constants, player, entities)
+
+    return player, entities, game_map, MessageLog(0, 10, 2), GameStates.PLAYERS_TURN
+
+
+def describe_rooms(game_map):
+    return [(room.x1, room.y1, room.x2, room.y2) for room in game_map.rooms], game_map.corridors
+
+
+def test_rooms_and_corridors_are_saved():
+    game = make_game()
+
+    game_map = decode_game(encode_game(*game))[2]
+
+    assert game_map.rooms
+    assert describe_rooms(game_map) == describe_rooms(game[2])
+
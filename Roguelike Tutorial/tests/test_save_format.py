@@ -0,0 +1,169 @@
+import pickle
+import random
+import shelve
+
+import numpy as np
+import pytest
+
+from components.ai import ConfusedMonster
+from components.fighter import Modifier
+from game_messages import Message
+from game_states import GameStates
+from loader_functions import data_loaders
+from loader_functions.initialize_new_game import get_constants, get_game_variables
+from loader_functions.save_format import (EQUIPMENT_SLOT_NAMES, FORMAT_VERSION, HEADER, MAGIC, decode_game,
+                                          encode_game)
+from map_objects.tile import Tile
+
+
+def make_game(seed=1):
+    random.seed(seed)
+
+    constants = get_constants()
+    player, entities, game_map, message_log, game_state = get_game_variables(constants)
+
+    monsters = [entity for entity in entities if entity.ai]
+    monsters[0].fighter.take_damage(3)
+    monsters[1].ai = ConfusedMonster(monsters[1].ai, 4)
+    monsters[1].ai.owner = monsters[1]
+
+    game_map.tiles.explored[:10, :10] = True
+    message_log.add_message(Message('Ahoy'))
+
+    return player, entities, game_map, message_log, game_state
+
+
+def describe(entity):
+    fighter = entity.fighter
+    ai = entity.ai
+
+    return (entity.name, entity.x, entity.y, entity.char, tuple(entity.color), entity.blocks, entity.render_order,
+            entity.template_id,
+            fighter and (fighter.hp, fighter.base_max_hp, fighter.base_power, fighter.base_defense, fighter.xp),
+            type(ai).__name__ if ai else None, getattr(ai, 'number_of_turns', None),
+            entity.stairs and entity.stairs.floor,
+            entity.item and entity.item.use_function,
+            entity.equippable and (entity.equippable.slot, entity.equippable.power_bonus),
+            entity.inventory and [describe(item) for item in entity.inventory.items],
+            entity.equipment and [getattr(getattr(entity.equipment, slot_name), 'name', None)
+                                  for slot_name in EQUIPMENT_SLOT_NAMES])
+
+
+def describe_game(player, entities, game_map, message_log, game_state):
+    return ([describe(entity) for entity in entities], entities.index(player), game_map.dungeon_level,
+            game_map.seed, game_map.tiles.tobytes(), [message.text for message in message_log.messages], game_state)
+
+
+def test_round_trip():
+    game = make_game()
+
+    loaded = decode_game(encode_game(*game))
+
+    assert describe_game(*loaded) == describe_game(*game)
+
+    # A confused monster's original AI is its own again
+    confused = [entity for entity in loaded[1] if isinstance(entity.ai, ConfusedMonster)][0]
+    assert confused.ai.previous_ai.owner is confused
+
+
+def test_modifiers_round_trip():
+    player, entities, game_map, message_log, game_state = make_game()
+    monster = [entity for entity in entities if entity.ai][0]
+
+    player.fighter.add_modifier(Modifier(max_hp=5, power=2, source='blessing'))
+    player.fighter.add_modifier(Modifier(defense=-1))
+    monster.fighter.add_modifier(Modifier(power=3, source=player))
+
+    loaded_entities = decode_game(encode_game(player, entities, game_map, message_log, game_state))[1]
+    loaded_player = loaded_entities[entities.index(player)]
+    loaded_monster = loaded_entities[entities.index(monster)]
+
+    assert [(modifier.max_hp, modifier.power, modifier.defense, modifier.source)
+            for modifier in loaded_player.fighter.modifiers] == [(5, 2, 0, 'blessing'), (0, 0, -1, None)]
+
+    # Only names are kept as sources
+    assert loaded_monster.fighter.modifiers[0].source is None
+
+    for entity, loaded in ((player, loaded_player), (monster, loaded_monster)):
+        assert (loaded.fighter.max_hp, loaded.fighter.power, loaded.fighter.defense) == \
+            (entity.fighter.max_hp, entity.fighter.power, entity.fighter.defense)
+
+
+def test_save_is_compact():
+    game = make_game()
+
+    assert len(encode_game(*game)) < len(pickle.dumps(game)) // 4
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        decode_game(b'PIY')
+
+    with pytest.raises(ValueError):
+        decode_game(HEADER.pack(b'NOPE', FORMAT_VERSION))
+
+    with pytest.raises(ValueError):
+        decode_game(HEADER.pack(MAGIC, FORMAT_VERSION + 1))
+
+
+def test_save_and_load(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    game = make_game()
+
+    data_loaders.save_game(*game)
+
+    assert describe_game(*data_loaders.load_game()) == describe_game(*game)
+
+
+def make_legacy(obj):
+    # Give an object the attribute names it had before the entity store, as in the oldest pickles
+    state = obj.__dict__
+
+    for name in ('x', 'y', 'blocks', 'ai', 'fighter', 'hp', 'base_max_hp', 'base_power', 'base_defense'):
+        if '_' + name in state:
+            state[name] = state.pop('_' + name)
+
+
+def test_legacy_save_is_migrated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    player, entities, game_map, message_log, game_state = make_game()
+    expected = describe_game(player, entities, game_map, message_log, game_state)
+
+    # The oldest saves hold the tiles as Tile objects
+    game_map.tiles = [[Tile(bool(blocked), bool(block_sight)) for blocked, block_sight in zip(*columns)]
+                      for columns in zip(game_map.tiles.blocked, game_map.tiles.block_sight)]
+
+    for entity in entities:
+        for item in (entity.inventory.items if entity.inventory else []):
+            make_legacy(item)
+
+        if entity.fighter:
+            make_legacy(entity.fighter)
+
+        make_legacy(entity)
+
+    with shelve.open(data_loaders.LEGACY_SAVE_FILE, 'n') as data_file:
+        data_file['player_index'] = entities.index(player)
+        data_file['entities'] = entities
+        data_file['game_map'] = game_map
+        data_file['message_log'] = message_log
+        data_file['game_state'] = game_state
+
+    loaded = data_loaders.load_game()
+
+    assert (tmp_path / data_loaders.SAVE_FILE).is_file()
+
+    # Tiles weren't explored in the oldest saves
+    expected_tiles = np.frombuffer(expected[4], dtype=loaded[2].tiles.dtype).copy()
+    expected_tiles['explored'] = False
+    expected = expected[:4] + (expected_tiles.tobytes(),) + expected[5:]
+
+    assert describe_game(*loaded) == expected
+    assert describe_game(*data_loaders.load_game()) == expected
+
+
+def test_no_save(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        data_loaders.load_game()